@@ -0,0 +1,152 @@
+# ai_report.py
+"""Prompt und Modellkonfiguration für die WatsonX-Bewertung"""
+
+import math
+import os
+from decimal import Decimal, ROUND_HALF_UP
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+MODEL_ID = "ibm/granite-3-8b-instruct"
+
+PARAMETERS = {
+    "decoding_method": "greedy",
+    "max_new_tokens": 1000,
+    "min_new_tokens": 1,
+    "repetition_penalty": 1.1
+}
+# ============================================================================
+
+
+def create_model(credentials: dict = None, project_id: str = None, model_id: str = MODEL_ID, params: dict = None):
+    """WatsonX-Modell (Zugangsdaten aus der Umgebung), mit WATSONX_STUB=1 lokales Stub-Modell ohne Netzwerk"""
+    params = params or PARAMETERS
+    if os.getenv("WATSONX_STUB") == "1":
+        from stub_model import StubModel
+        print("Initialisiere Stub Model (WATSONX_STUB=1)...")
+        return StubModel(model_id=model_id, params=params)
+
+    from ibm_watsonx_ai.foundation_models import Model
+    print("Initialisiere Watson Model...")
+    return Model(
+        model_id=model_id,
+        params=params,
+        credentials=credentials or {"url": os.getenv("WATSONX_URL"), "apikey": os.getenv("WATSONX_APIKEY")},
+        project_id=project_id or os.getenv("WATSONX_PROJECT_ID")
+    )
+
+
+def normalize_payload(raw: dict) -> dict:
+    """Normalize incoming keys to lowercase so we can access them reliably"""
+    return {str(k).lower(): v for k, v in raw.items()}
+
+
+def round_payload(value):
+    """
+    Zahlen wie roundNumbers() im Frontend runden (toFixed(2), ganze Zahlen als int)
+
+    Der Browser schickt gerundete Werte an /api/generate-report. Vorberechnete
+    Bewertungen (batch_assessments.py) brauchen denselben Prompt, sonst passt
+    der Cache-Key nicht.
+    """
+    if isinstance(value, dict):
+        return {k: round_payload(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [round_payload(v) for v in value]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return value
+    # toFixed rundet den exakten Binärwert, bei Gleichstand von der Null weg
+    rounded = float(Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    # JSON.stringify(200.0) == "200": kommt in Python als int an
+    return int(rounded) if rounded.is_integer() else rounded
+
+
+def build_prompt(data: dict, peer: dict = None) -> str:
+    """
+    Baut den Bewertungs-Prompt aus einer Schiffszeile
+
+    Args:
+        data: Schiffsdaten mit klein geschriebenen Keys (siehe normalize_payload)
+        peer: Vergleichsgruppe aus peer_stats.PeerStats.lookup (optional)
+
+    Returns:
+        Prompt-Text für model.generate_text
+    """
+    ship_name = data.get('ship_name') or data.get('name') or ''
+    imo = data.get('imo') or ''
+    mrv_ship_type = data.get('mrv_ship_type') or data.get('vesseltype') or ''
+    length = data.get('length') or data.get('length_m') or ''
+    width = data.get('width') or ''
+    draft = data.get('draft_m_median') or data.get('draft') or ''
+    report_year = data.get('report_year') or ''
+    ais_distance = data.get('ais_distance_nm_total') or ''
+    ais_time = data.get('ais_time_hours_total') or ''
+    sog_mean = data.get('sog_mean_kn') or ''
+    sog_p95 = data.get('sog_p95_kn') or ''
+    moving_share = data.get('moving_share') or ''
+    y_mrv = data.get('y_mrv_co2_per_nm_kg') or ''
+    y_pred = data.get('y_pred_co2_per_nm_kg') or ''
+    residual_kg = data.get('residual_kg') or ''
+    residual_pctraw = data.get('residual_pct') or ''
+    residual_pct = residual_pctraw * 100 or '' 
+    flag_color = data.get('flag_color') or ''
+    flag_reason = data.get('flag_reason') or ''
+    peer_section = _peer_section(peer)
+
+    return f"""You are an expert in maritime regulations and data analysis in the context of the EU MRV and FuelEU Maritime regulations.
+
+                Analyze the following ship data for an official plausibility check:
+
+            ### 1. Master data & dimensions
+				- Ship name: {ship_name} (IMO: {imo})
+				- Ship type: {mrv_ship_type}
+				- Dimensions: Length {length}m, width {width}m, draft {draft}m
+
+            ### 2. AIS movement profile (reporting year {report_year})
+				- Total distance traveled: {ais_distance} nm
+				- Operating time: {ais_time} h
+				- Average speed: {sog_mean} kn (high load operation P95: {sog_p95} kn)
+                - Time spent in motion: {moving_share}
+
+            ### 3. Emission assessment (regression vs. MRV)
+				- Reported intensity (MRV): {y_mrv} kg CO2/nm
+				- Expected intensity (AI model): {y_pred} kg CO2/nm
+                - Deviation (residual): {residual_kg} kg ({residual_pct}%)
+				- Assessment: {flag_color}
+				- Reason for assessment: {flag_reason}
+{peer_section}
+            ### Your task:
+				1. Create a concise summary of the operating profile (size, activity, speed).
+				2. Evaluate the status of the “flag_color”:
+				- If GREEN: Confirm the plausibility of the reported data in comparison to the AI model.
+                - If RED: Explain the anomaly based on the “flag_reason” and point out the legal consequences of an incorrect MRV report.
+				3. Provide a brief recommendation for the inspector.
+
+				Respond in a structured, professional manner and in English."""
+
+
+def _peer_section(peer: dict) -> str:
+    # Ohne Vergleichsgruppe bleibt der Prompt unverändert (gleiche Cache-Keys wie bisher)
+    if not peer:
+        return ""
+    from peer_stats import describe_group, format_peer_lines
+    lines = "".join(f"\n				- {label}: {text}" for label, text in format_peer_lines(peer))
+    return f"""
+            ### 4. Peer group comparison ({describe_group(peer['group'])})
+				- Percentile = share of the peer group with an equal or lower value{lines}
+"""
+
+
+def extract_text(generated_response) -> str:
+    """Text aus der Antwort von model.generate_text (str oder raw dict)"""
+    if isinstance(generated_response, str):
+        return generated_response
+    return generated_response.get('results', [{}])[0].get('generated_text', '')
+
+def extract_token_counts(generated_response) -> tuple:
+    """(Prompt-Tokens, generierte Tokens) aus der raw-Antwort, None falls nicht gemeldet"""
+    if isinstance(generated_response, str):
+        return None, None
+    result = generated_response.get('results', [{}])[0]
+    return result.get('input_token_count'), result.get('generated_token_count')
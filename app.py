@@ -1,89 +1,410 @@
 # app.py
+import io
 import os
-import pandas as pd 
-from flask import Flask, request, jsonify, send_from_directory, send_file
-from ibm_watsonx_ai import APIClient
-from ibm_watsonx_ai.foundation_models import Model
-from report_gen import generate_report_pdf
+import json
+import time
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file, stream_with_context
 from dotenv import load_dotenv
+import metrics
+from ai_report import (MODEL_ID, PARAMETERS, create_model, normalize_payload, build_prompt, extract_text,
+                       extract_token_counts)
+from components import LazyComponent, ComponentUnavailable
+from llm_cache import LLMCache, make_key
+from batch_assessments import AssessmentStore
+from jobs import JobQueue, QueueFullError, QUEUE_FULL_RETRY_AFTER_SECONDS
 
+# Schwere Imports (pandas, ReportLab, ibm_watsonx_ai) passieren erst in den
+# Komponenten unten, damit der Webserver sofort startet.
 
-app = Flask(__name__, static_url_path='', static_folder='public')
-
-print("Lade Schiffsdatenbank (Parquet)...")
-try:
-    # Lade die Datei einmalig beim Start in den RAM
-    df = pd.read_parquet('ship_report_imo_2024.parquet')
-    df.columns = [c.lower() for c in df.columns]
-    print("Spalten in DB:", df.columns.tolist())
 
-    # Damit wir leichter suchen können, stellen wir sicher, dass die IMO ein String ist
-    # Passe 'imo' an den echten Spaltennamen in deiner Datei an!
-    if 'imo' in df.columns:
-        df['imo'] = df['imo'].astype(str)
-    else:
-        print("WARNUNG: Keine Spalte 'imo' in der Parquet-Datei gefunden! Bitte Spaltennamen prüfen.")
-        print("Vorhandene Spalten:", df.columns)
-
-    print(f"Datenbank geladen: {len(df)} Schiffe gefunden.")
-except Exception as e:
-    print(f"FEHLER beim Laden der Parquet-Datei: {e}")
-    df = pd.DataFrame() # Leerer Fallback
+app = Flask(__name__, static_url_path='', static_folder='public')
 
 
 # --- KONFIGURATION ---
-load_dotenv
+load_dotenv()
 credentials = {
     "url": os.getenv("WATSONX_URL"),
     "apikey": os.getenv("WATSONX_APIKEY")
 }
 
 project_id = os.getenv("WATSONX_PROJECT_ID")
-model_id = "ibm/granite-3-8b-instruct"
+model_id = MODEL_ID
+parameters = PARAMETERS
+# Schiffsdaten ändern sich nur beim Reload: Browser/Proxies dürfen speichern,
+# fragen aber jedes Mal per ETag nach (304 ohne Body, solange die Version gleich ist)
+SEARCH_CACHE_CONTROL = "public, no-cache"
 
-parameters = {
-    "decoding_method": "greedy",
-    "max_new_tokens": 1000,
-    "min_new_tokens": 1,
-    "repetition_penalty": 1.1
-}
 
-# Modell einmalig initialisieren
-print("Initialisiere Watson Model...")
-model = Model(
-    model_id=model_id,
-    params=parameters,
-    credentials=credentials,
-    project_id=project_id
-)
+# --- KOMPONENTEN (lazy / im Hintergrund) ---
+def _load_dataset():
+    # Gemeinsame Schiffsdatenbank (wird auch vom PDF-Generator genutzt)
+    import ship_data
+    # Neue/geänderte Jahresdateien im Hintergrund laden und atomar tauschen; auch
+    # wenn das erste Laden scheitert (Datei fehlt noch oder ist halb kopiert)
+    ship_data.start_reloader()
+    dataset = ship_data.get_dataset()
+    if dataset.empty:
+        raise RuntimeError("Datenbank nicht geladen")
+    print("Spalten in DB:", dataset.columns)
+    _build_indexes(dataset)
+    return ship_data
+
+def _build_indexes(dataset):
+    import ship_search
+    import peer_stats
+    import similar_vessels
+    import flag_engine
+    import ship_payloads
+    # Reihenfolge: die fertigen Antworten enthalten die Vergleichsgruppe
+    for build in (ship_search.get_name_index, peer_stats.get_peer_stats,
+                  similar_vessels.get_similar_index, flag_engine.get_flag_engine,
+                  ship_payloads.get_payload_store):
+        # Arrow-Backend: die Indizes halten eigene Spaltenkopien im Speicher. Vorab nur,
+        # was jede Suche und jeder Prompt braucht; Autocomplete, ähnliche Schiffe und
+        # What-if bauen ihren Index bei der ersten Anfrage. Ein Reload baut vor dem
+        # Tausch genau die Indizes nach, die bis dahin benutzt wurden.
+        if dataset.in_memory or build in (peer_stats.get_peer_stats, ship_payloads.get_payload_store):
+            build(dataset)
+
+def _create_model():
+    # Modell einmalig initialisieren (WATSONX_STUB=1 => lokales Stub-Modell ohne Netzwerk)
+    return create_model(credentials, project_id, model_id, parameters)
+
+def _init_pdf():
+    # ReportLab, Logo und Styles vorbereiten
+    import report_gen
+    report_gen.init_generator()
+    return report_gen
+
+dataset_component = LazyComponent("dataset", _load_dataset)
+model_component = LazyComponent("model", _create_model)
+pdf_component = LazyComponent("pdf", _init_pdf)
+COMPONENTS = (dataset_component, pdf_component, model_component)
+
+if os.getenv("APP_BACKGROUND_INIT", "1") == "1":
+    for component in COMPONENTS:
+        component.start_background()
+
+def _unavailable(e):
+    return jsonify({"success": False, "error": str(e)}), 503
+
+def _current_dataset():
+    # Pro Anfrage einmal holen: ein Reload während der Anfrage tauscht nur die globale Referenz
+    return dataset_component.get().get_dataset()
+
+def _has_record(imo, year=None):
+    # Vor dem PDF-Rendern prüfen: sonst scheitert es erst tief im Layout mit 500
+    return _current_dataset().get_record(imo, year) is not None
+
+def _ship_not_found():
+    return jsonify({"found": False, "message": "Schiff nicht gefunden"}), 404
+
+def _peer_stats(imo, year=None):
+    """
+    Vergleichsgruppe eines Schiffs (vorberechnet), wartet auf die Datenbank.
+
+    Nicht ohne Vergleichsgruppe weitermachen: der Prompt wäre ein anderer und
+    würde weder LLM-Cache noch vorberechnete Bewertungen treffen
+    (raises ComponentUnavailable).
+    """
+    if not imo:
+        return None
+    from peer_stats import get_peer_stats
+    return get_peer_stats(_current_dataset()).lookup(imo, year)
+
+def _parse_year(value):
+    """Berichtsjahr aus Query/JSON, None = neuestes Jahr (raises ValueError)"""
+    if value is None or value == '':
+        return None
+    return int(value)
+
+def _parse_count(value, default: int, maximum: int):
+    """Anzahl (limit, k) aus der Query, 1..maximum (raises ValueError)"""
+    if value is None or value == '':
+        return default
+    count = int(value)
+    if not 1 <= count <= maximum:
+        raise ValueError(f"muss zwischen 1 und {maximum} liegen")
+    return count
+
+# Cache für generierte Bewertungen (In-Memory + Datei)
+llm_cache = LLMCache()
+# Vorab erzeugte Bewertungen (batch_assessments.py), werden ohne Modellaufruf geliefert
+assessment_store = AssessmentStore()
+
+def _cached_text(cache_key):
+    text = assessment_store.get(cache_key)
+    return text if text is not None else llm_cache.get(cache_key)
+
+# --- MESSUNG: Request-ID, Dauer pro Anfrage und Stufe (siehe metrics.py) ---
+@app.before_request
+def _begin_request():
+    metrics.begin_request(metrics.request_id(request.headers.get('X-Request-ID')))
+
+def _request_route():
+    # Routen-Muster statt Pfad, damit die Label-Anzahl begrenzt bleibt
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+@app.after_request
+def _tag_response(response):
+    metrics.set_status(response.status_code)
+    response.headers['X-Request-ID'] = metrics.current_request_id() or ''
+    if response.is_streamed and not response.direct_passthrough:
+        # Generator-Streams (SSE): erst nach dem letzten Byte abschließen, damit
+        # die Stufen während des Streams (report.llm_stream) mitgezählt werden
+        ctx = metrics.defer_request()
+        route, method, path = _request_route(), request.method, request.path
+        response.call_on_close(lambda: metrics.end_request(route, method, path, ctx))
+    return response
+
+@app.teardown_request
+def _end_request(exc=None):
+    metrics.end_request(_request_route(), request.method, request.path)
+
+# Latenz-Histogramme, laufende Aufrufe, Fehler und Tokens pro Stufe
+@app.route('/metrics')
+def metrics_route():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 # 1. Route: Liefert deine HTML-Seite aus (Frontend)
 @app.route('/')
 def serve_index():
     return send_from_directory('public', 'index.html')
 
+# Liveness: Prozess läuft und beantwortet Anfragen
+@app.route('/healthz')
+def healthz():
+    return jsonify({"status": "ok"})
+
+# Readiness: welche Komponenten sind fertig initialisiert
+@app.route('/readyz')
+def readyz():
+    import ship_data
+    # Erstes Laden fehlgeschlagen, inzwischen hat der Reloader eine Datenbank geladen
+    if not dataset_component.ready and not dataset_component.status()["loading"] and ship_data.is_loaded():
+        dataset_component.start_background()
+    components = {c.name: c.status() for c in COMPONENTS}
+    ready = all(c.ready for c in COMPONENTS)
+    return jsonify({"ready": ready, "components": components}), (200 if ready else 503)
+
 #2. Route: API für die Schiffssuche aus der Parquet-Datei
 @app.route('/api/search-ship', methods=['GET'])
 def search_ship():
     imo = request.args.get('imo')
+    try:
+        year = _parse_year(request.args.get('year'))
+    except ValueError:
+        return jsonify({"error": "Ungültiges Berichtsjahr"}), 400
     
-    if df.empty:
+    try:
+        dataset = _current_dataset()
+    except ComponentUnavailable:
         return jsonify({"error": "Datenbank nicht geladen"}), 500
         
-    # Suche im DataFrame
-    # ACHTUNG: Passe 'imo' an deinen Spaltennamen an!
-    ship_row = df[df['imo'] == imo]
+    # Fertig serialisierte Antwort (IMO-Index, NaN -> null und Vergleichsgruppe
+    # einmal pro Datenstand vorberechnet, siehe ship_payloads.py)
+    from ship_payloads import get_payload_store
+    with metrics.stage("search.lookup") as timing:
+        store = get_payload_store(dataset)
+        body = store.get(imo, year)
+    lookup_ms = timing.seconds * 1000
     
-    if ship_row.empty:
-        return jsonify({"found": False, "message": "Schiff nicht gefunden"}), 404
+    if body is None:
+        response, status = _ship_not_found()
+        response.headers['Server-Timing'] = f"lookup;dur={lookup_ms:.3f}"
+        return response, status
 
-    # Konvertiere die erste gefundene Zeile in ein Dictionary (JSON)
-    ship_data = ship_row.iloc[0].to_dict()
-    
-    # NaN (leere Werte) durch null ersetzen, damit JSON valide bleibt
-    ship_data = {k: (None if pd.isna(v) else v) for k, v in ship_data.items()}
-    
-    return jsonify({"found": True, "data": ship_data})
+    response = Response(body, mimetype='application/json')
+    # ETag an Datenstand + Anfrage gebunden: nach einem Reload ändert sich die Version
+    response.set_etag(f"{store.version}-{imo.strip()}-{year or 'latest'}")
+    if store.last_modified is not None:
+        response.last_modified = store.last_modified
+    response.headers['Cache-Control'] = SEARCH_CACHE_CONTROL
+    # Lookup-Zeit im Browser (DevTools -> Timing) sichtbar machen
+    response.headers['Server-Timing'] = f"lookup;dur={lookup_ms:.3f}"
+    # If-None-Match / If-Modified-Since -> 304 ohne Body
+    return response.make_conditional(request)
+
+# Route: Autocomplete über Schiffsnamen und IMO-Präfixe (Vorschläge pro Tastendruck)
+@app.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    query = request.args.get('q', '')
+    from ship_search import DEFAULT_LIMIT, MAX_LIMIT
+    try:
+        limit = _parse_count(request.args.get('limit'), DEFAULT_LIMIT, MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": f"Ungültiges Limit (1 bis {MAX_LIMIT})"}), 400
+    try:
+        dataset = _current_dataset()
+    except ComponentUnavailable:
+        return jsonify({"error": "Datenbank nicht geladen"}), 500
+
+    from ship_search import get_name_index
+    start = time.perf_counter()
+    results = get_name_index(dataset).search(query, limit)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    response = jsonify({"query": query, "results": results})
+    response.headers['Server-Timing'] = f"search;dur={search_ms:.3f}"
+    return response
+
+# Route: k ähnlichste Schiffe (Abmessungen + Betriebsprofil) für Plausibilitätsprüfungen
+@app.route('/api/similar-vessels', methods=['GET'])
+def similar_vessels_route():
+    imo = request.args.get('imo')
+    if not imo:
+        return jsonify({"error": "Parameter 'imo' fehlt"}), 400
+    from similar_vessels import DEFAULT_K, MAX_K
+    try:
+        year = _parse_year(request.args.get('year'))
+    except ValueError:
+        return jsonify({"error": "Ungültiges Berichtsjahr"}), 400
+    try:
+        k = _parse_count(request.args.get('k'), DEFAULT_K, MAX_K)
+    except ValueError:
+        return jsonify({"error": f"Ungültiges k (1 bis {MAX_K})"}), 400
+    try:
+        dataset = _current_dataset()
+    except ComponentUnavailable:
+        return jsonify({"error": "Datenbank nicht geladen"}), 500
+
+    from similar_vessels import get_similar_index
+    start = time.perf_counter()
+    index = get_similar_index(dataset)
+    result = index.find(imo, k, year)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    if result is None:
+        return _ship_not_found()
+    response = jsonify({"found": True, "features": index.features, "backend": index.backend, **result})
+    response.headers['Server-Timing'] = f"knn;dur={search_ms:.3f}"
+    return response
+
+# Route: Flag-Regeln (Defaults = Regeln der Parquet-Datei) und What-if mit eigenen Schwellwerten
+@app.route('/api/flags/rules', methods=['GET'])
+def flag_rules():
+    from flag_engine import ABS_GROUPS, DEFAULT_RULES, FlagReason, REASON_LABELS
+    return jsonify({
+        "defaults": DEFAULT_RULES,
+        "abs_groups": list(ABS_GROUPS),
+        "labels": {reason.name.lower(): REASON_LABELS[reason] for reason in FlagReason},
+    })
+
+@app.route('/api/flags/what-if', methods=['POST'])
+def flag_what_if():
+    payload = request.get_json(silent=True) or {}
+    rules = payload.get('rules') or {}
+    if not isinstance(rules, dict):
+        return jsonify({"error": "Feld 'rules' muss ein Objekt sein"}), 400
+    try:
+        year = _parse_year(payload.get('year'))
+        max_changed = int(payload.get('max_changed', 50))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Ungültiges Berichtsjahr oder max_changed"}), 400
+    try:
+        dataset = _current_dataset()
+    except ComponentUnavailable:
+        return jsonify({"error": "Datenbank nicht geladen"}), 500
+
+    from flag_engine import get_flag_engine
+    start = time.perf_counter()
+    try:
+        result = get_flag_engine(dataset).what_if(rules, year, max_changed)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    eval_ms = (time.perf_counter() - start) * 1000
+
+    response = jsonify(result)
+    response.headers['Server-Timing'] = f"flags;dur={eval_ms:.3f}"
+    return response
+
+# Route: Batch-Suche für Flottenscreening (viele IMOs in einer Anfrage)
+MAX_BATCH_IMOS = 5000
+
+@app.route('/api/search-ships', methods=['POST'])
+def search_ships():
+    payload = request.get_json(silent=True) or {}
+    imos = payload.get('imos')
+
+    if not isinstance(imos, list) or not imos:
+        return jsonify({"error": "Feld 'imos' (Liste von IMO-Nummern) fehlt"}), 400
+    if len(imos) > MAX_BATCH_IMOS:
+        return jsonify({"error": f"Maximal {MAX_BATCH_IMOS} IMOs pro Anfrage"}), 413
+    try:
+        year = _parse_year(payload.get('year'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Ungültiges Berichtsjahr"}), 400
+    try:
+        dataset = _current_dataset()
+    except ComponentUnavailable:
+        return jsonify({"error": "Datenbank nicht geladen"}), 500
+
+    start = time.perf_counter()
+    records = dataset.get_records(imos, year)
+    lookup_ms = (time.perf_counter() - start) * 1000
+
+    results = []
+    for imo, ship_data in zip(imos, records):
+        if ship_data is None:
+            results.append({"imo": imo, "found": False})
+        else:
+            results.append({"imo": imo, "found": True, "data": ship_data})
+
+    found = sum(1 for r in records if r is not None)
+    response = jsonify({"found": found, "missing": len(records) - found, "results": results})
+    response.headers['Server-Timing'] = f"lookup;dur={lookup_ms:.3f}"
+    return response
+
+# Route: Export gefilterter Schiffsdaten als CSV / Arrow IPC / Parquet (gestreamt, siehe ship_export.py)
+@app.route('/api/export', methods=['GET'])
+def export_ships():
+    try:
+        dataset = _current_dataset()
+    except ComponentUnavailable:
+        return jsonify({"error": "Datenbank nicht geladen"}), 500
+
+    import ship_export
+    try:
+        fmt, columns, filters = ship_export.parse_query(request.args.to_dict(flat=False), dataset.columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Der Generator behält diesen Datenstand, ein Reload während des Downloads tauscht nur die globale Referenz
+    return Response(
+        stream_with_context(ship_export.stream_export(dataset, fmt, columns, filters)),
+        mimetype=ship_export.FORMATS[fmt][0],
+        headers={
+            'Content-Disposition': f'attachment; filename="{ship_export.export_filename(dataset, fmt)}"',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+def _build_prompt(data: dict) -> str:
+    # Prompt inkl. Vergleichsgruppe, falls die IMO in der Datenbank steht
+    return build_prompt(data, _peer_stats(data.get('imo'), data.get('report_year')))
+
+def generate_assessment(data: dict):
+    """Bewertungstext für eine Schiffszeile, liefert (text, cached)"""
+    with metrics.stage("report.prompt"):
+        prompt = _build_prompt(data)
+
+    # Gleicher Prompt + gleiche Parameter => gleicher Text (greedy), also aus dem Cache liefern
+    cache_key = make_key(model_id, parameters, prompt)
+    with metrics.stage("report.cache"):
+        cached_text = _cached_text(cache_key)
+    if cached_text is not None:
+        return cached_text, True
+
+    model = model_component.get()
+    # raw_response: WatsonX meldet die Token-Anzahl von Prompt und Antwort mit
+    with metrics.stage("report.llm"):
+        generated_response = model.generate_text(prompt=prompt, raw_response=True)
+    metrics.count_tokens(*extract_token_counts(generated_response))
+    text_result = extract_text(generated_response)
+    if text_result:
+        llm_cache.put(cache_key, text_result)
+    return text_result, False
 
 # 3. Route: API für den Report
 @app.route('/api/generate-report', methods=['POST'])
@@ -92,70 +413,90 @@ def generate_report():
     if not raw:
         return jsonify({"success": False, "error": "No JSON payload"}), 400
 
-    # Normalize incoming keys to lowercase so we can access them reliably
-    data = {str(k).lower(): v for k, v in raw.items()}
+    data = normalize_payload(raw)
 
     ship_name = data.get('ship_name') or data.get('name') or ''
     imo = data.get('imo') or ''
-    mrv_ship_type = data.get('mrv_ship_type') or data.get('vesseltype') or ''
-    length = data.get('length') or data.get('length_m') or ''
-    width = data.get('width') or ''
-    draft = data.get('draft_m_median') or data.get('draft') or ''
-    report_year = data.get('report_year') or ''
-    ais_distance = data.get('ais_distance_nm_total') or ''
-    ais_time = data.get('ais_time_hours_total') or ''
-    sog_mean = data.get('sog_mean_kn') or ''
-    sog_p95 = data.get('sog_p95_kn') or ''
-    moving_share = data.get('moving_share') or ''
-    y_mrv = data.get('y_mrv_co2_per_nm_kg') or ''
-    y_pred = data.get('y_pred_co2_per_nm_kg') or ''
-    residual_kg = data.get('residual_kg') or ''
-    residual_pctraw = data.get('residual_pct') or ''
-    residual_pct = residual_pctraw * 100 or '' 
-    flag_color = data.get('flag_color') or ''
-    flag_reason = data.get('flag_reason') or ''
 
     print(f"Anfrage erhalten für: {ship_name} (IMO: {imo})")
 
-    prompt = f"""You are an expert in maritime regulations and data analysis in the context of the EU MRV and FuelEU Maritime regulations.
+    try:
+        text_result, cached = generate_assessment(data)
+        return jsonify({"success": True, "text": text_result, "cached": cached})
+    except ComponentUnavailable as e:
+        return _unavailable(e)
+    except Exception as e:
+        print("Fehler:", e)
+        return jsonify({"success": False, "error": str(e)}), 500
 
-                Analyze the following ship data for an official plausibility check:
+# Route: Report als Server-Sent Events (Tokens werden sofort weitergereicht)
+def _sse(payload: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
-            ### 1. Master data & dimensions
-				- Ship name: {ship_name} (IMO: {imo})
-				- Ship type: {mrv_ship_type}
-				- Dimensions: Length {length}m, width {width}m, draft {draft}m
+@app.route('/api/generate-report/stream', methods=['POST'])
+def generate_report_stream():
+    raw = request.get_json()
+    if not raw:
+        return jsonify({"success": False, "error": "No JSON payload"}), 400
 
-            ### 2. AIS movement profile (reporting year {report_year})
-				- Total distance traveled: {ais_distance} nm
-				- Operating time: {ais_time} h
-				- Average speed: {sog_mean} kn (high load operation P95: {sog_p95} kn)
-                - Time spent in motion: {moving_share}
+    data = normalize_payload(raw)
+    print(f"Stream-Anfrage erhalten für: {data.get('ship_name') or ''} (IMO: {data.get('imo') or ''})")
 
-            ### 3. Emission assessment (regression vs. MRV)
-				- Reported intensity (MRV): {y_mrv} kg CO2/nm
-				- Expected intensity (AI model): {y_pred} kg CO2/nm
-                - Deviation (residual): {residual_kg} kg ({residual_pct}%)
-				- Assessment: {flag_color}
-				- Reason for assessment: {flag_reason}
+    try:
+        with metrics.stage("report.prompt"):
+            prompt = _build_prompt(data)
+    except ComponentUnavailable as e:
+        return _unavailable(e)
+    cache_key = make_key(model_id, parameters, prompt)
 
-            ### Your task:
-				1. Create a concise summary of the operating profile (size, activity, speed).
-				2. Evaluate the status of the “flag_color”:
-				- If GREEN: Confirm the plausibility of the reported data in comparison to the AI model.
-                - If RED: Explain the anomaly based on the “flag_reason” and point out the legal consequences of an incorrect MRV report.
-				3. Provide a brief recommendation for the inspector.
+    # Cache-Treffer brauchen kein Modell, sonst vor dem Stream prüfen
+    if not model_component.ready and _cached_text(cache_key) is None:
+        try:
+            model_component.get()
+        except ComponentUnavailable as e:
+            return _unavailable(e)
 
-				Respond in a structured, professional manner and in English."""
+    def events():
+        cached_text = _cached_text(cache_key)
+        if cached_text is not None:
+            yield _sse({"text": cached_text})
+            yield _sse({"success": True, "cached": True}, event="done")
+            return
+
+        parts = []
+        try:
+            # Dauer bis zum letzten Token; jeder Stream-Abschnitt zählt als ein Token
+            with metrics.stage("report.llm_stream"):
+                for chunk in model_component.get().generate_text_stream(prompt=prompt):
+                    if not chunk:
+                        continue
+                    parts.append(chunk)
+                    yield _sse({"text": chunk})
+        except Exception as e:
+            print("Fehler (Stream):", e)
+            yield _sse({"success": False, "error": str(e)}, event="error")
+            return
+        finally:
+            metrics.count_tokens(generated=len(parts))
+
+        text_result = "".join(parts)
+        if text_result:
+            llm_cache.put(cache_key, text_result)
+        yield _sse({"success": True, "cached": False}, event="done")
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        # Kein Buffering durch Browser-Cache oder Reverse-Proxy (nginx)
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Route: Hit/Miss-Zähler des LLM-Caches
+@app.route('/api/llm-cache', methods=['GET'])
+def llm_cache_stats():
+    return jsonify({**llm_cache.stats(), "stored_assessments": len(assessment_store)})
 
-    try:
-        generated_response = model.generate_text(prompt=prompt)
-        text_result = generated_response if isinstance(generated_response, str) else generated_response.get('results', [{}])[0].get('generated_text', '')
-        return jsonify({"success": True, "text": text_result})
-    except Exception as e:
-        print("Fehler:", e)
-        return jsonify({"success": False, "error": str(e)}), 500
-    
 # 4. NEUE ROUTE FÜR PDF DOWNLOAD HINZUFÜGEN
 @app.route('/api/download-pdf', methods=['POST'])
 def download_pdf():
@@ -165,20 +506,112 @@ def download_pdf():
     
     if not imo or not text:
         return jsonify({"error": "Fehlende Daten (IMO oder Text)"}), 400
+    try:
+        year = _parse_year(data.get('year'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Ungültiges Berichtsjahr"}), 400
+
+    try:
+        if not _has_record(imo, year):
+            return _ship_not_found()
+    except ComponentUnavailable as e:
+        return _unavailable(e)
 
     print(f"Erstelle PDF für IMO {imo}...")
     
     try:
-        # Hier rufen wir dein Skript 'report_gen.py' auf
-        pdf_path = generate_report_pdf(imo, text)
+        # Hier rufen wir dein Skript 'report_gen.py' auf (rendert im Speicher, mit Cache)
+        with metrics.stage("pdf.render"):
+            pdf_bytes = pdf_component.get().render_report_pdf(imo, text, year)
         
-        # Wir senden die Datei direkt an den Nutzer zurück
-        return send_file(pdf_path, as_attachment=True, download_name=f"FuelEU_Report_{imo}.pdf")
+        # Wir senden die Bytes direkt an den Nutzer zurück, ohne Datei auf der Platte
+        with metrics.stage("pdf.send_file"):
+            return send_file(io.BytesIO(pdf_bytes), mimetype='application/pdf',
+                             as_attachment=True, download_name=f"FuelEU_Report_{imo}.pdf")
         
+    except ComponentUnavailable as e:
+        return _unavailable(e)
     except Exception as e:
         print(f"PDF Fehler: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Route: Statistik des PDF-Caches
+@app.route('/api/pdf-cache', methods=['GET'])
+def pdf_cache_stats():
+    if not pdf_component.ready:
+        return jsonify({"entries": 0, "ready": False})
+    return jsonify(pdf_component.get().pdf_cache.stats())
+
+# 5. Asynchrone Jobs: Submit liefert sofort eine Job-ID, Status/Ergebnis per Polling
+job_queue = JobQueue()
+
+def _submit_job(kind, fn, *args, meta=None):
+    try:
+        job = job_queue.submit(kind, fn, *args, meta=meta)
+    except QueueFullError as e:
+        # Überlast, kein Ausfall: 429, der Client soll es später erneut versuchen
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers['Retry-After'] = str(QUEUE_FULL_RETRY_AFTER_SECONDS)
+        return response, 429
+    return jsonify({"success": True, "job": job.to_dict()}), 202
+
+@app.route('/api/jobs/report', methods=['POST'])
+def submit_report_job():
+    raw = request.get_json(silent=True)
+    if not raw:
+        return jsonify({"success": False, "error": "No JSON payload"}), 400
+    data = normalize_payload(raw)
+    return _submit_job("report", generate_assessment, data, meta={"imo": data.get('imo')})
+
+def _render_pdf_job(imo, text, year=None):
+    return pdf_component.get().render_report_pdf(imo, text, year)
+
+@app.route('/api/jobs/pdf', methods=['POST'])
+def submit_pdf_job():
+    data = request.get_json(silent=True) or {}
+    imo = data.get('imo')
+    text = data.get('text')
+    if not imo or not text:
+        return jsonify({"error": "Fehlende Daten (IMO oder Text)"}), 400
+    try:
+        year = _parse_year(data.get('year'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Ungültiges Berichtsjahr"}), 400
+    try:
+        if not _has_record(imo, year):
+            return _ship_not_found()
+    except ComponentUnavailable as e:
+        return _unavailable(e)
+    return _submit_job("pdf", _render_pdf_job, imo, text, year, meta={"imo": imo, "year": year})
+
+@app.route('/api/jobs', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job nicht gefunden"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job nicht gefunden"}), 404
+    if not job.finished:
+        return jsonify(job.to_dict()), 202
+    if job.status != "done":
+        return jsonify({"success": False, **job.to_dict()}), 500
+
+    if job.kind == "report":
+        text_result, cached = job.result
+        return jsonify({"success": True, "text": text_result, "cached": cached})
+
+    return send_file(io.BytesIO(job.result), mimetype='application/pdf',
+                     as_attachment=True, download_name=f"FuelEU_Report_{job.meta.get('imo')}.pdf")
+
 if __name__ == '__main__':
     print("Server läuft auf http://localhost:5000")
     app.run(port=5000, debug=True)
\ No newline at end of file
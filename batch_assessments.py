@@ -0,0 +1,277 @@
+# batch_assessments.py
+"""
+KI-Bewertungen für viele Schiffe vorab erzeugen (z.B. alle RED-Schiffe vor einer Prüfkampagne).
+
+Gleicher Prompt wie /api/generate-report: Werte gerundet wie im Browser,
+Vergleichsgruppe aus peer_stats. Die Prompts gehen als Liste an
+model.generate_text, das WatsonX-SDK schickt davon bis zu concurrency_limit
+gleichzeitig ab. Nach jedem Batch werden die Texte an eine JSONL-Datei
+angehängt; ein abgebrochener Lauf setzt beim nächsten Start dort fort.
+
+Die App liest dieselbe Datei (AssessmentStore) und beantwortet
+/api/generate-report für diese Schiffe sofort, ohne Modellaufruf.
+Schlüssel ist der LLM-Cache-Key (Modell, Parameter, Prompt): ändern sich
+die Daten eines Schiffs oder das Template, wird der Eintrag nicht mehr
+getroffen und beim nächsten Lauf neu erzeugt.
+
+Usage: python batch_assessments.py [--flag-color RED] [--year 2024] [--batch-size 32] [--concurrency 8]
+       WATSONX_STUB=1 python batch_assessments.py --limit 20     (lokal, ohne WatsonX)
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import metrics
+from ai_report import (MODEL_ID, PARAMETERS, build_prompt, create_model, extract_text, extract_token_counts,
+                       normalize_payload, round_payload)
+from llm_cache import make_key
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+STORE_PATH = os.getenv("ASSESSMENT_STORE", "assessments.jsonl")
+# Prompts pro generate_text-Aufruf = Einträge pro Checkpoint
+BATCH_SIZE = 32
+# Parallele Anfragen innerhalb eines Batches (WatsonX-SDK: höchstens 10)
+CONCURRENCY_LIMIT = 8
+# So oft prüft die App, ob der Runner neue Zeilen angehängt hat
+REFRESH_SECONDS = 2.0
+# ============================================================================
+
+
+class AssessmentStore:
+    """
+    Vorberechnete Bewertungen aus einer JSONL-Datei (eine Zeile pro Schiff und Jahr).
+
+    Die Datei wird nur angehängt. Neue Zeilen liest get() höchstens alle
+    refresh_seconds nach, die App sieht einen laufenden Batch also ohne
+    Neustart. Eine halb geschriebene letzte Zeile wird erst gelesen, wenn
+    sie vollständig ist.
+    """
+
+    def __init__(self, path=STORE_PATH, refresh_seconds: float = REFRESH_SECONDS):
+        self.path = Path(path) if path else None
+        self.refresh_seconds = refresh_seconds
+        self._texts = {}  # Cache-Key -> Text
+        self._offset = 0
+        self._identity = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        """Seit dem letzten Lesen angehängte Zeilen übernehmen"""
+        if self.path is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked < self.refresh_seconds:
+                return
+            self._checked = now
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                self._texts, self._offset, self._identity = {}, 0, None
+                return
+            # Ersetzte oder gekürzte Datei: komplett neu lesen
+            identity = (stat.st_dev, stat.st_ino)
+            if identity != self._identity or stat.st_size < self._offset:
+                self._texts, self._offset, self._identity = {}, 0, identity
+            if stat.st_size == self._offset:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("key") and entry.get("text"):
+                    self._texts[entry["key"]] = entry["text"]
+            self._offset += end
+
+    def get(self, key: str):
+        """Gespeicherten Text liefern oder None"""
+        self.refresh()
+        return self._texts.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._texts)
+
+    def append(self, entries: list):
+        """Einträge anhängen und auf die Platte bringen (Checkpoint nach jedem Batch)"""
+        if not entries:
+            return
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh(force=True)
+
+
+# ============================================================================
+# AUSWAHL UND PROMPTS
+# ============================================================================
+
+def select_rows(dataset, flag_color: str = "RED", ship_type: str = None, year: int = None, imos=None) -> list:
+    """(IMO, Berichtsjahr) aller passenden Zeilen, ein Schiff kann in mehreren Jahren auffallen"""
+    df = dataset.read_columns(['imo', 'report_year', 'flag_color', 'mrv_ship_type'])
+    mask = df['imo'].notna()
+    if flag_color:
+        mask &= df['flag_color'].str.upper() == flag_color.upper()
+    if ship_type:
+        mask &= df['mrv_ship_type'] == ship_type
+    if year is not None:
+        mask &= df['report_year'] == year
+    if imos:
+        mask &= df['imo'].isin({str(i).strip() for i in imos})
+    selected = df.loc[mask, ['imo', 'report_year']]
+    return list(dict.fromkeys(zip(selected['imo'].tolist(), selected['report_year'].astype(int).tolist())))
+
+
+def build_jobs(dataset, rows) -> list:
+    """Prompt und Cache-Key pro Zeile, genau wie bei einer Anfrage aus dem Browser"""
+    from peer_stats import get_peer_stats
+    peers = get_peer_stats(dataset)
+    jobs = {}
+    for imo, year in rows:
+        record = dataset.get_json_record(imo, year)
+        if record is None:
+            continue
+        # Der Browser rundet alle Zahlen (roundNumbers) bevor er sie an die API schickt
+        data = round_payload(normalize_payload(record))
+        prompt = build_prompt(data, peers.lookup(data.get('imo'), data.get('report_year')))
+        key = make_key(MODEL_ID, PARAMETERS, prompt)
+        jobs.setdefault(key, {
+            "key": key,
+            "imo": data.get('imo'),
+            "report_year": data.get('report_year'),
+            "ship_name": data.get('ship_name'),
+            "flag_color": data.get('flag_color'),
+            "prompt": prompt,
+        })
+    return list(jobs.values())
+
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+def run_assessments(jobs, store: AssessmentStore, model, batch_size: int = BATCH_SIZE,
+                    concurrency_limit: int = CONCURRENCY_LIMIT) -> dict:
+    """
+    Fehlende Bewertungen erzeugen und nach jedem Batch im Store sichern.
+
+    Bereits gespeicherte Keys werden übersprungen. Schlägt ein Batch fehl,
+    werden seine Schiffe als Fehler gezählt und der Lauf geht weiter; ein
+    erneuter Start holt sie nach.
+    """
+    todo = [job for job in jobs if job["key"] not in store]
+    skipped = len(jobs) - len(todo)
+    print(f"{len(jobs)} Bewertungen ausgewählt, {skipped} bereits gespeichert, {len(todo)} zu erzeugen "
+          f"(Batches à {batch_size}, {concurrency_limit} parallel)")
+
+    done = 0
+    failed = []
+    tokens = {"prompt": 0, "generated": 0}
+    start = time.perf_counter()
+
+    for offset in range(0, len(todo), batch_size):
+        batch = todo[offset:offset + batch_size]
+        try:
+            with metrics.stage("batch.llm"):
+                responses = model.generate_text(prompt=[job["prompt"] for job in batch],
+                                                concurrency_limit=concurrency_limit, raw_response=True)
+        except Exception as e:
+            print(f"FEHLER im Batch ab IMO {batch[0]['imo']}: {e}")
+            failed.extend((job["imo"], str(e)) for job in batch)
+            continue
+
+        entries = []
+        for job, response in zip(batch, responses):
+            text = extract_text(response)
+            if not text:
+                failed.append((job["imo"], "empty response"))
+                continue
+            prompt_tokens, generated_tokens = extract_token_counts(response)
+            metrics.count_tokens(prompt_tokens, generated_tokens)
+            tokens["prompt"] += prompt_tokens or 0
+            tokens["generated"] += generated_tokens or 0
+            entries.append({
+                **{field: job[field] for field in ("key", "imo", "report_year", "ship_name", "flag_color")},
+                "model_id": MODEL_ID,
+                "text": text,
+                "prompt_tokens": prompt_tokens,
+                "generated_tokens": generated_tokens,
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            })
+        store.append(entries)
+        done += len(entries)
+
+        elapsed = time.perf_counter() - start
+        print(f"  {done}/{len(todo)} Bewertungen ({done / elapsed:.1f}/s, {tokens['generated']} Tokens erzeugt)")
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Fertig: {done} erzeugt, {skipped} übersprungen, {len(failed)} Fehler in {elapsed:.1f}s "
+          f"({rate:.1f} Bewertungen/s)")
+    return {"generated": done, "skipped": skipped, "failed": failed, "seconds": elapsed,
+            "assessments_per_sec": rate, "tokens": tokens}
+
+
+# ============================================================================
+# TERMINAL
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flag-color", default="RED", help="Only ships with this flag_color (default: RED, '' = all)")
+    parser.add_argument("--ship-type", help="Only ships with this mrv_ship_type")
+    parser.add_argument("--year", type=int, help="Only this report year (default: all years)")
+    parser.add_argument("--imos", help="Comma separated IMO list")
+    parser.add_argument("--store", default=STORE_PATH, help=f"JSONL store (default: {STORE_PATH})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Prompts per call = checkpoint interval")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY_LIMIT, help="Parallel requests per batch (max 10)")
+    parser.add_argument("--limit", type=int, help="Only the first N selected ships (trial run)")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from ship_data import get_dataset
+    load_dotenv()
+
+    dataset = get_dataset()
+    if dataset.empty:
+        print("FEHLER: Datenbank nicht geladen.")
+        return 1
+
+    imos = [i.strip() for i in args.imos.split(",") if i.strip()] if args.imos else None
+    rows = select_rows(dataset, args.flag_color, args.ship_type, args.year, imos)
+    if args.limit:
+        rows = rows[:args.limit]
+    if not rows:
+        print("Keine Schiffe für diese Auswahl gefunden.")
+        return 1
+
+    jobs = build_jobs(dataset, rows)
+    result = run_assessments(jobs, AssessmentStore(args.store), create_model(),
+                             args.batch_size, min(args.concurrency, 10))
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
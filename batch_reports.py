@@ -0,0 +1,183 @@
+# batch_reports.py
+"""Massen-PDF-Erzeugung für Audits (z.B. alle Schiffe mit flag_color == 'RED')"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from ship_data import get_dataset
+
+
+DEFAULT_TEXT = (
+    "This report was generated automatically as part of a fleet audit.\n\n"
+    "Please review the master data, the AIS movement profile and the emissions "
+    "assessment in the following sections."
+)
+
+
+def report_filename(imo: str) -> str:
+    return f"Ship_Report_{imo}.pdf"
+
+
+def select_imos(dataset, imos=None, flag_color=None, ship_type=None) -> list:
+    """IMO-Liste aus expliziter Angabe und/oder Filtern auf der Datenbank"""
+    df = dataset.read_columns(['imo', 'flag_color', 'mrv_ship_type'])
+    mask = None
+    if flag_color:
+        mask = df['flag_color'].str.upper() == flag_color.upper()
+    if ship_type:
+        type_mask = df['mrv_ship_type'] == ship_type
+        mask = type_mask if mask is None else mask & type_mask
+
+    selected = df['imo'] if mask is None else df.loc[mask, 'imo']
+    if imos:
+        wanted = {str(i).strip() for i in imos}
+        selected = selected[selected.isin(wanted)]
+    # Eine IMO kann in mehreren Jahren vorkommen, PDF gibt es pro IMO (neuestes Jahr)
+    return list(dict.fromkeys(selected.tolist()))
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def _init_worker():
+    # Jeder Worker lädt Datenbank, Logo und Styles genau einmal
+    from report_gen import init_generator
+    init_generator()
+
+
+def _render_one(imo: str, report_text: str):
+    from report_gen import init_generator
+    try:
+        return imo, init_generator().render_pdf_bytes(imo, report_text), None
+    except Exception as e:
+        return imo, None, str(e)
+
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+def run_batch(imos, out_dir: Path, report_text: str = DEFAULT_TEXT, workers: int = None,
+              zip_path: Path = None) -> dict:
+    """
+    Reports parallel rendern und in out_dir ablegen.
+
+    Bereits vorhandene PDFs werden übersprungen, ein abgebrochener Lauf kann
+    also einfach erneut gestartet werden. Dateien werden erst unter einem
+    temporären Namen geschrieben und dann umbenannt, halbe PDFs bleiben so
+    nicht liegen.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    todo = [imo for imo in imos if not (out_dir / report_filename(imo)).exists()]
+    skipped = len(imos) - len(todo)
+    print(f"{len(imos)} Reports ausgewählt, {skipped} bereits vorhanden, {len(todo)} zu erzeugen ({workers} Worker)")
+
+    done = 0
+    failed = []
+    start = time.perf_counter()
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_render_one, imo, report_text) for imo in todo]
+            for future in as_completed(futures):
+                imo, pdf_bytes, error = future.result()
+                if error:
+                    failed.append((imo, error))
+                    print(f"FEHLER bei IMO {imo}: {error}")
+                    continue
+
+                target = out_dir / report_filename(imo)
+                tmp = target.with_suffix('.pdf.tmp')
+                tmp.write_bytes(pdf_bytes)
+                tmp.replace(target)
+                done += 1
+
+                if done % 50 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"  {done}/{len(todo)} Reports ({done / elapsed:.1f} reports/sec)")
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Fertig: {done} erzeugt, {skipped} übersprungen, {len(failed)} Fehler in {elapsed:.1f}s ({rate:.1f} reports/sec)")
+
+    if zip_path:
+        zip_path = Path(zip_path)
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for imo in imos:
+                pdf = out_dir / report_filename(imo)
+                if pdf.exists():
+                    zf.write(pdf, arcname=pdf.name)
+        print(f"ZIP erstellt: {zip_path}")
+
+    return {"generated": done, "skipped": skipped, "failed": failed, "seconds": elapsed, "reports_per_sec": rate}
+
+
+# ============================================================================
+# TERMINAL
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python report_gen.py batch",
+        description="Generate PDF reports for many ships in parallel."
+    )
+    parser.add_argument("--imos", help="Comma separated IMO list")
+    parser.add_argument("--imo-file", help="Text file with one IMO per line")
+    parser.add_argument("--flag-color", help="Only ships with this flag_color (e.g. RED)")
+    parser.add_argument("--ship-type", help="Only ships with this mrv_ship_type")
+    parser.add_argument("--out", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--zip", help="Additionally pack all PDFs into this zip file")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--text", help="Report text used for every ship")
+    parser.add_argument("--text-file", help="File with the report text used for every ship")
+    parser.add_argument("--fleet-pdf", help="Write one consolidated fleet report to this file instead of one PDF per ship")
+    args = parser.parse_args(argv)
+
+    imos = []
+    if args.imos:
+        imos.extend(i.strip() for i in args.imos.split(",") if i.strip())
+    if args.imo_file:
+        imos.extend(l.strip() for l in Path(args.imo_file).read_text().splitlines() if l.strip())
+    if not imos and not args.flag_color and not args.ship_type:
+        parser.error("Please give --imos/--imo-file or a filter (--flag-color/--ship-type)")
+
+    report_text = DEFAULT_TEXT
+    if args.text_file:
+        report_text = Path(args.text_file).read_text(encoding="utf-8")
+    elif args.text:
+        report_text = args.text
+
+    dataset = get_dataset()
+    if dataset.empty:
+        print("FEHLER: Datenbank nicht geladen.")
+        return 1
+
+    selected = select_imos(dataset, imos or None, args.flag_color, args.ship_type)
+    if not selected:
+        print("Keine Schiffe für diese Auswahl gefunden.")
+        return 1
+
+    if args.fleet_pdf:
+        from report_gen import render_fleet_report_pdf
+        start = time.perf_counter()
+        pdf_bytes = render_fleet_report_pdf(selected)
+        Path(args.fleet_pdf).write_bytes(pdf_bytes)
+        print(f"Flotten-Report erstellt: {args.fleet_pdf} ({len(selected)} Schiffe, "
+              f"{len(pdf_bytes) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+        return 0
+
+    result = run_batch(selected, Path(args.out), report_text, args.workers, args.zip)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
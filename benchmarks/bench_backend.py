@@ -0,0 +1,130 @@
+# benchmarks/bench_backend.py
+"""
+Vergleich der Datenbank-Backends: pandas (komplette Tabelle) vs. arrow (memory-mapped).
+
+Jedes Backend läuft in einem eigenen Prozess. Gemessen werden RSS nach dem
+Laden (VmRSS, memory-mapped Seiten zählen nur, wenn sie gelesen wurden),
+Ladezeit sowie Latenz einzelner IMO-Lookups (p50/p99) und eines Batch-Lookups.
+Dazu der Speicher der ganzen App: "ready" = mit den Indizes, die app.py beim
+Start aufbaut, "all" = nachdem auch Autocomplete, ähnliche Schiffe und
+What-if benutzt wurden. Nur die Tabelle selbst spart das Arrow-Backend ein.
+Die sortierte Arrow-Datei wird vorab einmal erzeugt und nicht mitgemessen.
+
+Usage: python benchmarks/bench_backend.py [--parquet PATH] [--lookups 2000] [--batch 1000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _measure(backend: str, parquet: str, n_lookups: int, n_batch: int):
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    os.environ["APP_BACKGROUND_INIT"] = "0"
+    os.environ["SHIP_DATA_RELOAD_SECONDS"] = "0"
+    import pyarrow.parquet as pq
+    import app as app_module
+    import flag_engine
+    import similar_vessels
+    import ship_search
+    from ship_data import create_dataset
+
+    # IMO-Stichprobe vor dem Laden bestimmen und danach wieder freigeben
+    names = pq.read_schema(parquet).names
+    imo_col = next(c for c in names if c.lower() == "imo")
+    imos = [str(i) for i in pq.read_table(parquet, columns=[imo_col]).column(0).to_pylist()]
+    random.seed(42)
+    sample = [random.choice(imos) for _ in range(n_lookups)]
+    batch = random.sample(imos, min(n_batch, len(imos)))
+    del imos
+
+    before = _rss_mb()
+    start = time.perf_counter()
+    dataset = create_dataset(backend, parquet)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = _rss_mb() - before
+
+    for imo in sample[:50]:
+        dataset.get_json_record(imo)
+
+    timings = []
+    for imo in sample:
+        t = time.perf_counter()
+        dataset.get_json_record(imo)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+
+    t = time.perf_counter()
+    dataset.get_records(batch)
+    batch_ms = (time.perf_counter() - t) * 1e3
+    rss_after = _rss_mb() - before
+
+    app_module._build_indexes(dataset)
+    rss_ready = _rss_mb() - before
+    for build in (ship_search.get_name_index, similar_vessels.get_similar_index, flag_engine.get_flag_engine):
+        build(dataset)
+    rss_all = _rss_mb() - before
+
+    print(json.dumps({
+        "backend": backend,
+        "rows": len(dataset),
+        "load_s": round(load_seconds, 3),
+        "rss_loaded_mb": round(rss_loaded, 1),
+        "rss_after_mb": round(rss_after, 1),
+        "p50_ms": round(timings[len(timings) // 2] * 1e3, 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99)] * 1e3, 3),
+        "batch_ms": round(batch_ms, 1),
+        "rss_ready_mb": round(rss_ready, 1),
+        "rss_all_mb": round(rss_all, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parquet", default="ship_report_imo_2024.parquet")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _measure(args.child, args.parquet, args.lookups, args.batch)
+        return
+
+    # Sortierte Kopie einmal erzeugen, damit sie nicht in die Ladezeit eingeht
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    from ship_data_arrow import ArrowShipDataset
+    ArrowShipDataset(args.parquet)
+
+    print(f"{'backend':>8} {'rows':>8} {'load s':>7} {'RSS +MB':>8} {'after +MB':>10} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'batch ms':>9} {'ready +MB':>10} {'all +MB':>8}")
+    for backend in ("pandas", "arrow"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--parquet", args.parquet,
+             "--lookups", str(args.lookups), "--batch", str(args.batch)],
+            capture_output=True, text=True, check=True, env={**os.environ, "REQUEST_LOG": "0"}
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{r['backend']:>8} {r['rows']:>8} {r['load_s']:>7} {r['rss_loaded_mb']:>8} {r['rss_after_mb']:>10} "
+              f"{r['p50_ms']:>7} {r['p99_ms']:>7} {r['batch_ms']:>9} {r['rss_ready_mb']:>10} {r['rss_all_mb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
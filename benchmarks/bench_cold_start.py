@@ -0,0 +1,93 @@
+# benchmarks/bench_cold_start.py
+"""
+Kaltstart messen: Prozessstart -> erste ausgelieferte Seite (/) und -> /readyz == 200.
+
+Startet die App mehrmals als eigenen Prozess (ohne Debug-Reloader) und pollt,
+bis / bzw. /readyz antworten. Exit-Code 1, wenn der Median über dem Ziel liegt.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5] [--target 1.0] [--stub]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COLD_START_TARGET_S = 1.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _status(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=0.5) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def measure_once(stub: bool, timeout: float = 20.0) -> dict:
+    port = _free_port()
+    env = dict(os.environ)
+    if stub:
+        env["WATSONX_STUB"] = "1"
+    code = f"import app; app.app.run(port={port}, debug=False, use_reloader=False)"
+
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first_page = ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            if first_page is None and _status(f"http://127.0.0.1:{port}/") == 200:
+                first_page = time.perf_counter() - start
+            if first_page is not None and _status(f"http://127.0.0.1:{port}/readyz") == 200:
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"first_page": first_page, "ready": ready}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start of app.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=COLD_START_TARGET_S,
+                        help="Target for process spawn -> first served / in seconds")
+    parser.add_argument("--stub", action="store_true", help="Use the local stub model (WATSONX_STUB=1)")
+    args = parser.parse_args()
+
+    results = [measure_once(args.stub) for _ in range(args.runs)]
+    first = [r["first_page"] for r in results if r["first_page"] is not None]
+    ready = [r["ready"] for r in results if r["ready"] is not None]
+
+    if not first:
+        print("App hat nicht geantwortet.")
+        return 1
+
+    print(f"first served /   median {statistics.median(first):.3f}s  max {max(first):.3f}s  (target {args.target:.2f}s)")
+    if ready:
+        print(f"/readyz == 200   median {statistics.median(ready):.3f}s  max {max(ready):.3f}s")
+    else:
+        print("/readyz wurde nicht 200 (Modell/Datenbank nicht verfügbar?)")
+    return 0 if statistics.median(first) <= args.target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# benchmarks/bench_compact_memory.py
+"""
+Speicherbedarf pro Spalte mit und ohne kompakte Spaltentypen (ship_data.compact_frame).
+
+Gemessen wird memory_usage(deep=True), also inkl. Python-String-Objekten.
+Zusätzlich wird geprüft, dass alle Zeilen über get_json_record identisch
+ausgelesen werden.
+
+Usage: python benchmarks/bench_compact_memory.py [--parquet PATH] [--check 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parquet", default=None, help="Datei oder Verzeichnis (Standard: wie die App)")
+    parser.add_argument("--check", type=int, default=2000, help="Anzahl IMOs für den Vergleich der Ausgabe")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    from ship_data import ShipDataset, memory_report
+
+    plain = ShipDataset(args.parquet, compact=False)
+    compact = ShipDataset(args.parquet, compact=True)
+
+    rows = memory_report(plain.df, compact.df)
+    print(f"\n{'column':<24}{'dtype before':<14}{'dtype after':<14}{'before KB':>12}{'after KB':>12}")
+    for column, dtype_before, dtype_after, before, after in rows:
+        print(f"{column:<24}{dtype_before:<14}{dtype_after:<14}{before / 1024:>12.1f}{after / 1024:>12.1f}")
+    total_before = sum(r[3] for r in rows)
+    total_after = sum(r[4] for r in rows)
+    print(f"{'total':<52}{total_before / 1e6:>11.2f}M{total_after / 1e6:>11.2f}M"
+          f"  ({total_after / total_before:.0%})")
+
+    imos = plain.read_columns(['imo'])['imo'].tolist()
+    random.seed(42)
+    sample = random.sample(imos, min(args.check, len(imos)))
+    mismatches = [imo for imo in sample if plain.get_json_record(imo) != compact.get_json_record(imo)]
+    print(f"\nOutput check: {len(sample) - len(mismatches)}/{len(sample)} records identical")
+    if mismatches:
+        print("Abweichend:", mismatches[:10])
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_fleet_memory.py
+"""
+Speicherbedarf des Flotten-Reports für 10/100/1000 Schiffe.
+
+Jede Messung läuft in einem eigenen Prozess, gemessen wird der Anstieg des
+Peak-RSS während des Renderns (Datenbank, Logo und Styles sind vorher geladen).
+
+Usage: python benchmarks/bench_fleet_memory.py [--sizes 10,100,1000] [--canvas total|numbered|both]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss ist unter Linux in KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(n_ships: int, canvas_name: str):
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    import report_gen
+
+    generator = report_gen.init_generator()
+    imos = generator.dataset.read_columns(['imo'])['imo'].drop_duplicates().tolist()[:n_ships]
+    canvasmaker = report_gen.NumberedCanvas if canvas_name == "numbered" else report_gen.TotalPagesCanvas
+
+    # Warm-up, damit Import-/Font-Caches nicht in die Messung eingehen
+    generator.render_fleet_pdf(imos[:2], canvasmaker=canvasmaker)
+    baseline = _peak_rss_mb()
+
+    start = time.perf_counter()
+    pdf_bytes = generator.render_fleet_pdf(imos, canvasmaker=canvasmaker)
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "ships": len(imos),
+        "canvas": canvas_name,
+        "seconds": round(seconds, 2),
+        "pdf_mb": round(len(pdf_bytes) / 1e6, 2),
+        "rss_growth_mb": round(_peak_rss_mb() - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--canvas", default="both", choices=["total", "numbered", "both"])
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _measure(int(args.child[0]), args.child[1])
+        return
+
+    canvases = ["total", "numbered"] if args.canvas == "both" else [args.canvas]
+    print(f"{'ships':>6} {'canvas':>9} {'seconds':>8} {'pdf MB':>7} {'RSS +MB':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for canvas_name in canvases:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", str(size), canvas_name],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            print(f"{r['ships']:>6} {r['canvas']:>9} {r['seconds']:>8} {r['pdf_mb']:>7} {r['rss_growth_mb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_search_rps.py
+"""
+Durchsatz von /api/search-ship (Anfragen pro Sekunde, ein Thread, Flask-Testclient).
+
+Verglichen werden:
+  legacy      - bisheriger Weg: get_json_record + Vergleichsgruppe + jsonify
+  precomputed - vorberechnete Antwort-Bytes aus ship_payloads.py
+  revalidate  - Browser/Proxy mit ETag (If-None-Match), Antwort 304 ohne Body
+
+legacy/precomputed werden einmal nur als Handler-Arbeit (Request-Kontext,
+ohne Routing) und einmal als komplette Anfrage über die Route gemessen.
+
+Der Testclient spart Socket und HTTP-Parser, gemessen wird also der Anteil
+der Anwendung. Der Aufbau der Indizes wird nicht mitgemessen.
+
+Usage: python benchmarks/bench_search_rps.py [--requests 5000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _rps(fn, sample) -> float:
+    for imo in sample[:100]:
+        fn(imo)
+    start = time.perf_counter()
+    for imo in sample:
+        fn(imo)
+    return len(sample) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    os.environ["APP_BACKGROUND_INIT"] = "0"
+    os.environ.setdefault("WATSONX_STUB", "1")
+    import app as app_module
+    from flask import Response, jsonify
+    from peer_stats import get_peer_stats
+    from ship_payloads import get_payload_store
+
+    client = app_module.app.test_client()
+    dataset = app_module._current_dataset()
+    imos = dataset.read_columns(['imo'])['imo'].tolist()
+    random.seed(42)
+    sample = [random.choice(imos) for _ in range(args.requests)]
+
+    def legacy(imo):
+        with app_module.app.test_request_context(f"/api/search-ship?imo={imo}"):
+            ship_data = dataset.get_json_record(imo)
+            peer = get_peer_stats(dataset).lookup(ship_data['imo'], ship_data.get('report_year'))
+            jsonify({"found": True, "data": ship_data, "peer_stats": peer}).get_data()
+
+    def precomputed(imo):
+        with app_module.app.test_request_context(f"/api/search-ship?imo={imo}"):
+            Response(get_payload_store(dataset).get(imo), mimetype='application/json').get_data()
+
+    def full_request(imo):
+        client.get(f"/api/search-ship?imo={imo}").get_data()
+
+    etags = {imo: client.get(f"/api/search-ship?imo={imo}").headers['ETag'] for imo in set(sample)}
+
+    def revalidate(imo):
+        client.get(f"/api/search-ship?imo={imo}", headers={"If-None-Match": etags[imo]})
+
+    # "handler" = nur die Arbeit in der Route, "request" = inkl. Routing/WSGI/Testclient
+    rows = [("legacy (handler)", _rps(legacy, sample)),
+            ("precomputed (handler)", _rps(precomputed, sample)),
+            ("precomputed 200 (request)", _rps(full_request, sample)),
+            ("revalidate 304 (request)", _rps(revalidate, sample))]
+    print(f"\n{len(dataset)} rows, {args.requests} requests")
+    for name, rps in rows:
+        print(f"{name:<32}{rps:>10.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
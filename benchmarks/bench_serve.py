@@ -0,0 +1,137 @@
+# benchmarks/bench_serve.py
+"""
+Mehrprozess-Betrieb (serve.py): Durchsatz und Speicher je Worker-Anzahl.
+
+Für jede Worker-Anzahl wird serve.py gestartet. Danach erzeugen mehrere
+Client-Prozesse Last auf /api/search-ship (zufällige IMOs, je Anfrage eine
+neue Verbindung). Gemessen werden Anfragen pro Sekunde sowie RSS und PSS
+(Proportional Set Size, geteilte Seiten anteilig) aller Prozesse.
+Summe PSS ~ tatsächlicher Speicherbedarf; liegt sie nahe am Master, teilen
+die Worker die Datenbank.
+
+Nur Linux (/proc). Mit SHIP_DATA_DIR lässt sich eine größere Flotte laden.
+
+Usage: python benchmarks/bench_serve.py [--workers 1,2,4] [--clients 8] [--seconds 10]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _memory_kb(pid: int) -> tuple:
+    rss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+def _children(pid: int) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _client(port: int, imos: list, seconds: float, queue):
+    random.seed(os.getpid())
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            conn.request("GET", f"/api/search-ship?imo={random.choice(imos)}")
+            response = conn.getresponse()
+            response.read()
+            done += 1 if response.status == 200 else 0
+            errors += 0 if response.status == 200 else 1
+        except OSError:
+            errors += 1
+        finally:
+            conn.close()
+    queue.put((done, errors))
+
+
+def _wait_ready(port: int, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/readyz")
+            body = json.loads(conn.getresponse().read())
+            if body["components"]["dataset"]["ready"]:
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("serve.py nicht bereit")
+
+
+def run(workers: int, clients: int, seconds: float, port: int, imos: list) -> dict:
+    env = dict(os.environ, WATSONX_STUB="1", SHIP_DATA_RELOAD_SECONDS="0")
+    server = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers),
+                               "--bind", f"127.0.0.1:{port}"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port)
+        time.sleep(1)
+        queue = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_client, args=(port, imos, seconds, queue)) for _ in range(clients)]
+        for p in procs:
+            p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        master = _memory_kb(server.pid)
+        worker_mem = [_memory_kb(pid) for pid in _children(server.pid)]
+        return {
+            "workers": workers,
+            "rps": sum(r[0] for r in results) / seconds,
+            "errors": sum(r[1] for r in results),
+            "master_rss_mb": master[0] / 1024,
+            "worker_rss_mb": sum(m[0] for m in worker_mem) / 1024,
+            "total_pss_mb": (master[1] + sum(m[1] for m in worker_mem)) / 1024,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    from ship_data import default_source, read_source_table
+    imos = [str(i) for i in read_source_table(default_source()).column('imo').to_pylist()]
+
+    print(f"{os.cpu_count()} CPUs, {len(imos)} rows, {args.clients} clients, {args.seconds:g} s")
+    print(f"{'workers':>8}{'req/s':>10}{'errors':>8}{'master RSS':>12}{'workers RSS':>13}{'total PSS':>11}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        r = run(workers, args.clients, args.seconds, args.port, imos)
+        print(f"{r['workers']:>8}{r['rps']:>10.0f}{r['errors']:>8}{r['master_rss_mb']:>10.0f}MB"
+              f"{r['worker_rss_mb']:>11.0f}MB{r['total_pss_mb']:>9.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
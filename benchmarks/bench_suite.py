@@ -0,0 +1,285 @@
+# benchmarks/bench_suite.py
+"""
+Benchmark-Suite für die heißen Pfade, mit gespeicherten Baselines.
+
+Fälle (jeweils p50/p99 in ms über zufällige IMOs):
+  load            - Datenbank laden + abgeleitete Indizes aufbauen (einmalig, s, je Stufe)
+  lookup          - dataset.get_json_record (Kern von search_ship)
+  search_ship     - GET /api/search-ship über den Flask-Testclient
+  prompt          - Prompt-Aufbau für generate_report (inkl. Vergleichsgruppe)
+  generate_report - POST /api/generate-report mit Stub-Modell, ohne LLM-Cache
+  pdf             - ShipReportGenerator.generate_pdf_report (Renderzeit, Dateigröße)
+
+Daten: synthetische Flotte aus make_fleet.py (wird bei Bedarf erzeugt) oder
+eine beliebige Parquet-Datei. Ergebnisse werden als JSON ausgegeben, mit
+--save als Baseline abgelegt und mit --compare gegen die Baseline geprüft
+(Exit-Code 1 bei Regression). Baselines sind maschinenabhängig, also nur
+auf derselben Maschine vergleichen.
+
+Usage:
+  python benchmarks/bench_suite.py --size 10k [--save] [--compare] [--tolerance 0.25]
+  python benchmarks/bench_suite.py --parquet ship_report_imo_2024.parquet
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = ROOT / "benchmarks" / "baselines"
+
+# Anzahl Wiederholungen pro Fall (PDF und Report sind deutlich teurer)
+ITERATIONS = {"lookup": 2000, "search_ship": 2000, "prompt": 1000, "generate_report": 500, "pdf": 30}
+DEFAULT_TOLERANCE = 0.25
+# Unterhalb dieser Zeit schwankt die Messung stärker als jede echte Regression
+MIN_REGRESSION_MS = 0.05
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _timed(fn, items, warmup: int = 20) -> dict:
+    for item in items[:warmup]:
+        fn(item)
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "n": len(timings),
+        "p50_ms": round(statistics.median(timings), 4),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(parquet: Path, cases=None, seed: int = 42) -> dict:
+    """Alle (oder die ausgewählten) Fälle gegen eine Parquet-Datei messen"""
+    cases = cases or ["load"] + list(ITERATIONS)
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    os.environ["APP_BACKGROUND_INIT"] = "0"
+    os.environ["WATSONX_STUB"] = "1"
+    os.environ["SHIP_DATA_RELOAD_SECONDS"] = "0"
+    # Fest wie in der Produktion, nicht aus der Umgebung: ab PRECOMPUTE_MAX_ROWS
+    # werden Antworten bei Bedarf gebaut, 10k misst also einen anderen Pfad als 100k/1m
+    os.environ["SHIP_PRECOMPUTE_PAYLOADS"] = "auto"
+
+    import ship_data
+    # Datei statt DATA_DIR/PARQUET_PATH der App
+    ship_data.PARQUET_PATH = str(parquet)
+    ship_data.DATA_DIR = str(parquet)
+
+    results = {}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    with quiet:
+        import app as app_module
+        import flag_engine
+        import peer_stats
+        import ship_payloads
+        import ship_search
+        import similar_vessels
+
+    # Laden in Stufen wie app._load_dataset, damit Ausreißer einer Stufe zuzuordnen sind
+    rss_start = _rss_mb()
+    start = time.perf_counter()
+    stages = {}
+    with quiet:
+        t, rss = time.perf_counter(), _rss_mb()
+        dataset = ship_data.get_dataset()
+        stages["dataset"] = (time.perf_counter() - t, _rss_mb() - rss)
+        for stage, build in (("name_index", ship_search.get_name_index), ("peer_stats", peer_stats.get_peer_stats),
+                             ("similar", similar_vessels.get_similar_index), ("flags", flag_engine.get_flag_engine),
+                             ("payloads", ship_payloads.get_payload_store)):
+            t, rss = time.perf_counter(), _rss_mb()
+            build(dataset)
+            stages[stage] = (time.perf_counter() - t, _rss_mb() - rss)
+        app_module.dataset_component.get()
+    if "load" in cases:
+        results["load"] = {
+            "seconds": round(time.perf_counter() - start, 3),
+            "rss_mb": round(_rss_mb() - rss_start, 1),
+            "stages": {stage: {"seconds": round(sec, 3), "rss_mb": round(mb, 1)}
+                       for stage, (sec, mb) in stages.items()},
+        }
+
+    imos = dataset.read_columns(['imo'])['imo'].tolist()
+    rng = random.Random(seed)
+
+    def sample(n):
+        return [rng.choice(imos) for _ in range(n)]
+
+    if "lookup" in cases:
+        results["lookup"] = _timed(dataset.get_json_record, sample(ITERATIONS["lookup"]))
+
+    if "search_ship" in cases:
+        client = app_module.app.test_client()
+        # Logzeile pro Anfrage (metrics.py) mitmessen, aber nicht auf dem Terminal ausgeben
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results["search_ship"] = _timed(lambda imo: client.get(f"/api/search-ship?imo={imo}").get_data(),
+                                            sample(ITERATIONS["search_ship"]))
+
+    records = [app_module.normalize_payload(dataset.get_json_record(imo))
+               for imo in sample(max(ITERATIONS["prompt"], ITERATIONS["generate_report"]))]
+
+    if "prompt" in cases:
+        results["prompt"] = _timed(app_module._build_prompt, records[:ITERATIONS["prompt"]])
+
+    if "generate_report" in cases:
+        from llm_cache import LLMCache
+        client = app_module.app.test_client()
+        # Ohne Cache, damit jede Anfrage Prompt + Modellaufruf durchläuft
+        app_module.llm_cache = LLMCache(path=None, max_memory_entries=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["generate_report"] = _timed(
+                lambda record: client.post('/api/generate-report', json=record).get_data(),
+                records[:ITERATIONS["generate_report"]])
+
+    if "pdf" in cases:
+        with quiet:
+            generator = app_module.pdf_component.get().init_generator()
+        text = "Benchmark report text.\n\n" + "The reported values are plausible. " * 40
+        sizes = []
+        with tempfile.TemporaryDirectory() as tmp:
+            generator.output_dir = Path(tmp)
+
+            def render(imo):
+                path = Path(generator.generate_pdf_report(imo, text))
+                sizes.append(path.stat().st_size)
+                path.unlink()
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                results["pdf"] = _timed(render, sample(ITERATIONS["pdf"]), warmup=3)
+        results["pdf"]["size_kb"] = round(statistics.fmean(sizes) / 1024, 1)
+
+    return {
+        "meta": {
+            "rows": len(dataset),
+            "parquet": str(parquet.relative_to(ROOT)) if parquet.is_relative_to(ROOT) else parquet.name,
+            "backend": type(dataset).__name__,
+            "payloads": type(ship_payloads.get_payload_store(dataset)).__name__,
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "commit": _git_commit(),
+            "date": time.strftime("%Y-%m-%d"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """Regressionen: [(Fall, Kennzahl, Baseline, aktuell)], p50 und Ladezeit"""
+    regressions = []
+    for case, values in current["results"].items():
+        base = baseline.get("results", {}).get(case)
+        if not base:
+            continue
+        for metric in ("p50_ms", "seconds"):
+            if metric not in values or metric not in base:
+                continue
+            limit = base[metric] * (1 + tolerance)
+            if values[metric] > limit and values[metric] - base[metric] > MIN_REGRESSION_MS:
+                regressions.append((case, metric, base[metric], values[metric]))
+    return regressions
+
+
+def _print_results(report: dict, baseline: dict = None):
+    meta = report["meta"]
+    print(f"\n{meta['rows']} rows ({meta['backend']}, {meta.get('payloads', '?')}), {meta['machine']}, Python {meta['python']}")
+    if baseline and baseline["meta"].get("payloads") not in (None, meta.get("payloads")):
+        print(f"WARNUNG: Baseline mit {baseline['meta']['payloads']} gemessen, Werte nicht vergleichbar")
+    print(f"{'case':<18}{'p50 ms':>10}{'p99 ms':>10}{'baseline p50':>14}  extra")
+    for case, values in report["results"].items():
+        base = (baseline or {}).get("results", {}).get(case, {})
+        if "seconds" in values:
+            print(f"{case:<18}{values['seconds']:>9.3f}s{'':>10}{base.get('seconds', ''):>14}"
+                  f"  RSS +{values['rss_mb']} MB")
+            for stage, stage_values in values.get("stages", {}).items():
+                print(f"  {stage:<16}{stage_values['seconds']:>9.3f}s{'':>24}  RSS +{stage_values['rss_mb']} MB")
+            continue
+        extra = f"{values['size_kb']} KB" if "size_kb" in values else ""
+        print(f"{case:<18}{values['p50_ms']:>10.3f}{values['p99_ms']:>10.3f}"
+              f"{base.get('p50_ms', ''):>14}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help="synthetische Flotte: 10k, 100k oder 1m")
+    parser.add_argument("--parquet", default=None, help="eigene Datei statt synthetischer Flotte")
+    parser.add_argument("--cases", default=None, help="Auswahl, z.B. lookup,search_ship")
+    parser.add_argument("--save", action="store_true", help="Ergebnis als Baseline speichern")
+    parser.add_argument("--compare", action="store_true", help="gegen die Baseline prüfen")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="nur JSON ausgeben")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    from make_fleet import SIZES, fleet_path, write_fleet
+
+    if args.parquet:
+        parquet = Path(args.parquet).resolve()
+        name = parquet.stem
+    else:
+        name = args.size.lower()
+        parquet = fleet_path(name)
+        if not parquet.exists():
+            print(f"Erzeuge synthetische Flotte {parquet} ...", file=sys.stderr)
+            write_fleet(parquet, SIZES[name])
+
+    report = run_suite(parquet, args.cases.split(",") if args.cases else None)
+    baseline_path = BASELINE_DIR / f"{name}.json"
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_results(report, baseline)
+
+    if args.save:
+        BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline gespeichert: {baseline_path.relative_to(ROOT)}")
+
+    if args.compare:
+        if baseline is None:
+            print(f"\nKeine Baseline unter {baseline_path.relative_to(ROOT)}")
+            sys.exit(2)
+        regressions = compare(report, baseline, args.tolerance)
+        for case, metric, before, now in regressions:
+            print(f"REGRESSION {case}.{metric}: {before} -> {now} (> +{args.tolerance:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"\nKeine Regression gegenüber {baseline_path.relative_to(ROOT)} (Toleranz {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# benchmarks/load_test.py
+"""
+Lasttest mit gemischtem Verkehr, WatsonX durch das Stub-Modell ersetzt.
+
+Startet serve.py mit WATSONX_STUB=1 und den Einstellungen für das Stub-Modell
+(Latenz bis zum ersten Token, Token-Rate, Antwortlänge, Fehlerquote, siehe
+stub_model.py). Danach erzeugen N parallele Clients eine Mischung aus Suche,
+Bewertung (JSON oder SSE-Stream) und PDF-Download. Pro Anfrageart und
+insgesamt werden Durchsatz, Fehler und p50/p95/p99 der Latenz ausgegeben
+(Stream und PDF: bis zum letzten Byte).
+
+Mehrere Werte für --workers/--concurrency ergeben eine Tabelle: der
+Sättigungspunkt ist erreicht, wenn der Durchsatz nicht mehr steigt und p99
+wächst.
+
+Bewertungen sind immer Cache-Misses (Schiffsname mit laufender Nummer), jede
+durchläuft also das Modell; der gestartete Server hat keinen LLM-Cache auf
+der Platte und keinen Assessment-Store. --cache-hits schickt unveränderte
+Daten wie der Browser.
+
+Mit --url wird ein bereits laufender Server getestet (das Stub-Verhalten
+stellt man dann dort über STUB_* ein). Last-Clients und Server teilen sich
+sonst die CPUs dieser Maschine.
+
+Usage:
+  python benchmarks/load_test.py --workers 1,2 --concurrency 4,16,64 --seconds 20 \\
+      --llm-latency-ms 800 --llm-tokens-per-sec 40 --llm-output-tokens 300 --llm-error-rate 0.02
+  python benchmarks/load_test.py --url http://127.0.0.1:5000 --mix search=80,report=15,pdf=5
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "search=70,report=15,stream=5,pdf=10"
+OPERATIONS = ("search", "report", "stream", "pdf")
+# Schiffe, deren Daten vorab per /api/search-ship geholt werden
+SAMPLE_SHIPS = 200
+REQUEST_TIMEOUT = 120
+PDF_TEXT = "Load test report.\n\n" + "The reported values are plausible for this vessel type. " * 40
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise ValueError(f"Unbekannte Anfrageart {name!r} (erlaubt: {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    # Nearest-Rank
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+class Target:
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+
+    def get_json(self, path: str):
+        conn = self.connect()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b"null")
+        finally:
+            conn.close()
+
+
+def prepare_payloads(target: Target, n: int = SAMPLE_SHIPS, seed: int = 42) -> list:
+    """Schiffsdaten wie im Browser: Suche, dann Zahlen runden (roundNumbers)"""
+    sys.path.insert(0, str(ROOT))
+    from ai_report import round_payload
+    from ship_data import default_source, read_source_table
+    imos = [str(i) for i in read_source_table(default_source()).column('imo').to_pylist()]
+    payloads = []
+    for imo in random.Random(seed).sample(imos, min(n, len(imos))):
+        status, body = target.get_json(f"/api/search-ship?imo={imo}")
+        if status == 200:
+            payloads.append(round_payload(body["data"]))
+    if not payloads:
+        raise RuntimeError("Keine Schiffsdaten vom Server erhalten")
+    return payloads
+
+
+def _request_for(op: str, payload: dict, nonce: str = None):
+    if op == "search":
+        return "GET", f"/api/search-ship?imo={payload['imo']}", None
+    if op == "pdf":
+        return "POST", "/api/download-pdf", {"imo": payload["imo"], "text": PDF_TEXT, "year": payload.get("report_year")}
+    data = dict(payload)
+    if nonce:
+        data["ship_name"] = f"{data.get('ship_name')} #{nonce}"
+    return "POST", "/api/generate-report" if op == "report" else "/api/generate-report/stream", data
+
+
+def _client(target: Target, mix: dict, payloads: list, deadline: float, seed: int, unique: bool, results: list):
+    rng = random.Random(seed)
+    ops, weights = list(mix), list(mix.values())
+    conn = None
+    sent = 0
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        sent += 1
+        method, path, body = _request_for(op, rng.choice(payloads), f"{seed}-{sent}" if unique else None)
+        start = time.perf_counter()
+        try:
+            if conn is None:
+                conn = target.connect()
+            if body is None:
+                conn.request(method, path)
+            else:
+                conn.request(method, path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = response.read()
+            # Stream-Fehler kommen als SSE-Event mit Status 200
+            ok = response.status < 400 and not (op == "stream" and b"event: error" in data)
+        except (OSError, http.client.HTTPException):
+            ok = False
+            if conn is not None:
+                conn.close()
+            conn = None
+        results.append((op, start, time.perf_counter() - start, ok))
+    if conn is not None:
+        conn.close()
+
+
+def run_load(target: Target, mix: dict, payloads: list, concurrency: int, seconds: float,
+             unique: bool = True, warmup: float = 2.0) -> dict:
+    """concurrency Clients für warmup + seconds, ausgewertet wird nur das Messfenster"""
+    results = []
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + seconds
+    threads = [threading.Thread(target=_client, args=(target, mix, payloads, deadline, seed, unique, results))
+               for seed in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    window = [r for r in results if measure_from <= r[1] < deadline]
+    summary = {}
+    for op in list(mix) + ["all"]:
+        rows = [r for r in window if op == "all" or r[0] == op]
+        latencies = sorted(r[2] * 1000 for r in rows)
+        errors = sum(1 for r in rows if not r[3])
+        summary[op] = {
+            "requests": len(rows),
+            "rps": round(len(rows) / seconds, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "p50_ms": round(_percentile(latencies, 0.50), 2),
+            "p95_ms": round(_percentile(latencies, 0.95), 2),
+            "p99_ms": round(_percentile(latencies, 0.99), 2),
+        }
+    return summary
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def start_server(workers: int, threads: int, port: int, llm: dict):
+    env = dict(os.environ, WATSONX_STUB="1", SHIP_DATA_RELOAD_SECONDS="0",
+               LLM_CACHE_PATH="", ASSESSMENT_STORE="", **llm)
+    server = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers), "--threads", str(threads),
+                               "--bind", f"127.0.0.1:{port}"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    target = Target(f"http://127.0.0.1:{port}")
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("serve.py beendet (gunicorn installiert?)")
+        try:
+            status, body = target.get_json("/readyz")
+            if status == 200 and body["ready"]:
+                return server, target
+        except (OSError, ValueError, KeyError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("serve.py nicht bereit")
+
+
+def _print_run(label: str, summary: dict):
+    total = summary["all"]
+    print(f"\n{label}: {total['rps']:.1f} req/s, {total['error_rate']:.1%} Fehler")
+    print(f"  {'op':<8}{'n':>8}{'req/s':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, s in summary.items():
+        print(f"  {op:<8}{s['requests']:>8}{s['rps']:>9.1f}{s['errors']:>8}"
+              f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="laufenden Server testen statt serve.py zu starten")
+    parser.add_argument("--workers", default="1", help="Worker-Prozesse, z.B. 1,2,4")
+    parser.add_argument("--threads", type=int, default=4, help="Threads pro Worker")
+    parser.add_argument("--concurrency", default="8", help="parallele Clients, z.B. 4,16,64")
+    parser.add_argument("--seconds", type=float, default=15, help="Messdauer pro Lauf")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Gewichte (default: {DEFAULT_MIX})")
+    parser.add_argument("--cache-hits", action="store_true", help="Bewertungen nicht eindeutig machen")
+    parser.add_argument("--port", type=int, default=5098)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=50)
+    parser.add_argument("--llm-output-tokens", type=int, default=250)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON in diese Datei")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    llm = {
+        "STUB_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_TOKENS_PER_SEC": str(args.llm_tokens_per_sec),
+        "STUB_OUTPUT_TOKENS": str(args.llm_output_tokens),
+        "STUB_ERROR_RATE": str(args.llm_error_rate),
+    }
+    if not args.url:
+        print(f"Stub-Modell: {args.llm_latency_ms:g} ms bis zum ersten Token, {args.llm_tokens_per_sec:g} Tokens/s, "
+              f"{args.llm_output_tokens} Tokens, {args.llm_error_rate:.1%} Fehler")
+    print(f"Mix: {', '.join(f'{op}={w:g}' for op, w in mix.items())}, {args.seconds:g} s pro Lauf, "
+          f"{os.cpu_count()} CPUs")
+
+    runs = []
+    for workers in ([None] if args.url else [int(w) for w in args.workers.split(",")]):
+        server = None
+        if args.url:
+            target = Target(args.url)
+        else:
+            server, target = start_server(workers, args.threads, args.port, llm)
+        try:
+            payloads = prepare_payloads(target)
+            for concurrency in concurrencies:
+                summary = run_load(target, mix, payloads, concurrency, args.seconds, unique=not args.cache_hits)
+                label = f"concurrency={concurrency}" if workers is None else \
+                    f"workers={workers} threads={args.threads} concurrency={concurrency}"
+                _print_run(label, summary)
+                runs.append({"workers": workers, "threads": None if workers is None else args.threads,
+                             "concurrency": concurrency, "results": summary})
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print(f"\n{'workers':>8}{'conc':>6}{'req/s':>9}{'err %':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for run in runs:
+        s = run["results"]["all"]
+        print(f"{run['workers'] or '-':>8}{run['concurrency']:>6}{s['rps']:>9.1f}{s['error_rate'] * 100:>7.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"mix": mix, "llm": None if args.url else llm, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
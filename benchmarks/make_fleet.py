@@ -0,0 +1,205 @@
+# benchmarks/make_fleet.py
+"""
+Synthetische Flotte im Schema von ship_report_imo_2024.parquet erzeugen.
+
+Gleiche Spaltennamen und Typen wie die echte Datei (IMO int64, float32 für
+AIS/Abmessungen, uint32 ais_points, ...). Verteilungen sind grob an die
+echten Daten angelehnt (Schiffstypen, Längen je Typ, Abweichung MRV vs.
+Modell inkl. einzelner Ausreißer). Flags werden mit denselben Regeln wie in
+den Originaldaten gesetzt (flag_engine.DEFAULT_RULES). Gleicher Seed ->
+gleiche Datei.
+
+Mit mehreren Jahren kommt jedes Schiff einmal pro Jahr vor (rows = Schiffe x Jahre).
+Ist --out ein Verzeichnis, wird pro Jahr eine Datei geschrieben (Layout für SHIP_DATA_DIR).
+
+Usage: python benchmarks/make_fleet.py --rows 100000 [--years 2024] [--out benchmarks/data/fleet_100k.parquet]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Standardgrößen für die Benchmark-Suite
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_DIR = ROOT / "benchmarks" / "data"
+
+SCHEMA = pa.schema([
+    ("IMO", pa.int64()),
+    ("ship_name", pa.string()),
+    ("VesselType", pa.string()),
+    ("mrv_ship_type", pa.string()),
+    ("report_year", pa.int64()),
+    ("ais_distance_nm_total", pa.float32()),
+    ("ais_time_hours_total", pa.float64()),
+    ("ais_points", pa.uint32()),
+    ("sog_mean_kn", pa.float32()),
+    ("sog_p50_kn", pa.float32()),
+    ("sog_p95_kn", pa.float32()),
+    ("moving_share", pa.float64()),
+    ("Length", pa.float32()),
+    ("Width", pa.float32()),
+    ("draft_m_median", pa.float32()),
+    ("y_mrv_co2_per_nm_kg", pa.float64()),
+    ("y_pred_co2_per_nm_kg", pa.float64()),
+    ("residual_kg", pa.float64()),
+    ("residual_pct", pa.float64()),
+    ("flag_color", pa.string()),
+    ("flag_reason", pa.string()),
+])
+
+# Schiffstyp: (Anteil, AIS-VesselType, Median-Länge in m)
+SHIP_TYPES = {
+    'Bulk carrier': (0.336, '70.0', 199),
+    'Oil tanker': (0.157, '80.0', 250),
+    'Container ship': (0.121, '70.0', 294),
+    'Chemical tanker': (0.117, '80.0', 183),
+    'General cargo ship': (0.081, '70.0', 175),
+    'Vehicle carrier': (0.054, '70.0', 199),
+    'LNG carrier': (0.034, '80.0', 295),
+    'Gas carrier': (0.032, '80.0', 180),
+    'Other ship types': (0.027, '70.0', 146),
+    'Passenger ship': (0.021, '60.0', 265),
+    'Refrigerated cargo carrier': (0.012, '70.0', 157),
+    'Ro-ro ship': (0.004, '70.0', 160),
+    'Container/ro-ro cargo ship': (0.004, '70.0', 224),
+    'Passenger ship (Cruise Passenger ship)': (0.001, '60.0', 261),
+    'Combination carrier': (0.0005, '89.0', 229),
+    'Ro-pax ship': (0.0005, '70.0', 109),
+}
+
+_PREFIXES = np.array(['', '', '', 'MV ', 'MS ', 'SEA ', 'OCEAN ', 'STAR ', 'NORD ', 'CAPE ', 'GOLDEN ', 'BLUE '])
+_WORDS = np.array([
+    'AQUA', 'MARINA', 'HORIZON', 'PIONEER', 'AURORA', 'ATLAS', 'NEPTUNE', 'TRITON', 'ORION', 'VEGA',
+    'LUNA', 'SOLAR', 'FALCON', 'EAGLE', 'DOLPHIN', 'CORAL', 'PEARL', 'JADE', 'AMBER', 'SPIRIT',
+    'GLORY', 'HARMONY', 'LIBERTY', 'FORTUNE', 'VICTORY', 'ENDEAVOUR', 'VOYAGER', 'NAVIGATOR',
+    'EXPLORER', 'MERIDIAN', 'ZENITH', 'POLARIS', 'SIRIUS', 'ARCTIC', 'PACIFIC', 'ATLANTIC', 'BALTIC',
+    'HAMBURG', 'BREMEN', 'ROTTERDAM', 'ANTWERP', 'PIRAEUS', 'SINGAPORE', 'SHANGHAI', 'BUSAN',
+])
+_SUFFIXES = np.array(['', '', '', '', ' I', ' II', ' III', ' 1', ' 2', ' 7', ' EXPRESS', ' TRADER', ' SPIRIT'])
+
+
+def _names(rng, n: int) -> np.ndarray:
+    first = _WORDS[rng.integers(0, len(_WORDS), n)]
+    second = np.where(rng.random(n) < 0.4, np.char.add(' ', _WORDS[rng.integers(0, len(_WORDS), n)]), '')
+    names = np.char.add(np.char.add(_PREFIXES[rng.integers(0, len(_PREFIXES), n)], first), second)
+    return np.char.add(names, _SUFFIXES[rng.integers(0, len(_SUFFIXES), n)]).astype(object)
+
+
+def _flags(residual_kg: np.ndarray, residual_pct: np.ndarray, years: np.ndarray):
+    # Gleiche Reihenfolge wie in den Originaldaten: relativ vor absolut (P95 pro Jahr)
+    sys.path.insert(0, str(ROOT))
+    from flag_engine import DEFAULT_RULES
+    abs_kg = np.abs(residual_kg)
+    threshold = np.empty(len(abs_kg))
+    for year in np.unique(years):
+        in_year = years == year
+        threshold[in_year] = np.percentile(abs_kg[in_year], DEFAULT_RULES["abs_percentile"])
+    rel = np.abs(residual_pct) > DEFAULT_RULES["rel_threshold"]
+    abs_ = ~rel & (abs_kg > threshold)
+    reason = np.where(rel, 'rel_residual>30%', np.where(abs_, 'abs_residual>p95', 'ok')).astype(object)
+    color = np.where(rel | abs_, 'RED', 'GREEN').astype(object)
+    return color, reason
+
+
+def make_fleet(rows: int, years=(2024,), seed: int = 42) -> pa.Table:
+    """Tabelle mit rows Zeilen (Schiffe x Jahre) im Schema der echten Parquet-Datei"""
+    rng = np.random.default_rng(seed)
+    years = sorted(years)
+    n_ships = max(1, rows // len(years))
+
+    imos = rng.choice(np.arange(1_000_000, 10_000_000), size=n_ships, replace=False)
+    names = _names(rng, n_ships)
+    types = list(SHIP_TYPES)
+    weights = np.array([SHIP_TYPES[t][0] for t in types])
+    type_idx = rng.choice(len(types), size=n_ships, p=weights / weights.sum())
+    median_length = np.array([SHIP_TYPES[t][2] for t in types])[type_idx]
+    length = np.clip(np.round(median_length * np.exp(rng.normal(0, 0.25, n_ships))), 40, 400)
+    width = np.clip(np.round(length * rng.normal(0.16, 0.02, n_ships)), 8, 70)
+    draft = np.clip(np.round(width * rng.normal(0.28, 0.05, n_ships), 1), 2, 22)
+
+    parts = []
+    for year in years:
+        n = n_ships
+        moving_share = np.clip(rng.beta(2.2, 2.7, n), 0.01, 1.0)
+        time_hours = np.clip(rng.lognormal(6.5, 0.8, n), 5, 8760)
+        sog_p95 = np.clip(rng.normal(14.4, 2.6, n), 3, 24).round(1)
+        sog_mean = np.clip(sog_p95 * moving_share * rng.normal(1.0, 0.15, n), 0.1, 21)
+        sog_p50 = np.where(moving_share < 0.5 * rng.random(n), 0.0, np.clip(sog_mean * 1.1, 0, 21)).round(1)
+        distance = sog_mean * time_hours
+        points = (time_hours * rng.normal(25.8, 4, n)).clip(1).astype(np.uint32)
+
+        # Modell: Intensität wächst mit Verdrängung (~ L*B*T) und Geschwindigkeit
+        y_pred = 0.067 * (length * width * draft) ** 0.72 * (1 + 0.03 * sog_p95)
+        log_ratio = rng.normal(0, 0.2, n)
+        outliers = rng.random(n) < 0.01
+        log_ratio[outliers] += rng.exponential(2.0, outliers.sum())
+        y_mrv = np.round(y_pred * np.exp(log_ratio), 2)
+        residual_kg = y_mrv - y_pred
+        residual_pct = residual_kg / y_mrv
+
+        parts.append({
+            "IMO": imos, "ship_name": names,
+            "VesselType": np.array([SHIP_TYPES[t][1] for t in types], dtype=object)[type_idx],
+            "mrv_ship_type": np.array(types, dtype=object)[type_idx],
+            "report_year": np.full(n, year, dtype=np.int64),
+            "ais_distance_nm_total": distance, "ais_time_hours_total": time_hours, "ais_points": points,
+            "sog_mean_kn": sog_mean, "sog_p50_kn": sog_p50, "sog_p95_kn": sog_p95,
+            "moving_share": moving_share, "Length": length, "Width": width, "draft_m_median": draft,
+            "y_mrv_co2_per_nm_kg": y_mrv, "y_pred_co2_per_nm_kg": y_pred,
+            "residual_kg": residual_kg, "residual_pct": residual_pct,
+        })
+
+    columns = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+    columns["flag_color"], columns["flag_reason"] = _flags(
+        columns["residual_kg"], columns["residual_pct"], columns["report_year"])
+    return pa.table({field.name: pa.array(columns[field.name], type=field.type) for field in SCHEMA},
+                    schema=SCHEMA)
+
+
+def write_fleet(out: Path, rows: int, years=(2024,), seed: int = 42) -> list:
+    """Datei schreiben (oder pro Jahr eine Datei, falls out ein Verzeichnis ist)"""
+    out = Path(out)
+    table = make_fleet(rows, years, seed)
+    if out.suffix != ".parquet":
+        out.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for year in sorted(years):
+            path = out / f"ship_report_imo_{year}.parquet"
+            mask = np.asarray(table.column("report_year")) == year
+            pq.write_table(table.filter(pa.array(mask)), path)
+            paths.append(path)
+        return paths
+    out.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, out)
+    return [out]
+
+
+def fleet_path(size: str) -> Path:
+    """Standardpfad einer Suite-Größe (10k/100k/1m)"""
+    return DEFAULT_DIR / f"fleet_{size}.parquet"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10k", help="Anzahl Zeilen oder 10k/100k/1m")
+    parser.add_argument("--years", default="2024", help="z.B. 2023,2024")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="Datei (.parquet) oder Verzeichnis (eine Datei pro Jahr)")
+    args = parser.parse_args()
+
+    size = args.rows.lower()
+    rows = SIZES[size] if size in SIZES else int(args.rows)
+    out = Path(args.out) if args.out else (fleet_path(size) if size in SIZES else DEFAULT_DIR / f"fleet_{rows}.parquet")
+    years = [int(y) for y in args.years.split(",")]
+    for path in write_fleet(out, rows, years, args.seed):
+        print(f"{path} ({path.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# components.py
+"""Lazy initialisierte Komponenten (Datenbank, Modell, PDF) mit Status für /readyz"""
+
+import threading
+import time
+
+
+class ComponentUnavailable(Exception):
+    """Komponente konnte nicht initialisiert werden"""
+
+
+class LazyComponent:
+    """
+    Wird beim ersten Zugriff oder vorab in einem Hintergrund-Thread erzeugt.
+
+    Gleichzeitige Zugriffe während der Initialisierung warten auf denselben
+    Vorgang. Schlägt die Initialisierung fehl, wird der Fehler gespeichert und
+    beim nächsten Zugriff erneut versucht.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._ready = False
+        self._loading = False
+        self._error = None
+        self._seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Komponente liefern, ggf. jetzt initialisieren (raises ComponentUnavailable)"""
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                self._loading = True
+                start = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                    self._ready = True
+                    self._error = None
+                except Exception as e:
+                    self._error = str(e)
+                    print(f"FEHLER beim Initialisieren von '{self.name}': {e}")
+                finally:
+                    self._seconds = round(time.perf_counter() - start, 3)
+                    self._loading = False
+            if not self._ready:
+                raise ComponentUnavailable(f"{self.name} not available: {self._error}")
+        return self._value
+
+    def start_background(self):
+        """Initialisierung in einem Daemon-Thread anstoßen"""
+        def run():
+            try:
+                self.get()
+            except ComponentUnavailable:
+                pass
+        threading.Thread(target=run, name=f"init-{self.name}", daemon=True).start()
+
+    def reset(self, value=None):
+        """Wert direkt setzen (z.B. Stub im Test) oder mit None neu initialisieren lassen"""
+        with self._lock:
+            self._value = value
+            self._ready = value is not None
+            self._error = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def status(self) -> dict:
+        return {
+            "ready": self._ready,
+            "loading": self._loading,
+            "error": self._error,
+            "init_seconds": self._seconds,
+        }
@@ -0,0 +1,233 @@
+# flag_engine.py
+"""
+Neuberechnung von flag_color / flag_reason für die ganze Flotte (NumPy, ein Durchlauf).
+
+Die Parquet-Datei enthält die Flags als Strings ("ok", "rel_residual>30%",
+"abs_residual>p95"). Hier werden sie als kompakte Codes (uint8) gehalten,
+die Anzeige-Texte kommen aus einer vorab berechneten Tabelle. Mit anderen
+Schwellwerten lassen sich "What-if"-Auswertungen in Millisekunden rechnen.
+"""
+
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Regeln, mit denen die Flags in der Parquet-Datei erzeugt wurden
+DEFAULT_RULES = {
+    "rel_threshold": 0.30,      # |residual_pct| > 30 %
+    "abs_percentile": 95.0,     # |residual_kg| > P95 der Vergleichsmenge
+    "abs_group": "year",        # Vergleichsmenge für das Perzentil: "year" oder "ship_type"
+}
+MAX_CHANGED_LIST = 500
+# ============================================================================
+
+
+class FlagReason(IntEnum):
+    OK = 0
+    REL_RESIDUAL = 1
+    ABS_RESIDUAL = 2
+    NO_DATA = 3
+
+
+# Rohwerte aus der Parquet-Datei -> Code (auch ältere Schreibweisen)
+RAW_REASON_CODES = {
+    'ok': FlagReason.OK,
+    'rel_residual>30%': FlagReason.REL_RESIDUAL,
+    'rel_residual>30': FlagReason.REL_RESIDUAL,
+    'abs_residual>p95': FlagReason.ABS_RESIDUAL,
+    'abs_residual>95': FlagReason.ABS_RESIDUAL,
+}
+
+ABS_GROUPS = ("year", "ship_type")
+
+
+def _ordinal(n: float) -> str:
+    n = int(n) if float(n).is_integer() else n
+    if isinstance(n, float):
+        return f"{n:g}th"
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+
+def validate_rules(rules: dict = None) -> dict:
+    """Regeln mit Defaults auffüllen und prüfen (raises ValueError)"""
+    merged = dict(DEFAULT_RULES)
+    for key, value in (rules or {}).items():
+        if key not in DEFAULT_RULES:
+            raise ValueError(f"Unknown rule: {key}")
+        merged[key] = value
+
+    try:
+        merged["rel_threshold"] = float(merged["rel_threshold"])
+        merged["abs_percentile"] = float(merged["abs_percentile"])
+    except (TypeError, ValueError):
+        raise ValueError("rel_threshold and abs_percentile must be numbers")
+    if merged["rel_threshold"] < 0:
+        raise ValueError("rel_threshold must be >= 0")
+    if not 0 <= merged["abs_percentile"] <= 100:
+        raise ValueError("abs_percentile must be between 0 and 100")
+    if merged["abs_group"] not in ABS_GROUPS:
+        raise ValueError(f"abs_group must be one of {ABS_GROUPS}")
+    return merged
+
+
+def reason_labels(rules: dict = None) -> dict:
+    """Anzeige-Text pro Code für einen Regelsatz (einmal pro Regelsatz berechnet)"""
+    rules = validate_rules(rules)
+    scope = " of the ship type" if rules["abs_group"] == "ship_type" else ""
+    return {
+        FlagReason.OK: 'Within normal parameters',
+        FlagReason.REL_RESIDUAL: f"Relative deviation exceeds {rules['rel_threshold'] * 100:g}% threshold",
+        FlagReason.ABS_RESIDUAL: f"Absolute deviation exceeds {_ordinal(rules['abs_percentile'])} percentile{scope}",
+        FlagReason.NO_DATA: 'No residual data available',
+    }
+
+
+REASON_LABELS = reason_labels()
+# Rohwert -> Anzeige-Text, für den PDF-Generator vorab aufgelöst
+DISPLAY_BY_RAW = {raw: REASON_LABELS[code] for raw, code in RAW_REASON_CODES.items()}
+
+
+def encode_reasons(values) -> np.ndarray:
+    """Rohwerte (Strings) vektorisiert in Codes umwandeln, unbekannte Werte -> 255"""
+    series = pd.Series(values, dtype=object).astype(str).str.strip()
+    codes = series.map({raw: int(code) for raw, code in RAW_REASON_CODES.items()})
+    return codes.fillna(255).to_numpy(dtype=np.uint8)
+
+
+class FlagEngine:
+    """
+    Hält residual_kg / residual_pct und die Original-Flags als Arrays und
+    berechnet Flags für beliebige Regeln in einem vektorisierten Durchlauf.
+
+    Reihenfolge wie in den Originaldaten: relative Abweichung zuerst, danach
+    absolute Abweichung über dem Perzentil der Vergleichsmenge.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        n = len(df)
+        self.imos = df['imo'].to_numpy(dtype=object)
+        self.ship_names = df['ship_name'].to_numpy(dtype=object) if 'ship_name' in df.columns else np.full(n, None)
+        self.years = df['report_year'].to_numpy() if 'report_year' in df.columns else np.zeros(n, dtype=np.int64)
+        self._abs_kg = np.abs(df['residual_kg'].to_numpy(dtype=np.float64))
+        self._abs_pct = np.abs(df['residual_pct'].to_numpy(dtype=np.float64))
+        self.baseline = encode_reasons(df['flag_reason']) if 'flag_reason' in df.columns \
+            else np.full(n, 255, dtype=np.uint8)
+
+        ship_type = df['mrv_ship_type'].fillna('Unknown').astype(str) if 'mrv_ship_type' in df.columns \
+            else pd.Series(['Unknown'] * n)
+        # Vergleichsmengen vorab sortiert, damit das Perzentil pro Gruppe ein Slice ist
+        self._groups = {
+            "year": self._prepare_groups(pd.DataFrame({'y': self.years})),
+            "ship_type": self._prepare_groups(pd.DataFrame({'y': self.years, 't': ship_type.to_numpy()})),
+        }
+
+    def __len__(self):
+        return len(self.imos)
+
+    def _prepare_groups(self, keys: pd.DataFrame):
+        ids = keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+        n_groups = ids.max() + 1 if len(ids) else 0
+        # Sortiert nach (Gruppe, |residual_kg|), NaN jeweils am Ende der Gruppe
+        order = np.lexsort((self._abs_kg, ids))
+        sorted_values = self._abs_kg[order]
+        starts = np.searchsorted(ids[order], np.arange(n_groups))
+        valid = np.bincount(ids[~np.isnan(self._abs_kg)], minlength=n_groups)
+        return ids, sorted_values, starts, valid
+
+    def _abs_thresholds(self, percentile: float, group: str) -> np.ndarray:
+        """Perzentil von |residual_kg| je Gruppe (lineare Interpolation wie np.percentile), pro Zeile"""
+        ids, sorted_values, starts, valid = self._groups[group]
+        if not len(ids):
+            return np.empty(0)
+        pos = percentile / 100 * np.maximum(valid - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, np.maximum(valid - 1, 0))
+        frac = pos - lo
+        lo_values = sorted_values[np.minimum(starts + lo, len(sorted_values) - 1)]
+        hi_values = sorted_values[np.minimum(starts + hi, len(sorted_values) - 1)]
+        thresholds = np.where(valid > 0, lo_values + (hi_values - lo_values) * frac, np.nan)
+        return thresholds[ids]
+
+    def evaluate(self, rules: dict = None) -> np.ndarray:
+        """Codes (uint8, FlagReason) für alle Schiffe"""
+        rules = validate_rules(rules)
+        threshold = self._abs_thresholds(rules["abs_percentile"], rules["abs_group"])
+
+        with np.errstate(invalid='ignore'):
+            rel = self._abs_pct > rules["rel_threshold"]
+            abs_ = self._abs_kg > threshold
+        no_data = np.isnan(self._abs_pct) & np.isnan(self._abs_kg)
+
+        return np.select(
+            [rel, abs_, no_data],
+            [FlagReason.REL_RESIDUAL, FlagReason.ABS_RESIDUAL, FlagReason.NO_DATA],
+            default=FlagReason.OK,
+        ).astype(np.uint8)
+
+    def what_if(self, rules: dict = None, year=None, max_changed: int = 50) -> dict:
+        """
+        Auswertung eines Regelsatzes gegen die Flags aus der Parquet-Datei
+
+        Returns:
+            Zähler pro Grund, RED-Anzahl vorher/nachher (ohne NO_DATA, das
+            steht in no_data), neu markierte und entlastete Schiffe (Liste
+            auf max_changed begrenzt)
+        """
+        rules = validate_rules(rules)
+        codes = self.evaluate(rules)
+        # RED nur bei überschrittenem Residuum; ohne Daten ist ein Schiff nicht
+        # auffällig, sondern wird getrennt gezählt (no_data)
+        red_now = (codes == FlagReason.REL_RESIDUAL) | (codes == FlagReason.ABS_RESIDUAL)
+        red_before = (self.baseline == FlagReason.REL_RESIDUAL) | (self.baseline == FlagReason.ABS_RESIDUAL)
+        counted = codes
+        if year is not None:
+            in_year = self.years == int(year)
+            counted = codes[in_year]
+            red_now &= in_year
+            red_before &= in_year
+
+        # Positionen beziehen sich auf die ganze Flotte, kopiert werden nur gelistete Schiffe
+        newly = np.flatnonzero(red_now & ~red_before)
+        cleared = np.flatnonzero(~red_now & red_before)
+        labels = reason_labels(rules)
+        max_changed = max(0, min(int(max_changed), MAX_CHANGED_LIST))
+
+        def listing(positions):
+            return [{"imo": self.imos[i], "ship_name": self.ship_names[i],
+                     "flag_reason": labels[FlagReason(codes[i])]}
+                    for i in positions[:max_changed].tolist()]
+
+        counts = np.bincount(counted, minlength=len(FlagReason))
+        return {
+            "rules": rules,
+            "ships": int(len(counted)),
+            "red": int(red_now.sum()),
+            "red_baseline": int(red_before.sum()),
+            "no_data": int(counts[FlagReason.NO_DATA]),
+            "reasons": {reason.name.lower(): int(counts[reason]) for reason in FlagReason},
+            "labels": {reason.name.lower(): labels[reason] for reason in FlagReason},
+            "newly_flagged": int(len(newly)),
+            "cleared": int(len(cleared)),
+            "newly_flagged_ships": listing(newly),
+            "cleared_ships": listing(cleared),
+        }
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+ENGINE_COLUMNS = ['imo', 'ship_name', 'report_year', 'mrv_ship_type', 'residual_kg', 'residual_pct', 'flag_reason']
+
+def build_flag_engine(dataset) -> FlagEngine:
+    return FlagEngine(dataset.read_columns(ENGINE_COLUMNS))
+
+def get_flag_engine(dataset) -> FlagEngine:
+    """Engine zum Datenstand der übergebenen Datenbank (an der Instanz gemerkt)"""
+    return dataset.derived("flag_engine", build_flag_engine)
@@ -0,0 +1,295 @@
+# jobs.py
+"""Asynchrone Report-Jobs (LLM-Bewertung, PDF) mit begrenztem Thread-Pool"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Parallele Jobs pro Stufe: LLM wartet auf das Netz, PDF rechnet (ReportLab)
+WORKERS = {
+    "report": 8,
+    "pdf": 2,
+}
+MAX_QUEUED_JOBS = 200
+# Volle Queue: HTTP 429 mit diesem Retry-After (Sekunden)
+QUEUE_FULL_RETRY_AFTER_SECONDS = 10
+JOB_TIMEOUT_SECONDS = 180
+RESULT_TTL_SECONDS = 15 * 60
+# Gemeinsames Verzeichnis für Status/Ergebnisse: bei mehreren Worker-Prozessen
+# (serve.py) landet das Polling nicht zwingend beim Prozess, der den Job ausführt
+SHARED_DIR = os.getenv("JOB_SHARED_DIR")
+# ============================================================================
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class QueueFullError(Exception):
+    """Zu viele offene Jobs, neue Anfragen werden abgelehnt"""
+
+
+class Job:
+    """Ein einzelner Job mit Status und Ergebnis"""
+
+    def __init__(self, kind: str, meta: dict = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = "queued"  # queued -> running -> done | failed | timeout
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "timeout")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "meta": self.meta,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, result=None) -> "Job":
+        """Schnappschuss eines Jobs aus einem anderen Prozess (nur lesen)"""
+        job = cls(data["kind"], data.get("meta"))
+        for field in ("id", "status", "error", "created_at", "started_at", "finished_at"):
+            setattr(job, field, data.get(field))
+        job.result = result
+        return job
+
+
+class JobQueue:
+    """
+    Job-Verwaltung mit einem ThreadPoolExecutor pro Job-Art.
+
+    Die Ausführung selbst wird als Callable übergeben, dadurch lässt sich
+    die Queue auch mit einem Stub-Modell statt WatsonX betreiben.
+    """
+
+    def __init__(self, workers: dict = None, max_queued: int = MAX_QUEUED_JOBS,
+                 timeout_seconds: float = JOB_TIMEOUT_SECONDS, result_ttl: float = RESULT_TTL_SECONDS,
+                 shared_dir=SHARED_DIR):
+        self.workers = dict(workers or WORKERS)
+        self.max_queued = max_queued
+        self.timeout_seconds = timeout_seconds
+        self.result_ttl = result_ttl
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+        self._last_sweep = 0.0
+
+        self._executors = {
+            kind: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"job-{kind}")
+            for kind, n in self.workers.items()
+        }
+        self._jobs = {}
+        # Jobs, deren Worker-Thread noch nicht zurück ist (eingereiht, laufend oder nach
+        # dem Timeout noch hängend): sie belegen einen Platz im Pool, zählen also gegen max_queued
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, *args, meta: dict = None) -> Job:
+        """
+        Job einreihen und sofort zurückkehren
+
+        Args:
+            kind: Job-Art (Schlüssel in WORKERS)
+            fn: auszuführende Funktion, wird mit *args aufgerufen
+            meta: frei wählbare Zusatzinfos für Status-Abfragen (z.B. IMO)
+
+        Raises:
+            KeyError: unbekannte Job-Art
+            QueueFullError: maximale Anzahl offener Jobs erreicht
+        """
+        if kind not in self._executors:
+            raise KeyError(f"Unknown job kind: {kind}")
+
+        with self._lock:
+            self._purge()
+            if self._pending() >= self.max_queued:
+                raise QueueFullError(f"Job queue full ({self.max_queued} open jobs)")
+            job = Job(kind, meta)
+            self._jobs[job.id] = job
+            self._active.add(job.id)
+        self._publish(job)
+
+        self._executors[kind].submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job: Job, fn, args):
+        try:
+            self._execute(job, fn, args)
+        finally:
+            with self._lock:
+                self._active.discard(job.id)
+
+    def _execute(self, job: Job, fn, args):
+        # Job hat schon zu lange in der Queue gewartet
+        if time.time() - job.created_at > self.timeout_seconds:
+            self._finish(job, "timeout", error="Job timed out in queue")
+            return
+
+        job.started_at = time.time()
+        job.status = "running"
+        self._publish(job)
+        try:
+            result = fn(*args)
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) fehlgeschlagen: {e}")
+            self._finish(job, "failed", error=str(e))
+            return
+        self._finish(job, "done", result=result)
+
+    def _finish(self, job: Job, status: str, result=None, error=None):
+        with self._lock:
+            # Ein Ergebnis nach Ablauf des Timeouts wird verworfen
+            if job.status == "timeout":
+                return
+            job.result = result
+            job.error = error
+            job.status = status
+            job.finished_at = time.time()
+        self._publish(job)
+
+    def _check_timeout(self, job: Job, publish: bool = True):
+        if job.status == "running" and time.time() - job.started_at > self.timeout_seconds:
+            job.status = "timeout"
+            job.error = f"Job exceeded {self.timeout_seconds}s"
+            job.finished_at = time.time()
+            # Wie ein fertiger Job: andere Worker sollen "timeout" sehen, nicht "running".
+            # Jobs anderer Prozesse (aus dem Verzeichnis gelesen) schreibt nur ihr Besitzer.
+            if publish:
+                self._publish(job)
+
+    def _pending(self) -> int:
+        # Ein Timeout beendet nur den Job, nicht den Aufruf (WatsonX/ReportLab lassen sich
+        # nicht abbrechen); hängende Aufrufe zählen weiter, bis ihr Thread frei ist
+        return len(self._active)
+
+    def _purge(self):
+        now = time.time()
+        for job in list(self._jobs.values()):
+            self._check_timeout(job)
+            if job.finished and now - job.finished_at > self.result_ttl:
+                del self._jobs[job.id]
+                self._unpublish(job.id)
+        self._sweep_shared(now)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._check_timeout(job)
+                return job
+        # Job eines anderen Worker-Prozesses
+        job = self._load_shared(job_id)
+        if job is not None:
+            self._check_timeout(job, publish=False)
+        return job
+
+    # ------------------------------------------------------------------------
+    # Gemeinsames Verzeichnis (nur mit shared_dir)
+    # ------------------------------------------------------------------------
+
+    def _paths(self, job_id: str):
+        return self.shared_dir / f"{job_id}.json", self.shared_dir / f"{job_id}.result"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _publish(self, job: Job):
+        if self.shared_dir is None:
+            return
+        state, result_path = self._paths(job.id)
+        data = job.to_dict()
+        try:
+            # Ergebnis zuerst schreiben, damit "done" nie ohne Ergebnis sichtbar ist
+            if job.status == "done":
+                if isinstance(job.result, (bytes, bytearray)):
+                    data["result_type"] = "bytes"
+                    self._write_atomic(result_path, bytes(job.result))
+                else:
+                    data["result_type"] = "json"
+                    self._write_atomic(result_path, json.dumps(job.result).encode('utf-8'))
+            self._write_atomic(state, json.dumps(data).encode('utf-8'))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"WARNUNG: Job {job.id} nicht im gemeinsamen Verzeichnis abgelegt: {e}")
+
+    def _unpublish(self, job_id: str):
+        if self.shared_dir is None:
+            return
+        for path in self._paths(job_id):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _load_shared(self, job_id: str):
+        if self.shared_dir is None or not _JOB_ID.fullmatch(job_id or ''):
+            return None
+        state, result_path = self._paths(job_id)
+        try:
+            data = json.loads(state.read_bytes())
+            result = None
+            if data.get("status") == "done":
+                raw = result_path.read_bytes()
+                result = raw if data.get("result_type") == "bytes" else json.loads(raw)
+        except (OSError, ValueError):
+            return None
+        return Job.from_dict(data, result)
+
+    def _sweep_shared(self, now: float):
+        # Dateien abgestürzter/beendeter Prozesse, höchstens einmal pro Minute
+        if self.shared_dir is None or now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        max_age = self.result_ttl + self.timeout_seconds
+        for path in self.shared_dir.iterdir():
+            try:
+                if now - path.stat().st_mtime > max_age:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge()
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                "queue_depth": by_status.get("queued", 0),
+                "running": by_status.get("running", 0),
+                # Abgelaufen, aber der Aufruf belegt noch einen Worker
+                "timed_out_running": sum(1 for job_id in self._active
+                                         if job_id in self._jobs and self._jobs[job_id].status == "timeout"),
+                "jobs": by_status,
+                "max_queued": self.max_queued,
+                "workers": self.workers,
+                "timeout_seconds": self.timeout_seconds,
+            }
+
+    def shutdown(self, wait: bool = False):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,150 @@
+# llm_cache.py
+"""Cache für WatsonX-Antworten: In-Memory-LRU + SQLite-Datei (überlebt Neustarts)"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Leer = nur In-Memory (z.B. für Lasttests, siehe benchmarks/load_test.py)
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+MAX_MEMORY_ENTRIES = 256
+MAX_DISK_ENTRIES = 20000
+TTL_SECONDS = 30 * 24 * 3600
+# ============================================================================
+
+
+def make_key(model_id: str, parameters: dict, prompt: str) -> str:
+    """
+    Cache-Key als SHA-256 über (model_id, parameters, prompt).
+
+    Der Prompt enthält alle Werte der Schiffszeile und den Prompt-Text selbst.
+    Ändert sich die Zeile oder das Template, ändert sich damit auch der Key,
+    alte Einträge werden nicht mehr getroffen und laufen per TTL/LRU aus.
+    """
+    raw = json.dumps([model_id, parameters, prompt], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """Zweistufiger Cache für generierte Texte mit Hit/Miss-Zählern"""
+
+    def __init__(self, path=CACHE_PATH, max_memory_entries=MAX_MEMORY_ENTRIES,
+                 max_disk_entries=MAX_DISK_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.path = Path(path) if path else None
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()  # key -> (text, created_at)
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._connect()
+
+    def _connect(self):
+        if not self.path:
+            return
+        try:
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON llm_cache (accessed_at)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"WARNUNG: LLM-Cache auf Platte nicht verfügbar ({e}), nur In-Memory.")
+            self._db = None
+
+    def reopen(self):
+        """Neue SQLite-Verbindung nach fork() (Verbindungen dürfen nicht in Kindprozesse mitgenommen werden)"""
+        self._lock = threading.Lock()
+        self._db = None
+        self._connect()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key, text, created_at):
+        self._memory[key] = (text, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get(self, key: str):
+        """Gecachten Text liefern oder None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT text, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    text, created_at = row
+                    if not self._expired(created_at, now):
+                        self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, text, created_at)
+                        self.counters["disk_hits"] += 1
+                        return text
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, text: str):
+        """Text in beiden Stufen ablegen"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+            self.counters["writes"] += 1
+
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, text, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, text, now, now)
+            )
+            # Abgelaufene Einträge löschen, danach auf max_disk_entries kürzen (LRU nach accessed_at)
+            if self.ttl_seconds is not None:
+                self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            cur = self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+            self.counters["evictions"] += max(cur.rowcount, 0)
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = 0
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,383 @@
+# metrics.py
+"""
+Latenz pro Verarbeitungsstufe, /metrics im Prometheus-Textformat und
+strukturierte Logzeilen pro Anfrage.
+
+Ohne prometheus_client: Counter, Gauges und Histogramme (feste Buckets)
+mit Labels, Thread-sicher. stage("report.llm") misst eine Stufe (Dauer,
+gerade laufende Aufrufe, Fehler) und merkt sich die Dauer bei der laufenden
+Anfrage. Nach der Antwort wird pro Anfrage eine JSON-Zeile mit Request-ID,
+Status, Gesamtdauer und den Zeiten der einzelnen Stufen ausgegeben.
+
+Mehrere Worker-Prozesse (serve.py): jeder Prozess zählt für sich. Mit
+METRICS_DIR legt jeder Prozess alle paar Sekunden einen Schnappschuss ab,
+/metrics summiert dann über alle Prozesse (Gauges nur laufender Prozesse).
+"""
+
+import atexit
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Obergrenzen der Histogramm-Buckets in Sekunden: Lookup (<1 ms) bis LLM (Minuten)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Eine JSON-Zeile pro Anfrage auf stdout (REQUEST_LOG=0 schaltet ab)
+REQUEST_LOG = os.getenv("REQUEST_LOG", "1") == "1"
+# Schnappschüsse für mehrere Worker-Prozesse (nur mit serve.py gesetzt)
+METRICS_DIR = os.getenv("METRICS_DIR")
+SNAPSHOT_SECONDS = 5
+# ============================================================================
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+_REGISTRY = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: (list(value[0]), value[1], value[2]) if isinstance(value, list) else value
+                    for key, value in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # Erster Bucket mit Obergrenze >= value, dahinter +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [Anzahl je Bucket (nicht kumuliert), Summe, Anzahl]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+
+# --- Metriken der App ---
+HTTP_SECONDS = Histogram("fueleu_http_request_duration_seconds",
+                         "Dauer der HTTP-Anfragen bis zum letzten Byte", ("route", "method"))
+HTTP_REQUESTS = Counter("fueleu_http_requests_total",
+                        "Beantwortete HTTP-Anfragen", ("route", "method", "status"))
+HTTP_IN_FLIGHT = Gauge("fueleu_http_requests_in_flight", "Gerade laufende HTTP-Anfragen")
+STAGE_SECONDS = Histogram("fueleu_stage_duration_seconds",
+                          "Dauer einer Verarbeitungsstufe (Lookup, LLM, PDF-Layout, ...)", ("stage",))
+STAGE_IN_FLIGHT = Gauge("fueleu_stage_in_flight", "Gerade laufende Aufrufe einer Stufe", ("stage",))
+STAGE_ERRORS = Counter("fueleu_stage_errors_total",
+                       "Fehlgeschlagene Aufrufe einer Stufe nach Exception-Typ", ("stage", "error"))
+LLM_TOKENS = Counter("fueleu_llm_tokens_total",
+                     "Tokens der LLM-Aufrufe (prompt = Eingabe, generated = Ausgabe)", ("direction",))
+EXPORT_ROWS = Counter("fueleu_export_rows_total", "Exportierte Zeilen (/api/export) nach Format", ("format",))
+
+
+# ============================================================================
+# STUFEN UND ANFRAGEN
+# ============================================================================
+
+# Laufende Anfrage des aktuellen Threads (None in Jobs, CLI, Benchmarks)
+_current = ContextVar("metrics_request", default=None)
+
+
+class stage:
+    """
+    Eine Verarbeitungsstufe messen
+
+    with metrics.stage("pdf.layout"):
+        doc.build(story)
+
+    Exceptions werden gezählt (fueleu_stage_errors_total) und weitergereicht,
+    die Dauer steht danach in .seconds. Klasse statt @contextmanager, weil
+    der Lookup in search_ship nur Mikrosekunden braucht.
+    """
+
+    __slots__ = ("name", "seconds", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = None
+
+    def __enter__(self):
+        STAGE_IN_FLIGHT.inc(stage=self.name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        STAGE_IN_FLIGHT.dec(stage=self.name)
+        STAGE_SECONDS.observe(self.seconds, stage=self.name)
+        ctx = _current.get()
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.name, error=exc_type.__name__)
+        if ctx is not None:
+            ctx["stages"][self.name] = ctx["stages"].get(self.name, 0.0) + self.seconds
+            if exc_type is not None:
+                ctx["errors"].append(self.name)
+        return False
+
+
+def count_tokens(prompt: int = None, generated: int = None):
+    """Token-Anzahl eines LLM-Aufrufs (None = vom Modell nicht gemeldet)"""
+    ctx = _current.get()
+    for direction, count in (("prompt", prompt), ("generated", generated)):
+        if count is None:
+            continue
+        LLM_TOKENS.inc(count, direction=direction)
+        if ctx is not None:
+            ctx["tokens"][direction] = ctx["tokens"].get(direction, 0) + count
+
+
+def request_id(incoming: str = None) -> str:
+    """Request-ID vom Client/Proxy übernehmen (falls plausibel), sonst neu vergeben"""
+    if incoming and _REQUEST_ID.fullmatch(incoming):
+        return incoming
+    return os.urandom(8).hex()
+
+
+def current_request_id():
+    ctx = _current.get()
+    return ctx["request_id"] if ctx is not None else None
+
+
+def begin_request(rid: str):
+    HTTP_IN_FLIGHT.inc()
+    _current.set({"request_id": rid, "start": time.perf_counter(), "status": None,
+                  "stages": {}, "tokens": {}, "errors": [], "deferred": False})
+
+
+def set_status(status: int):
+    ctx = _current.get()
+    if ctx is not None:
+        ctx["status"] = status
+
+
+def defer_request():
+    """
+    Gestreamte Antwort: end_request() ohne ctx ignoriert die Anfrage,
+    abgeschlossen wird mit dem Rückgabewert nach dem letzten Byte
+    """
+    ctx = _current.get()
+    if ctx is not None:
+        ctx["deferred"] = True
+    return ctx
+
+
+def end_request(route: str, method: str, path: str = None, ctx: dict = None):
+    """Anfrage abschließen: Metriken aktualisieren und Logzeile ausgeben"""
+    if ctx is None:
+        ctx = _current.get()
+        if ctx is None or ctx["deferred"]:
+            return
+    if _current.get() is ctx:
+        _current.set(None)
+    seconds = time.perf_counter() - ctx["start"]
+    # Ohne Antwort (Exception nach dem Handler) zählt die Anfrage als 500
+    status = ctx["status"] or 500
+    HTTP_IN_FLIGHT.dec()
+    HTTP_SECONDS.observe(seconds, route=route, method=method)
+    HTTP_REQUESTS.inc(route=route, method=method, status=status)
+    if not REQUEST_LOG:
+        return
+    line = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "event": "request",
+        "request_id": ctx["request_id"],
+        "method": method,
+        "route": route,
+        "path": path,
+        "status": status,
+        "duration_ms": round(seconds * 1000, 3),
+        "stages_ms": {name: round(sec * 1000, 3) for name, sec in ctx["stages"].items()},
+    }
+    if ctx["tokens"]:
+        line["tokens"] = ctx["tokens"]
+    if ctx["errors"]:
+        line["failed_stages"] = ctx["errors"]
+    print(json.dumps(line, ensure_ascii=False))
+
+
+# ============================================================================
+# SCHNAPPSCHÜSSE (mehrere Worker-Prozesse)
+# ============================================================================
+
+_snapshot_thread = None
+
+
+def _snapshot() -> dict:
+    return {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for metric in _REGISTRY}
+
+
+def write_snapshot(directory=None):
+    directory = Path(directory or METRICS_DIR)
+    path = directory / f"{os.getpid()}.json"
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        tmp.write_text(json.dumps(_snapshot()))
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"WARNUNG: Metrik-Schnappschuss nicht geschrieben: {e}")
+
+
+def clear_snapshots(directory=None):
+    """Beim Serverstart: Zähler eines früheren Laufs verwerfen"""
+    directory = Path(directory or METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def after_fork():
+    """Im Worker nach fork(): geerbte Werte verwerfen, Schnappschüsse starten"""
+    global _snapshot_thread
+    for metric in _REGISTRY:
+        metric.reset()
+    if not METRICS_DIR:
+        return
+
+    def loop():
+        while True:
+            time.sleep(SNAPSHOT_SECONDS)
+            write_snapshot()
+
+    _snapshot_thread = threading.Thread(target=loop, name="metrics-snapshot", daemon=True)
+    _snapshot_thread.start()
+    # Zähler beendeter Worker bleiben in der Summe erhalten
+    atexit.register(write_snapshot)
+
+
+def _merged() -> dict:
+    values = {metric.name: metric.snapshot() for metric in _REGISTRY}
+    if not METRICS_DIR:
+        return values
+    kinds = {metric.name: metric.kind for metric in _REGISTRY}
+    own = f"{os.getpid()}.json"
+    for path in Path(METRICS_DIR).glob("*.json"):
+        if path.name == own:
+            continue
+        try:
+            other = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        alive = _alive(int(path.stem))
+        for name, entries in other.items():
+            if name not in values or (kinds[name] == "gauge" and not alive):
+                continue
+            target = values[name]
+            for key, value in entries:
+                key = tuple(key)
+                if kinds[name] == "histogram":
+                    counts, total, count = target.get(key, ([0] * len(value[0]), 0.0, 0))
+                    target[key] = ([a + b for a, b in zip(counts, value[0])], total + value[1], count + value[2])
+                else:
+                    target[key] = target.get(key, 0) + value
+    return values
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, key, extra: str = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render() -> str:
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)"""
+    values = _merged()
+    lines = []
+    for metric in _REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(values[metric.name].items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(metric.labels, key)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, n in zip(metric.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(metric.labels, key, f'le="{le}"')
+                lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labels, key)} {_number(total)}")
+            lines.append(f"{metric.name}_count{_labels(metric.labels, key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,209 @@
+# peer_stats.py
+"""Vergleichsgruppen (Schiffstyp + Größenklasse): Quantile und Perzentil-Rang pro Schiff"""
+
+
+import numpy as np
+import pandas as pd
+
+from ship_index import normalize_imo
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+METRICS = {
+    'y_mrv_co2_per_nm_kg': 'MRV CO2 Intensity',
+    'residual_kg': 'Deviation (Absolute)',
+    'residual_pct': 'Deviation (Relative)',
+}
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Größenklassen: Länge in m, Breite in m (Panamax / Neopanamax)
+LENGTH_BANDS = (0, 100, 150, 200, 250, 300, np.inf)
+WIDTH_BANDS = (0, 32.3, 49, np.inf)
+# Kleinere Gruppen (Typ + Größe) fallen auf die Gruppe "nur Typ" zurück
+MIN_GROUP_SIZE = 20
+# ============================================================================
+
+
+def _band_labels(edges, unit: str) -> list:
+    labels = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if lo == 0:
+            labels.append(f"<{hi:g} {unit}")
+        elif np.isinf(hi):
+            labels.append(f">={lo:g} {unit}")
+        else:
+            labels.append(f"{lo:g}-{hi:g} {unit}")
+    return labels
+
+
+def _band_codes(values: np.ndarray, edges) -> np.ndarray:
+    # -1 = Wert fehlt
+    codes = np.searchsorted(np.asarray(edges[1:-1]), values, side='right')
+    return np.where(np.isnan(values), -1, codes)
+
+
+class PeerStats:
+    """
+    Einmal pro Datenstand berechnet (groupby über alle Schiffe), danach
+    O(1)-Lookup über (IMO, Berichtsjahr).
+
+    Gruppen werden pro Berichtsjahr gebildet. Perzentil = Anteil der Gruppe
+    mit kleinerem oder gleichem Wert (0-100).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        n = len(df)
+        metrics = [m for m in METRICS if m in df.columns]
+        self.metrics = metrics
+
+        years = df['report_year'].to_numpy() if 'report_year' in df.columns else np.zeros(n, dtype=np.int64)
+        ship_type = df['mrv_ship_type'].fillna('Unknown').astype(str).to_numpy() if 'mrv_ship_type' in df.columns \
+            else np.full(n, 'Unknown', dtype=object)
+        length = df['length'].to_numpy(dtype=np.float64) if 'length' in df.columns else np.full(n, np.nan)
+        width = df['width'].to_numpy(dtype=np.float64) if 'width' in df.columns else np.full(n, np.nan)
+
+        length_labels = _band_labels(LENGTH_BANDS, 'm')
+        width_labels = _band_labels(WIDTH_BANDS, 'm')
+        size_code = _band_codes(length, LENGTH_BANDS) * len(WIDTH_BANDS) + _band_codes(width, WIDTH_BANDS)
+        size_code = np.where(np.isnan(length) | np.isnan(width), -1, size_code)
+
+        keys = pd.DataFrame({'year': years, 'type': ship_type, 'size': size_code})
+        values = df[metrics].astype(np.float64).reset_index(drop=True)
+
+        # Ebene 1: Jahr + Typ, Ebene 2: Jahr + Typ + Größe
+        type_ids = keys.groupby(['year', 'type'], sort=False).ngroup().to_numpy()
+        size_ids = keys.groupby(['year', 'type', 'size'], sort=False).ngroup().to_numpy()
+        size_counts = np.bincount(size_ids)
+        use_size = (size_code >= 0) & (size_counts[size_ids] >= MIN_GROUP_SIZE)
+
+        # Perzentile beider Ebenen vektorisiert, pro Schiff die passende Ebene wählen
+        pct_type = values.groupby(type_ids).rank(pct=True, method='max').to_numpy() * 100
+        pct_size = values.groupby(size_ids).rank(pct=True, method='max').to_numpy() * 100
+        self._percentiles = np.where(use_size[:, None], pct_size, pct_type).astype(np.float32)
+        self._values = values.to_numpy(dtype=np.float64)
+
+        # Gruppenbeschreibung + Quantile, je Gruppe einmal als fertiges Dictionary
+        self._groups = []
+        group_of = np.empty(n, dtype=np.int64)
+        for level, ids, use in (('type', type_ids, ~use_size), ('type_size', size_ids, use_size)):
+            if not use.any():
+                continue
+            quantiles = values[use].groupby(ids[use]).quantile(list(QUANTILES))
+            counts = np.bincount(ids[use])
+            first = pd.Series(np.flatnonzero(use)).groupby(ids[use]).first()
+            mapping = np.full(ids.max() + 1, -1, dtype=np.int64)
+            for gid, row in first.items():
+                group = {
+                    "level": level,
+                    "report_year": int(years[row]) if 'report_year' in df.columns else None,
+                    "mrv_ship_type": ship_type[row],
+                    "count": int(counts[gid]),
+                }
+                if level == 'type_size':
+                    group["length_band"] = length_labels[_band_codes(length[row:row + 1], LENGTH_BANDS)[0]]
+                    group["width_band"] = width_labels[_band_codes(width[row:row + 1], WIDTH_BANDS)[0]]
+                group["quantiles"] = {
+                    metric: {f"p{int(q * 100)}": _clean(quantiles.loc[(gid, q), metric]) for q in QUANTILES}
+                    for metric in metrics
+                }
+                mapping[gid] = len(self._groups)
+                self._groups.append(group)
+            group_of[use] = mapping[ids[use]]
+        self._group_of = group_of
+
+        # (IMO, Jahr) -> Zeile, plus IMO -> Zeile des neuesten Jahres
+        imos = df['imo'].to_numpy(dtype=object)
+        self._rows = dict(zip(zip(imos, years.tolist()), range(n)))
+        latest = np.argsort(-years, kind='stable')
+        self._latest = {}
+        for row in latest.tolist():
+            self._latest.setdefault(imos[row], row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def lookup(self, imo, year=None):
+        """
+        Vergleichsgruppe einer Schiffszeile
+
+        Returns:
+            {"group": {...}, "metrics": {metric: {"value", "percentile", "quantiles"}}}
+            oder None, falls die IMO unbekannt ist
+        """
+        imo = normalize_imo(imo)
+        if year in (None, ''):
+            row = self._latest.get(imo)
+        else:
+            try:
+                row = self._rows.get((imo, int(year)))
+            except (TypeError, ValueError):
+                row = None
+        if row is None:
+            return None
+
+        group = self._groups[self._group_of[row]]
+        metrics = {}
+        for k, metric in enumerate(self.metrics):
+            metrics[metric] = {
+                "value": _clean(self._values[row, k]),
+                "percentile": _clean(round(float(self._percentiles[row, k]), 1)),
+                "quantiles": group["quantiles"][metric],
+            }
+        return {
+            "group": {key: value for key, value in group.items() if key != "quantiles"},
+            "metrics": metrics,
+        }
+
+
+def _clean(value):
+    # NaN -> None, damit JSON valide bleibt
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def format_value(metric: str, value) -> str:
+    if value is None:
+        return "n/a"
+    if metric == 'residual_pct':
+        return f"{value * 100:.1f} %"
+    return f"{value:,.1f} kg/nm"
+
+
+def format_peer_lines(peer: dict) -> list:
+    """Kurzbeschreibung für Prompt und PDF: [(label, text), ...]"""
+    lines = []
+    for metric, stats in peer["metrics"].items():
+        if stats["percentile"] is None:
+            continue
+        q = stats["quantiles"]
+        lines.append((
+            METRICS[metric],
+            f"{format_value(metric, stats['value'])}, percentile {stats['percentile']:.0f} "
+            f"(group median {format_value(metric, q['p50'])}, "
+            f"P25-P75 {format_value(metric, q['p25'])} to {format_value(metric, q['p75'])})"
+        ))
+    return lines
+
+
+def describe_group(group: dict) -> str:
+    text = f"{group['mrv_ship_type']}"
+    if group["level"] == 'type_size':
+        text += f", length {group['length_band']}, width {group['width_band']}"
+    if group.get("report_year") is not None:
+        text += f", {group['report_year']}"
+    return f"{text}, {group['count']} ships"
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+STATS_COLUMNS = ['imo', 'report_year', 'mrv_ship_type', 'length', 'width'] + list(METRICS)
+
+def build_peer_stats(dataset) -> PeerStats:
+    return PeerStats(dataset.read_columns(STATS_COLUMNS))
+
+def get_peer_stats(dataset) -> PeerStats:
+    """Statistik zum Datenstand der übergebenen Datenbank (an der Instanz gemerkt)"""
+    return dataset.derived("peer_stats", build_peer_stats)
@@ -6,17 +6,23 @@ const resultsSection = document.getElementById('resultsSection');
 const statusMsg = document.getElementById('statusMsg');
 const aiButton = document.getElementById('aiButton');
 const pdfButton = document.getElementById('pdfButton');
+const aiReportSection = document.getElementById('aiReportSection');
+const aiReportText = document.getElementById('aiReportText');
 let currentShipData = null;
 
 form.addEventListener('submit', async (e) => {
     e.preventDefault();
-    const imo = document.getElementById('imoInput').value.trim();
-    if (!imo) return;
+    const input = document.getElementById('imoInput').value.trim();
+    if (!input) return;
+    // Schiffsname eingegeben: bester Autocomplete-Treffer liefert die IMO
+    const imo = /^\d+$/.test(input) ? input : await resolveImo(input);
+    hideSuggestions();
 
     // UI Reset
     setLoading(true);
     resultsSection.classList.add('hidden');
     aiButton.classList.add('hidden');
+    aiReportSection.classList.add('hidden');
     statusMsg.textContent = "Search Ship in Database...";
     statusMsg.className = "mt-4 text-blue-600";
 
@@ -39,6 +45,7 @@ form.addEventListener('submit', async (e) => {
         renderShipDetails(shipData);
         renderMetrics(shipData);
         renderComplianceGrid(shipData);
+        renderPeerStats(result.peer_stats);
 
         statusMsg.textContent = "Data successfully loaded.";
         statusMsg.className = "mt-4 text-green-600";
@@ -53,6 +60,104 @@ form.addEventListener('submit', async (e) => {
     }
 });
 
+// --- AUTOCOMPLETE (Schiffsname / IMO-Präfix) ---
+const imoInput = document.getElementById('imoInput');
+const suggestionsList = document.getElementById('suggestions');
+const AUTOCOMPLETE_DELAY_MS = 150;
+let suggestionTimer = null;
+let suggestionController = null;
+let suggestions = [];
+let activeSuggestion = -1;
+
+async function fetchSuggestions(query, limit = 8) {
+    // Ältere, noch laufende Anfrage abbrechen (nur die letzte Eingabe zählt)
+    if (suggestionController) suggestionController.abort();
+    suggestionController = new AbortController();
+    const response = await fetch(`/api/autocomplete?q=${encodeURIComponent(query)}&limit=${limit}`,
+        { signal: suggestionController.signal });
+    if (!response.ok) return [];
+    return (await response.json()).results;
+}
+
+async function resolveImo(query) {
+    const match = suggestions.length ? suggestions[Math.max(activeSuggestion, 0)] : (await fetchSuggestions(query, 1))[0];
+    return match ? match.imo : query;
+}
+
+function hideSuggestions() {
+    clearTimeout(suggestionTimer);
+    suggestionsList.classList.add('hidden');
+    suggestions = [];
+    activeSuggestion = -1;
+}
+
+function renderSuggestions() {
+    suggestionsList.innerHTML = '';
+    if (!suggestions.length) {
+        suggestionsList.classList.add('hidden');
+        return;
+    }
+    suggestions.forEach((s, i) => {
+        const li = document.createElement('li');
+        li.className = `px-4 py-2 cursor-pointer flex justify-between gap-4 ${i === activeSuggestion ? 'bg-blue-50' : 'hover:bg-gray-50'}`;
+        const name = document.createElement('span');
+        name.textContent = s.ship_name || '-';
+        const meta = document.createElement('span');
+        meta.className = 'text-gray-400 text-sm';
+        meta.textContent = `${s.imo}${s.mrv_ship_type ? ' · ' + s.mrv_ship_type : ''}`;
+        li.append(name, meta);
+        // mousedown statt click: feuert vor dem blur des Eingabefelds
+        li.addEventListener('mousedown', (e) => {
+            e.preventDefault();
+            selectSuggestion(i);
+        });
+        suggestionsList.appendChild(li);
+    });
+    suggestionsList.classList.remove('hidden');
+}
+
+function selectSuggestion(i) {
+    imoInput.value = suggestions[i].imo;
+    hideSuggestions();
+    form.requestSubmit();
+}
+
+imoInput.addEventListener('input', () => {
+    clearTimeout(suggestionTimer);
+    const query = imoInput.value.trim();
+    if (!query) {
+        hideSuggestions();
+        return;
+    }
+    // Debounce: erst nach einer kurzen Tipp-Pause anfragen
+    suggestionTimer = setTimeout(async () => {
+        try {
+            suggestions = await fetchSuggestions(query);
+            activeSuggestion = -1;
+            renderSuggestions();
+        } catch (e) {
+            if (e.name !== 'AbortError') console.error(e);
+        }
+    }, AUTOCOMPLETE_DELAY_MS);
+});
+
+imoInput.addEventListener('keydown', (e) => {
+    if (suggestionsList.classList.contains('hidden') || !suggestions.length) return;
+    if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+        e.preventDefault();
+        const step = e.key === 'ArrowDown' ? 1 : -1;
+        activeSuggestion = (activeSuggestion + step + suggestions.length) % suggestions.length;
+        renderSuggestions();
+    } else if (e.key === 'Enter' && activeSuggestion >= 0) {
+        e.preventDefault();
+        selectSuggestion(activeSuggestion);
+    } else if (e.key === 'Escape') {
+        hideSuggestions();
+    }
+});
+
+imoInput.addEventListener('blur', () => setTimeout(hideSuggestions, 100));
+
 // --- 2. KI REPORT (BUTTON CLICK) ---
 aiButton.addEventListener('click', async () => {
     if (!currentShipData) return;
@@ -65,8 +170,14 @@ aiButton.addEventListener('click', async () => {
     statusMsg.textContent = "WatsonX generates Report...";
     statusMsg.className = "mt-4 text-indigo-600";
 
+    aiReportText.textContent = "";
+    aiReportSection.classList.remove('hidden');
+
     try {
-        const aiText = await fetchAiReport(currentShipData);
+        const aiText = await fetchAiReport(currentShipData, (textSoFar) => {
+            aiReportText.textContent = textSoFar;
+        });
+        aiReportText.textContent = aiText;
         
         console.log("KI Bericht:", aiText);
         
@@ -91,22 +202,87 @@ aiButton.addEventListener('click', async () => {
     }
 });
 
-// Hilfsfunktion für KI
-async function fetchAiReport(shipData) {
+// Hilfsfunktion für KI: Report per Server-Sent Events streamen und Text sofort anzeigen
+async function fetchAiReport(shipData, onChunk) {
     try {
-        const response = await fetch('/api/generate-report', {
+        const response = await fetch('/api/generate-report/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             // ÄNDERUNG: Das komplette Objekt wird als JSON gesendet
             body: JSON.stringify(shipData) 
         });
-        const data = await response.json();
-        return data.success ? data.text : "Error: " + data.error;
+        if (!response.ok || !response.body) {
+            const data = await response.json();
+            return "Error: " + data.error;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let text = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE-Events sind durch eine Leerzeile getrennt
+            let sep;
+            while ((sep = buffer.indexOf("\n\n")) !== -1) {
+                const rawEvent = buffer.slice(0, sep);
+                buffer = buffer.slice(sep + 2);
+
+                let eventName = "message";
+                let dataLine = "";
+                for (const line of rawEvent.split("\n")) {
+                    if (line.startsWith("event:")) eventName = line.slice(6).trim();
+                    else if (line.startsWith("data:")) dataLine += line.slice(5).trim();
+                }
+                if (!dataLine) continue;
+                const payload = JSON.parse(dataLine);
+
+                if (eventName === "error") return "Error: " + payload.error;
+                if (eventName === "message" && payload.text) {
+                    text += payload.text;
+                    if (onChunk) onChunk(text);
+                }
+            }
+        }
+        return text;
     } catch (e) {
         return "Network error";
     }
 }
 
+// Job einreichen, Status pollen und die Ergebnis-Response zurückgeben
+async function runJob(url, payload, pollMs = 500) {
+    const submit = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    });
+    const submitted = await submit.json();
+    if (!submit.ok) {
+        throw new Error(submitted.error || "Job could not be submitted");
+    }
+
+    const jobId = submitted.job.id;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, pollMs));
+        const statusResponse = await fetch(`/api/jobs/${jobId}`);
+        const job = await statusResponse.json();
+        if (!statusResponse.ok) {
+            throw new Error(job.error || "Job not found");
+        }
+        if (job.status === 'done') {
+            return fetch(`/api/jobs/${jobId}/result`);
+        }
+        if (job.status === 'failed' || job.status === 'timeout') {
+            throw new Error(job.error || `Job ${job.status}`);
+        }
+    }
+}
+
 function roundNumbers(value) {
     if (value === null || value === undefined) return value;
     if (Array.isArray(value)) return value.map(roundNumbers);
@@ -225,6 +401,34 @@ function renderComplianceGrid(data) {
     }
 }
 
+const PEER_LABELS = {
+    y_mrv_co2_per_nm_kg: 'MRV CO2 Intensity',
+    residual_kg: 'Residual',
+    residual_pct: 'Residual %'
+};
+
+function renderPeerStats(peer) {
+    const section = document.getElementById('peerStats');
+    if (!peer) {
+        section.classList.add('hidden');
+        return;
+    }
+    const g = peer.group;
+    const size = g.level === 'type_size' ? `, length ${g.length_band}, width ${g.width_band}` : '';
+    document.getElementById('peerGroup').textContent = `${g.mrv_ship_type}${size} (${g.count} ships)`;
+
+    const fmt = (metric, v) => v === null || v === undefined ? 'n/a'
+        : metric === 'residual_pct' ? `${(v * 100).toFixed(1)}%` : `${v.toFixed(1)} kg/nm`;
+    document.getElementById('peerGrid').innerHTML = Object.entries(peer.metrics).map(([metric, m]) => `
+        <div>
+            <p class="text-sm text-gray-500">${PEER_LABELS[metric] || metric}</p>
+            <p class="text-2xl font-bold">${m.percentile === null ? 'n/a' : 'P' + Math.round(m.percentile)}</p>
+            <p class="text-xs text-gray-400">Median ${fmt(metric, m.quantiles.p50)} · P25–P75 ${fmt(metric, m.quantiles.p25)} – ${fmt(metric, m.quantiles.p75)}</p>
+        </div>
+    `).join('');
+    section.classList.remove('hidden');
+}
+
 function setLoading(isLoading) {
     const btn = form.querySelector('button');
     if (isLoading) {
@@ -250,14 +454,11 @@ if (pdfButton) {
         pdfButton.disabled = true;
 
         try {
-            // Anfrage an deine neue Route
-            const response = await fetch('/api/download-pdf', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    imo: currentShipData.imo || currentShipData.IMO, // Achte auf Groß/Klein je nach DB
-                    text: currentShipData.aiAnalysisText
-                })
+            // PDF als Job einreihen und per Polling auf das Ergebnis warten
+            const response = await runJob('/api/jobs/pdf', {
+                imo: currentShipData.imo || currentShipData.IMO, // Achte auf Groß/Klein je nach DB
+                text: currentShipData.aiAnalysisText,
+                year: currentShipData.report_year // PDF zum angezeigten Berichtsjahr
             });
 
             if (response.ok) {
@@ -2,8 +2,12 @@
 
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, date
+from collections import OrderedDict
+import hashlib
+import io
 import sys
+import threading
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -16,13 +20,24 @@ from reportlab.platypus import (
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 
+import metrics
+from ship_data import ShipDataset, add_reload_listener, get_dataset
+from flag_engine import DISPLAY_BY_RAW
+from peer_stats import METRICS as PEER_METRICS, describe_group, format_value as format_peer_value, get_peer_stats
+
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
-PARQUET_PATH = r"ship_report_imo_2024.parquet"
 OUTPUT_DIR = ""
 COVER_IMAGE_PATH = "logo.png"
+# Verkleinertes Logo für das Deckblatt (einmalig beim Start erzeugt)
+ASSET_CACHE_DIR = ".asset_cache"
+LOGO_BOX = (12*cm, 6*cm)
+LOGO_PRINT_DPI = 300
+# Erhöhen, wenn sich das Layout ändert (macht gecachte PDFs ungültig)
+TEMPLATE_VERSION = "1"
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024
 # ============================================================================
 
 
@@ -54,16 +69,119 @@ class NumberedCanvas(canvas.Canvas):
         )
 
 
+class _StoryStream(list):
+    """
+    Flowable list for doc.build() that is filled lazily from a generator.
+
+    Platypus consumes the story from the front and checks len() before every
+    flowable, so only a few flowables exist at any time instead of the whole
+    fleet.
+    """
+    def __init__(self, source, lookahead=8):
+        list.__init__(self)
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return list.__len__(self)
+
+
+class TotalPagesCanvas(canvas.Canvas):
+    """
+    Canvas with "Page X of Y" that does not keep page states in memory.
+
+    NumberedCanvas keeps a copy of every page until save(), which is fine for a
+    single-ship report but grows linearly for fleet reports. Here each page is
+    written out immediately and only references a form XObject with the total
+    page count, which is filled in once at save().
+    """
+    TOTAL_FORM = "totalPages"
+    TOTAL_WIDTH = 1.0*cm
+
+    def showPage(self):
+        self.draw_page_number()
+        canvas.Canvas.showPage(self)
+
+    def draw_page_number(self):
+        self.saveState()
+        self.setFont("Helvetica", 9)
+        self.setFillColor(colors.grey)
+        x = A4[0] - 1.5*cm - self.TOTAL_WIDTH
+        self.drawRightString(x, 1*cm, f"Page {self._pageNumber} of ")
+        self.translate(x, 1*cm)
+        self.doForm(self.TOTAL_FORM)
+        self.restoreState()
+
+    def save(self):
+        self.beginForm(self.TOTAL_FORM)
+        self.setFont("Helvetica", 9)
+        self.setFillColor(colors.grey)
+        self.drawString(0, 0, str(self._pageNumber - 1))
+        self.endForm()
+        canvas.Canvas.save(self)
+
+
+class CoverLogo:
+    """
+    Druckfertiges Logo für das Deckblatt.
+
+    logo.png (1024x1536 RGBA, ~2.6 MB) wird einmalig auf die tatsächliche
+    Druckgröße bei LOGO_PRINT_DPI verkleinert, auf Weiß gelegt (das Deckblatt
+    ist weiß) und als JPEG abgelegt. ReportLab bettet JPEG-Dateien direkt ein,
+    ohne sie pro Report neu zu dekodieren und zu komprimieren.
+    """
+
+    def __init__(self, source_path: Path, box=LOGO_BOX, dpi=LOGO_PRINT_DPI, cache_dir=ASSET_CACHE_DIR):
+        from PIL import Image
+
+        with Image.open(source_path) as src:
+            src_w, src_h = src.size
+            # Gleiche Skalierung wie RLImage(kind='proportional')
+            factor = min(box[0] / src_w, box[1] / src_h)
+            self.draw_width = src_w * factor
+            self.draw_height = src_h * factor
+
+            stat = source_path.stat()
+            self.path = Path(cache_dir) / f"{source_path.stem}_{stat.st_size}_{int(stat.st_mtime)}_{dpi}dpi.jpg"
+            if self.path.exists():
+                return
+
+            px_w = max(1, round(self.draw_width / 72 * dpi))
+            px_h = max(1, round(self.draw_height / 72 * dpi))
+            img = src.convert('RGBA').resize((px_w, px_h), Image.LANCZOS)
+
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        background.save(tmp_path, format='JPEG', quality=90, dpi=(dpi, dpi))
+        tmp_path.replace(self.path)
+        print(f"Logo für Deckblatt vorbereitet: {self.path} ({px_w}x{px_h} px)")
+
+    def flowable(self) -> RLImage:
+        return RLImage(str(self.path), width=self.draw_width, height=self.draw_height)
+
+
+_stylesheet = None
+
+
 class ShipReportGenerator:
     """Professional PDF Generator for Ship Reports"""
     
-    def __init__(self):
-        self.parquet_path = Path(PARQUET_PATH)
+    def __init__(self, dataset: ShipDataset = None):
+        # Gleiche Datenbank wie die API (einmal geladen, Spalten klein geschrieben)
+        self._dataset = dataset
         self.output_dir = Path(OUTPUT_DIR) if OUTPUT_DIR else Path(".")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.cover_image_path = Path(COVER_IMAGE_PATH) if COVER_IMAGE_PATH else None
+        self.cover_logo = self._prepare_cover_logo()
         
-        self.df = pd.read_parquet(self.parquet_path)
         self.styles = self._initialize_styles()
         
         # Colors
@@ -73,7 +191,26 @@ class ShipReportGenerator:
         self.success_color = colors.HexColor('#27ae60')
         self.danger_color = colors.HexColor('#e74c3c')
     
+    @property
+    def dataset(self) -> ShipDataset:
+        # Ohne feste Datenbank immer die aktuelle Instanz (nach Hot Reload getauscht)
+        return self._dataset if self._dataset is not None else get_dataset()
+
+    def _prepare_cover_logo(self):
+        if not (self.cover_image_path and self.cover_image_path.exists()):
+            return None
+        try:
+            return CoverLogo(self.cover_image_path)
+        except Exception as e:
+            print(f"Warning: Logo could not be prepared: {e}")
+            return None
+    
     def _initialize_styles(self):
+        # Stylesheet nur einmal pro Prozess aufbauen und für alle Reports wiederverwenden
+        global _stylesheet
+        if _stylesheet is not None:
+            return _stylesheet
+        
         styles = getSampleStyleSheet()
         
         # Custom Styles
@@ -142,6 +279,7 @@ class ShipReportGenerator:
             except:
                 pass
         
+        _stylesheet = styles
         return styles
     
     def _format_flag_reason(self, flag_reason: str) -> str:
@@ -160,26 +298,10 @@ class ShipReportGenerator:
         # Konvertiere zu String falls es ein anderer Typ ist
         reason = str(flag_reason).strip()
         
-        # Mapping von technischen Codes zu lesbaren Texten
-        reason_map = {
-            'ok': 'Within normal parameters',
-            'rel_residual>30%': 'Relative deviation exceeds 30% threshold',
-            'abs_residual>p95': 'Absolute deviation exceeds 95th percentile',
-            'rel_residual>30': 'Relative deviation exceeds 30% threshold',
-            'abs_residual>95': 'Absolute deviation exceeds 95th percentile',
-        }
-        
-        # Wenn exakte Übereinstimmung gefunden wird
-        if reason in reason_map:
-            return reason_map[reason]
-        
-        # Versuche Teilübereinstimmungen
-        if 'rel_residual' in reason.lower() and '30' in reason:
-            return 'Relative deviation exceeds 30% threshold'
-        if 'abs_residual' in reason.lower() and ('p95' in reason or '95' in reason):
-            return 'Absolute deviation exceeds 95th percentile'
-        if reason.lower() == 'ok':
-            return 'Within normal parameters'
+        # Bekannte Werte: vorab aufgelöster Anzeige-Text (flag_engine)
+        display = DISPLAY_BY_RAW.get(reason) or DISPLAY_BY_RAW.get(reason.lower())
+        if display is not None:
+            return display
         
         # Falls nichts matched, gebe formatierten Original-Text zurück
         # Ersetze technische Symbole durch lesbarere Versionen
@@ -194,23 +316,19 @@ class ShipReportGenerator:
         
         return formatted
     
-    def _get_ship_record(self, imo: str):
-        ship_data = self.df[self.df['IMO'].astype(str).str.strip() == str(imo).strip()]
-        if ship_data.empty:
-            raise ValueError(f"No data found for IMO {imo}")
-        return ship_data.iloc[0].to_dict()
+    def _get_ship_record(self, imo: str, year: int = None):
+        ship_data = self.dataset.get_record(imo, year)
+        if ship_data is None:
+            suffix = f" in {year}" if year is not None else ""
+            raise ValueError(f"No data found for IMO {imo}{suffix}")
+        return ship_data
     
     def _create_cover_page(self, story, ship_data, imo):
         """Modern cover design"""
         # Logo centered
-        if self.cover_image_path and self.cover_image_path.exists():
+        if self.cover_logo is not None:
             try:
-                img = RLImage(
-                    str(self.cover_image_path), 
-                    width=12*cm,
-                    height=6*cm,
-                    kind='proportional'
-                )
+                img = self.cover_logo.flowable()
                 story.append(Spacer(1, 3*cm))
                 story.append(img)
             except Exception as e:
@@ -308,67 +426,22 @@ class ShipReportGenerator:
         table.setStyle(TableStyle(base_style))
         return table
     
-    def generate_pdf_report(self, imo: str, report_text: str) -> str:
-        ship_data = self._get_ship_record(imo)
-        
-        output_filename = f"Ship_Report_{imo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        output_path = self.output_dir / output_filename
-        
-        doc = SimpleDocTemplate(
-            str(output_path),
-            pagesize=A4,
-            rightMargin=2*cm,
-            leftMargin=2*cm,
-            topMargin=2*cm,
-            bottomMargin=2.5*cm
-        )
-        
-        story = []
-        
-        # === COVER PAGE ===
-        self._create_cover_page(story, ship_data, imo)
-        
-        # === ANALYSIS REPORT (2nd page) ===
-        story.append(Paragraph("1. Analysis Report", self.styles['SectionHeader']))
-        story.append(Spacer(1, 0.5*cm))
-        
-        for para in report_text.split('\n\n'):
-            if para.strip():
-                story.append(Paragraph(para.strip(), self.styles['BodyText']))
-                story.append(Spacer(1, 0.3*cm))
-        
-        # Footer after report text on same page
-        story.append(Spacer(1, 1*cm))
-        timestamp = datetime.now().strftime("%B %d, %Y at %H:%M")
-        footer = f"<font size=9 color='#888888'><i>Automatically generated on {timestamp}</i></font>"
-        story.append(Paragraph(footer, self.styles['Normal']))
-        
-        story.append(PageBreak())
-        
-        # === MASTER DATA ===
-        story.append(Paragraph("2. Master Data", self.styles['SectionHeader']))
-        story.append(Spacer(1, 0.5*cm))
-        
+    def _master_data_rows(self, ship_data) -> list:
         master_data = [['Attribute', 'Value']]
         for label, key in [
-            ('IMO', 'IMO'),
+            ('IMO', 'imo'),
             ('Ship Name', 'ship_name'),
-            ('Vessel Type (AIS)', 'VesselType'),
+            ('Vessel Type (AIS)', 'vesseltype'),
             ('Vessel Type (MRV)', 'mrv_ship_type'),
             ('Report Year', 'report_year')
         ]:
             value = ship_data.get(key, 'N/A')
-            if isinstance(value, float) and key != 'VesselType':
+            if isinstance(value, float) and key != 'vesseltype':
                 value = f"{int(value)}"
             master_data.append([label, str(value)])
-        
-        story.append(self._create_styled_table(master_data))
-        story.append(PageBreak())
-        
-        # === AIS DATA ===
-        story.append(Paragraph("3. AIS Data", self.styles['SectionHeader']))
-        story.append(Spacer(1, 0.5*cm))
-        
+        return master_data
+    
+    def _ais_data_rows(self, ship_data) -> list:
         ais_data = [['Parameter', 'Value']]
         for label, key in [
             ('Total Distance', 'ais_distance_nm_total'),
@@ -378,8 +451,8 @@ class ShipReportGenerator:
             ('Median Speed', 'sog_p50_kn'),
             ('95th Percentile Speed', 'sog_p95_kn'),
             ('Navigation Activity', 'moving_share'),
-            ('Ship Length', 'Length'),
-            ('Ship Width', 'Width'),
+            ('Ship Length', 'length'),
+            ('Ship Width', 'width'),
             ('Draft (Median)', 'draft_m_median')
         ]:
             value = ship_data.get(key, 'N/A')
@@ -392,21 +465,16 @@ class ShipReportGenerator:
                     value = f"{value:.1f} h"
                 elif 'points' in key:
                     value = f"{int(value):,}"
-                elif 'Length' == key or 'Width' == key or 'draft' in key:
+                elif 'length' == key or 'width' == key or 'draft' in key:
                     value = f"{value:.1f} m"
                 elif 'sog' in key:
                     value = f"{value:.2f} kn"
                 else:
                     value = f"{value:.2f}"
             ais_data.append([label, str(value)])
-        
-        story.append(self._create_styled_table(ais_data))
-        story.append(PageBreak())
-        
-        # === EMISSIONS DATA ===
-        story.append(Paragraph("4. Emissions and Assessment Data", self.styles['SectionHeader']))
-        story.append(Spacer(1, 0.5*cm))
-        
+        return ais_data
+    
+    def _emissions_data_rows(self, ship_data) -> list:
         emissions_data = [['Parameter', 'Value']]
         for label, key in [
             ('MRV CO2 Intensity', 'y_mrv_co2_per_nm_kg'),
@@ -432,6 +500,100 @@ class ShipReportGenerator:
         
         emissions_data.append(['Assessment Status', flag_display])
         emissions_data.append(['Reason', formatted_reason])
+        return emissions_data
+    
+    def _peer_rows(self, ship_data):
+        """(Gruppenbeschreibung, Tabellenzeilen) oder None, falls keine Vergleichsgruppe"""
+        peer = get_peer_stats(self.dataset).lookup(ship_data.get('imo'), ship_data.get('report_year'))
+        if peer is None:
+            return None
+        rows = [['Metric', 'Value', 'Percentile', 'Group Median', 'Group P25 - P75']]
+        for metric, stats in peer['metrics'].items():
+            q = stats['quantiles']
+            percentile = 'N/A' if stats['percentile'] is None else f"{stats['percentile']:.0f}"
+            rows.append([
+                PEER_METRICS[metric],
+                format_peer_value(metric, stats['value']),
+                percentile,
+                format_peer_value(metric, q['p50']),
+                f"{format_peer_value(metric, q['p25'])} - {format_peer_value(metric, q['p75'])}",
+            ])
+        return f"<font size=9 color='#666666'>Peer group: {describe_group(peer['group'])}</font>", rows
+    
+    def generate_pdf_report(self, imo: str, report_text: str, year: int = None) -> str:
+        """Report als Datei in output_dir schreiben (Terminal-Nutzung)"""
+        pdf_bytes = self.render_pdf_bytes(imo, report_text, year)
+        
+        output_filename = f"Ship_Report_{imo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        output_path = self.output_dir / output_filename
+        with metrics.stage("pdf.write"):
+            output_path.write_bytes(pdf_bytes)
+        
+        print(f"PDF created: {output_path}")
+        return str(output_path)
+    
+    def render_pdf_bytes(self, imo: str, report_text: str, year: int = None) -> bytes:
+        """Report komplett im Speicher rendern (year None = neuestes Berichtsjahr)"""
+        with metrics.stage("pdf.record"):
+            ship_data = self._get_ship_record(imo, year)
+        
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=2*cm,
+            leftMargin=2*cm,
+            topMargin=2*cm,
+            bottomMargin=2.5*cm
+        )
+        
+        story = []
+        
+        # === COVER PAGE ===
+        self._create_cover_page(story, ship_data, imo)
+        
+        # === ANALYSIS REPORT (2nd page) ===
+        story.append(Paragraph("1. Analysis Report", self.styles['SectionHeader']))
+        story.append(Spacer(1, 0.5*cm))
+        
+        for para in report_text.split('\n\n'):
+            if para.strip():
+                story.append(Paragraph(para.strip(), self.styles['BodyText']))
+                story.append(Spacer(1, 0.3*cm))
+        
+        # Footer after report text on same page
+        story.append(Spacer(1, 1*cm))
+        # Nur das Datum: gecachte PDFs (PdfCache, Key mit Datum) sollen keine veraltete Uhrzeit zeigen
+        today = datetime.now().strftime("%B %d, %Y")
+        footer = f"<font size=9 color='#888888'><i>Automatically generated on {today}</i></font>"
+        story.append(Paragraph(footer, self.styles['Normal']))
+        
+        story.append(PageBreak())
+        
+        # === MASTER DATA ===
+        story.append(Paragraph("2. Master Data", self.styles['SectionHeader']))
+        story.append(Spacer(1, 0.5*cm))
+        
+        master_data = self._master_data_rows(ship_data)
+        
+        story.append(self._create_styled_table(master_data))
+        story.append(PageBreak())
+        
+        # === AIS DATA ===
+        story.append(Paragraph("3. AIS Data", self.styles['SectionHeader']))
+        story.append(Spacer(1, 0.5*cm))
+        
+        ais_data = self._ais_data_rows(ship_data)
+        
+        story.append(self._create_styled_table(ais_data))
+        story.append(PageBreak())
+        
+        # === EMISSIONS DATA ===
+        story.append(Paragraph("4. Emissions and Assessment Data", self.styles['SectionHeader']))
+        story.append(Spacer(1, 0.5*cm))
+        
+        emissions_data = self._emissions_data_rows(ship_data)
+        flag_color = ship_data.get('flag_color', 'N/A')
         
         # Create table with highlight
         highlight_color = 'green' if flag_color == 'GREEN' else 'red'
@@ -439,11 +601,200 @@ class ShipReportGenerator:
         
         story.append(emissions_table)
         
+        # === PEER GROUP (vorberechnet, kein groupby pro Report) ===
+        peer_rows = self._peer_rows(ship_data)
+        if peer_rows:
+            story.append(Spacer(1, 0.8*cm))
+            story.append(Paragraph("Peer Group Comparison", self.styles['Heading3']))
+            story.append(Paragraph(peer_rows[0], self.styles['Normal']))
+            story.append(Spacer(1, 0.3*cm))
+            story.append(self._create_styled_table(
+                peer_rows[1], col_widths=[4.4*cm, 3.2*cm, 2.2*cm, 3.2*cm, 4*cm]))
+        
         # Build with page numbers
-        doc.build(story, canvasmaker=NumberedCanvas)
+        with metrics.stage("pdf.layout"):
+            doc.build(story, canvasmaker=NumberedCanvas)
         
-        print(f"PDF created: {output_path}")
-        return str(output_path)
+        return buffer.getvalue()
+
+
+    # ========================================================================
+    # FLEET REPORT (ein PDF für viele Schiffe)
+    # ========================================================================
+    
+    FLEET_SUMMARY_ROWS_PER_TABLE = 40
+    
+    def _create_summary_table(self, rows):
+        """Compact summary table, status column colored per ship"""
+        table = Table(rows, colWidths=[1.8*cm, 4.2*cm, 3.4*cm, 2*cm, 2*cm, 1.8*cm, 1.8*cm], repeatRows=1)
+        style = [
+            ('BACKGROUND', (0, 0), (-1, 0), self.primary_color),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7.5),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+            ('LEFTPADDING', (0, 0), (-1, -1), 4),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+        ]
+        for i, row in enumerate(rows[1:], start=1):
+            color = self.success_color if row[-1] == 'COMPLIANT' else self.danger_color
+            style.append(('TEXTCOLOR', (-1, i), (-1, i), color))
+        table.setStyle(TableStyle(style))
+        return table
+    
+    def _fleet_summary_row(self, ship_data) -> list:
+        def fmt(value, pattern):
+            return pattern.format(value) if isinstance(value, float) and not pd.isna(value) else 'N/A'
+        
+        residual_pct = ship_data.get('residual_pct')
+        if isinstance(residual_pct, float):
+            residual_pct = residual_pct * 100
+        
+        return [
+            str(ship_data.get('imo', 'N/A')),
+            str(ship_data.get('ship_name', 'N/A'))[:28],
+            str(ship_data.get('mrv_ship_type', 'N/A'))[:22],
+            fmt(ship_data.get('y_mrv_co2_per_nm_kg'), '{:.1f}'),
+            fmt(ship_data.get('y_pred_co2_per_nm_kg'), '{:.1f}'),
+            fmt(residual_pct, '{:.1f} %'),
+            'COMPLIANT' if ship_data.get('flag_color') == 'GREEN' else 'ALERT',
+        ]
+    
+    def _fleet_story(self, imos, title):
+        # === TITLE + SUMMARY ===
+        yield Paragraph(title, self.styles['CoverTitle'])
+        today = datetime.now().strftime("%B %d, %Y")
+        yield Paragraph(f"<font size=10><i>{len(imos)} vessels - generated on {today}</i></font>", self.styles['Normal'])
+        yield Spacer(1, 0.8*cm)
+        yield Paragraph("Summary", self.styles['SectionHeader'])
+        
+        header = ['IMO', 'Ship Name', 'Type', 'MRV kg/nm', 'Model kg/nm', 'Deviation', 'Status']
+        rows = [header]
+        for imo in imos:
+            rows.append(self._fleet_summary_row(self._get_ship_record(imo)))
+            if len(rows) > self.FLEET_SUMMARY_ROWS_PER_TABLE:
+                yield self._create_summary_table(rows)
+                rows = [header]
+        if len(rows) > 1:
+            yield self._create_summary_table(rows)
+        yield PageBreak()
+        
+        # === ONE SECTION PER VESSEL ===
+        for number, imo in enumerate(imos, start=1):
+            ship_data = self._get_ship_record(imo)
+            flag_color = ship_data.get('flag_color', 'N/A')
+            
+            yield KeepTogether([
+                Paragraph(f"{number}. {ship_data.get('ship_name', 'N/A')} (IMO {imo})", self.styles['SectionHeader']),
+                self._create_styled_table(self._master_data_rows(ship_data)),
+                Spacer(1, 0.4*cm),
+                self._create_styled_table(
+                    self._emissions_data_rows(ship_data),
+                    highlight_last_rows='green' if flag_color == 'GREEN' else 'red'
+                ),
+                Spacer(1, 0.8*cm),
+            ])
+    
+    def render_fleet_pdf(self, imos, title: str = "Fleet Emissions Report", canvasmaker=None) -> bytes:
+        """
+        Ein PDF für viele Schiffe: Übersichtstabelle + ein Abschnitt pro Schiff.
+
+        Seitenzahlen über TotalPagesCanvas und Story über _StoryStream, damit
+        der Speicher nicht mit der Seiten- bzw. Schiffszahl wächst. Die
+        Schiffszeilen werden einzeln aus der Datenbank geholt.
+        """
+        imos = [imo for imo in imos if imo in self.dataset]
+        
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=2*cm,
+            leftMargin=2*cm,
+            topMargin=2*cm,
+            bottomMargin=2.5*cm,
+            pageCompression=1
+        )
+        
+        # Story wird erst beim Rendern Stück für Stück erzeugt (siehe _StoryStream)
+        story = _StoryStream(self._fleet_story(imos, title))
+        
+        doc.build(story, canvasmaker=canvasmaker or TotalPagesCanvas)
+        
+        return buffer.getvalue()
+
+
+class PdfCache:
+    """
+    LRU-Cache für fertig gerenderte PDFs, begrenzt über die Gesamtgröße in Bytes.
+
+    Key: (IMO, Jahr, Datenstand, Hash des Report-Texts, TEMPLATE_VERSION, Datum).
+    Das Datum ist dabei, weil Deckblatt und Fußzeile das Erstellungsdatum
+    enthalten (ohne Uhrzeit); der Datenstand, damit nach einem Reload neu
+    gerendert wird. retain_version() entfernt beim Reload alle PDFs älterer
+    Datenstände, statt sie bis zur LRU-Verdrängung im Speicher zu lassen.
+    """
+
+    def __init__(self, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.data_version = None
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(imo, report_text: str, year: int = None, data_version: str = None) -> tuple:
+        text_hash = hashlib.sha256(report_text.encode('utf-8')).hexdigest()
+        return (str(imo).strip(), year, data_version, text_hash, TEMPLATE_VERSION, date.today().isoformat())
+
+    def get(self, key):
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf_bytes
+
+    def put(self, key, pdf_bytes: bytes):
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        with self._lock:
+            # Anfrage lief noch mit dem alten Datenstand
+            if self.data_version is not None and key[2] != self.data_version:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= len(old)
+            self._entries[key] = pdf_bytes
+            self.size_bytes += len(pdf_bytes)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+
+    def retain_version(self, data_version: str):
+        """Nur noch PDFs dieses Datenstands behalten (Reload-Listener, vor dem Tausch)"""
+        with self._lock:
+            self.data_version = data_version
+            for key in [k for k in self._entries if k[2] != data_version]:
+                self.size_bytes -= len(self._entries.pop(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
 
 
 # ============================================================================
@@ -458,9 +809,30 @@ def init_generator():
         _generator = ShipReportGenerator()
     return _generator
 
-def generate_report_pdf(imo: str, report_text: str) -> str:
+pdf_cache = PdfCache()
+
+def _retain_pdfs(dataset):
+    pdf_cache.retain_version(dataset.version)
+
+add_reload_listener(_retain_pdfs)
+
+def generate_report_pdf(imo: str, report_text: str, year: int = None) -> str:
+    generator = init_generator()
+    return generator.generate_pdf_report(imo, report_text, year)
+
+def render_fleet_report_pdf(imos, title: str = "Fleet Emissions Report") -> bytes:
+    return init_generator().render_fleet_pdf(imos, title)
+
+def render_report_pdf(imo: str, report_text: str, year: int = None) -> bytes:
+    """PDF als Bytes, wiederholte Downloads kommen aus dem PdfCache"""
     generator = init_generator()
-    return generator.generate_pdf_report(imo, report_text)
+    key = PdfCache.make_key(imo, report_text, year, generator.dataset.version)
+    with metrics.stage("pdf.cache"):
+        pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = generator.render_pdf_bytes(imo, report_text, year)
+        pdf_cache.put(key, pdf_bytes)
+    return pdf_bytes
 
 
 # ============================================================================
@@ -468,17 +840,25 @@ def generate_report_pdf(imo: str, report_text: str) -> str:
 # ============================================================================
 
 if __name__ == "__main__":
+    # Batch-Modus: viele Reports parallel (siehe batch_reports.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from batch_reports import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    
     if len(sys.argv) < 3:
-        print("Usage: python report_gen.py <imo> '<report_text>'")
+        print("Usage: python report_gen.py <imo> '<report_text>' [<report_year>]")
+        print("       python report_gen.py batch --flag-color RED --out reports [--zip reports.zip]")
+        print("       python report_gen.py batch --flag-color RED --fleet-pdf fleet_report.pdf")
         print("\nExample:")
         print("  python report_gen.py 1014618 'Ship shows anomalies...'")
         sys.exit(1)
     
     imo = sys.argv[1]
     report_text = sys.argv[2]
+    year = int(sys.argv[3]) if len(sys.argv) > 3 else None
     
     try:
-        pdf_path = generate_report_pdf(imo, report_text)
+        pdf_path = generate_report_pdf(imo, report_text, year)
         print(f"Report: {pdf_path}")
     except Exception as e:
         print(f"Error: {e}")
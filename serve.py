@@ -0,0 +1,140 @@
+# serve.py
+"""
+Produktionsbetrieb mit mehreren Worker-Prozessen (gunicorn, Linux/macOS).
+
+Datenbank, abgeleitete Indizes und PDF-Generator werden einmal im
+Master-Prozess geladen (preload) und per fork() an die Worker vererbt.
+Seiten, die kein Worker beschreibt, bleiben geteilt (copy-on-write); das
+gilt verlässlich nur für große NumPy-/Arrow-Datenpuffer. Python-Objekte
+(dicts, Listen, Strings der Indizes, Lookup-Tabellen der Payloads) werden
+schon durch Referenzzähler-Updates beim Lesen beschrieben, ihre Seiten
+kopiert jeder Worker nach und nach. gc.freeze() verhindert nur, dass
+zusätzlich der Garbage Collector sie anfasst.
+
+Maßstab ist deshalb PSS (geteilte Seiten anteilig, benchmarks/bench_serve.py),
+nicht die Summe der RSS-Werte. Alles, was der Master vorab aufbaut, wird
+mit jedem Worker größer: vorberechnete Payloads (ship_payloads.PRECOMPUTE)
+für große Flotten hier besonders nicht einschalten.
+
+Neue Jahresdateien: der Master prüft die Quelldateien, lädt bei einer
+Änderung selbst neu (SIGHUP -> on_reload) und ersetzt danach die Worker
+schrittweise durch frisch geforkte Prozesse mit dem neuen Stand.
+
+Entwicklung weiterhin mit: python app.py
+
+Usage: python serve.py [--workers N] [--threads 4] [--bind 0.0.0.0:5000]
+"""
+
+import argparse
+import gc
+import os
+import signal
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+BIND = os.getenv("BIND", "0.0.0.0:5000")
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Threads pro Worker: LLM-Anfragen und Streams warten überwiegend auf das Netz
+THREADS = int(os.getenv("WEB_THREADS", "4"))
+# Eine WatsonX-Bewertung kann deutlich länger als die gunicorn-Vorgabe (30 s) dauern
+TIMEOUT_SECONDS = 180
+# Job-Status/Ergebnisse für alle Worker sichtbar (siehe jobs.py)
+JOB_SHARED_DIR = os.getenv("JOB_SHARED_DIR", ".jobs")
+# Metrik-Schnappschüsse der Worker, /metrics summiert darüber (siehe metrics.py)
+METRICS_DIR = os.getenv("METRICS_DIR", ".metrics")
+# ============================================================================
+
+
+def _freeze():
+    # Alles bisher Geladene gilt als dauerhaft, der GC der Worker überspringt es
+    gc.collect()
+    gc.freeze()
+
+
+def load_app():
+    """App im Master laden: Komponenten synchron statt in Hintergrund-Threads"""
+    # Threads überleben fork() nicht, deshalb vor dem Import abschalten
+    os.environ["APP_BACKGROUND_INIT"] = "0"
+    os.environ.setdefault("JOB_SHARED_DIR", JOB_SHARED_DIR)
+    os.environ.setdefault("METRICS_DIR", METRICS_DIR)
+
+    # Zähler eines früheren Serverlaufs verwerfen
+    import metrics
+    metrics.clear_snapshots()
+
+    import ship_data
+    master_pid = os.getpid()
+
+    def request_reload():
+        # Nur melden: neu geladen wird im Hauptthread des Masters (on_reload)
+        print("Neue Quelldateien erkannt, starte Worker mit neuem Datenstand...")
+        os.kill(master_pid, signal.SIGHUP)
+
+    # Vor dem Laden starten, damit _load_dataset keinen eigenen Reloader anlegt
+    ship_data.start_reloader(on_change=request_reload)
+
+    import app as app_module
+    app_module.dataset_component.get()
+    app_module.pdf_component.get()
+    _freeze()
+    return app_module
+
+
+def on_reload(arbiter):
+    # SIGHUP: Datenbank im Master tauschen, danach forkt gunicorn neue Worker
+    import ship_data
+    if ship_data.reload_dataset():
+        _freeze()
+
+
+def pre_fork(arbiter, worker):
+    gc.freeze()
+
+
+def post_fork(arbiter, worker):
+    import app as app_module
+    # SQLite-Verbindungen und Modell-Clients gehören zum jeweiligen Prozess
+    app_module.llm_cache.reopen()
+    app_module.model_component.start_background()
+    app_module.metrics.after_fork()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bind", default=BIND)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    args = parser.parse_args()
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("gunicorn fehlt (pip install gunicorn, nur Linux/macOS). Entwicklung: python app.py")
+
+    class ShipApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": args.bind,
+                "workers": args.workers,
+                "threads": args.threads,
+                "worker_class": "gthread",
+                "timeout": TIMEOUT_SECONDS,
+                "preload_app": True,
+                "on_reload": on_reload,
+                "pre_fork": pre_fork,
+                "post_fork": post_fork,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app().app
+
+    print(f"Starte {args.workers} Worker x {args.threads} Threads auf {args.bind}")
+    ShipApplication().run()
+
+
+if __name__ == "__main__":
+    main()
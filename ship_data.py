@@ -0,0 +1,462 @@
+# ship_data.py
+"""Gemeinsame Schiffsdatenbank für API (app.py) und PDF-Generator (report_gen.py)"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ship_index import ShipIndex, normalize_imo
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+PARQUET_PATH = r"ship_report_imo_2024.parquet"
+# Verzeichnis mit einer Datei pro Jahr (ship_report_imo_2023.parquet, ...) oder
+# Hive-Partitionen (report_year=2023/*.parquet); hat Vorrang vor PARQUET_PATH
+DATA_DIR = os.getenv("SHIP_DATA_DIR", "data")
+# Intervall, in dem DATA_DIR auf neue/geänderte Dateien geprüft wird (0 = aus)
+RELOAD_INTERVAL_SECONDS = float(os.getenv("SHIP_DATA_RELOAD_SECONDS", "60"))
+# "pandas" = komplette Tabelle im Speicher, "arrow" = memory-mapped Parquet (ship_data_arrow.py)
+DATA_BACKEND = os.getenv("SHIP_DATA_BACKEND", "pandas")
+# Kompakte Spaltentypen für das pandas-Backend (IMO als int64, Kategorien, float32 nur verlustfrei)
+COMPACT_DTYPES = os.getenv("SHIP_DATA_COMPACT", "1") == "1"
+# Text-Spalten mit höchstens diesem Anteil verschiedener Werte werden kategorisch
+CATEGORY_MAX_RATIO = 0.5
+# ============================================================================
+
+
+def default_source() -> Path:
+    """DATA_DIR, falls dort Parquet-Dateien liegen, sonst die einzelne PARQUET_PATH-Datei"""
+    data_dir = Path(DATA_DIR)
+    if data_dir.is_dir() and any(data_dir.rglob("*.parquet")):
+        return data_dir
+    return Path(PARQUET_PATH)
+
+
+def source_files(source) -> list:
+    source = Path(source)
+    if source.is_dir():
+        return sorted(source.rglob("*.parquet"))
+    return [source]
+
+
+def source_fingerprint(source) -> tuple:
+    """(Pfad, Größe, mtime) aller Quelldateien, ändert sich bei neuen/geänderten Jahren"""
+    fingerprint = []
+    for path in source_files(source):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        fingerprint.append((str(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+
+def _year_from_path(path: Path):
+    # report_year=2023/part-0.parquet oder ship_report_imo_2023.parquet
+    for part in reversed(path.parts):
+        match = re.fullmatch(r"report_year=(\d{4})", part)
+        if match:
+            return int(match.group(1))
+    match = re.search(r"(\d{4})(?!.*\d)", path.stem)
+    return int(match.group(1)) if match else None
+
+
+def read_source_table(source) -> pa.Table:
+    """
+    Alle Quelldateien als eine Arrow-Tabelle, Spaltennamen klein geschrieben.
+
+    Fehlt die Spalte report_year in einer Datei, wird sie aus dem Pfad
+    abgeleitet (Partition bzw. Jahreszahl im Dateinamen).
+    """
+    files = source_files(source)
+    if not files:
+        raise FileNotFoundError(f"Keine Parquet-Dateien in {source}")
+
+    tables = []
+    for path in files:
+        table = pq.ParquetFile(path).read()
+        table = table.rename_columns([c.lower() for c in table.column_names])
+        if 'report_year' not in table.column_names:
+            year = _year_from_path(path)
+            if year is not None:
+                table = table.append_column('report_year', pa.array([year] * table.num_rows, pa.int64()))
+        tables.append(table)
+
+    if len(tables) == 1:
+        return tables[0]
+    # Jahre können leicht unterschiedliche Typen haben (float32/float64)
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def _imo_as_int(imos: pd.Series):
+    """IMO-Strings als int64, nur wenn str(int) für jede Zeile wieder den String ergibt"""
+    if imos.isna().any() or not imos.map(lambda v: isinstance(v, str) and v.isdigit()).all():
+        return None
+    as_int = imos.astype(np.int64)
+    if not (as_int.astype(str) == imos).all():  # führende Nullen
+        return None
+    return as_int
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Speichersparende Spaltentypen, ohne dass sich ausgelesene Werte ändern.
+
+    - imo: int64 statt Python-Strings (Rückwandlung über normalize_imo)
+    - Text mit wenigen verschiedenen Werten (Schiffstyp, Flags): category
+    - float64 -> float32 nur, wenn jeder Wert exakt erhalten bleibt
+    - Ganzzahlen auf den kleinsten passenden Typ (report_year -> int16)
+    """
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        if column == 'imo':
+            as_int = _imo_as_int(values)
+            if as_int is not None:
+                df[column] = as_int
+        elif values.dtype == object:
+            if len(values) and values.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(values):
+                df[column] = values.astype('category')
+        elif values.dtype == np.float64:
+            narrowed = values.to_numpy().astype(np.float32)
+            if np.array_equal(narrowed.astype(np.float64), values.to_numpy(), equal_nan=True):
+                df[column] = narrowed
+        elif values.dtype.kind in 'iu':
+            df[column] = pd.to_numeric(values, downcast='unsigned' if values.dtype.kind == 'u' else 'integer')
+    return df
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> list:
+    """[(Spalte, Typ vorher, Typ nachher, Bytes vorher, Bytes nachher)] inkl. String-Inhalten"""
+    mem_before = before.memory_usage(deep=True, index=False)
+    mem_after = after.memory_usage(deep=True, index=False)
+    return [(c, str(before[c].dtype), str(after[c].dtype), int(mem_before[c]), int(mem_after[c]))
+            for c in before.columns]
+
+
+class DerivedIndexes:
+    """
+    Abgeleitete Indizes (Namensindex, Vergleichsgruppen, ...) an der Datenbank-Instanz.
+
+    Jeder Datenstand hat seine eigenen: Anfragen, die nach einem Reload noch
+    mit der alten Instanz laufen, nutzen deren Indizes und verdrängen die
+    bereits vor dem Tausch gebauten der neuen nicht.
+    """
+
+    def __init__(self):
+        self._derived = {}
+        self._derived_builders = {}
+        self._derived_locks = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, name: str, build):
+        """Index name einmal pro Instanz mit build(self) erzeugen und merken"""
+        value = self._derived.get(name)
+        if value is not None:
+            return value
+        # Ein Lock pro Name: build darf andere Indizes anfordern (Payloads -> Vergleichsgruppen)
+        with self._derived_lock:
+            lock = self._derived_locks.setdefault(name, threading.Lock())
+        with lock:
+            value = self._derived.get(name)
+            if value is None:
+                value = build(self)
+                self._derived[name] = value
+                self._derived_builders[name] = build
+        return value
+
+    def derive_like(self, other):
+        """Alle Indizes aufbauen, die other bereits hat (Reload: vor dem Tausch, nur die benutzten)"""
+        for name, build in list(other._derived_builders.items()):
+            self.derived(name, build)
+
+
+class ShipDataset(DerivedIndexes):
+    """
+    Lädt die Parquet-Datei einmalig und normalisiert das Schema.
+
+    Stabiles Spaltenschema: alle Spaltennamen klein geschrieben
+    (imo, length, width, vesseltype, ...), IMO als getrimmter String.
+    parquet_path darf eine einzelne Datei oder ein Verzeichnis mit
+    Jahresdateien sein.
+    """
+
+    # Komplette Tabelle im Speicher (abgeleitete Indizes dürfen Spalten kopieren)
+    in_memory = True
+
+    def __init__(self, parquet_path=None, compact: bool = None):
+        super().__init__()
+        self.parquet_path = Path(parquet_path) if parquet_path is not None else default_source()
+        self.compact = COMPACT_DTYPES if compact is None else compact
+        # Vor dem Lesen bestimmt: eine Änderung während des Ladens löst den nächsten Reload aus
+        self.fingerprint = source_fingerprint(self.parquet_path)
+        # Zahlentypen der Quelle, nach außen gehen sie unverändert (wie beim Arrow-Backend)
+        self._source_dtypes = {}
+        self.df = self._load()
+        self.index = ShipIndex(self.df)
+
+    def _load(self) -> pd.DataFrame:
+        print(f"Lade Schiffsdatenbank ({self.parquet_path})...")
+        try:
+            df = read_source_table(self.parquet_path).to_pandas()
+        except Exception as e:
+            print(f"FEHLER beim Laden der Parquet-Datei: {e}")
+            return pd.DataFrame()  # Leerer Fallback
+
+        if 'imo' in df.columns:
+            # Einmalig beim Laden statt bei jeder Anfrage / jedem PDF
+            df['imo'] = df['imo'].map(normalize_imo)
+        else:
+            print("WARNUNG: Keine Spalte 'imo' in der Parquet-Datei gefunden! Bitte Spaltennamen prüfen.")
+            print("Vorhandene Spalten:", df.columns.tolist())
+
+        if self.compact:
+            self._source_dtypes = {c: df[c].dtype for c in df.columns if df[c].dtype.kind in 'iuf'}
+            compacted = compact_frame(df)
+            before = df.memory_usage(deep=True).sum() / 1e6
+            after = compacted.memory_usage(deep=True).sum() / 1e6
+            print(f"Kompakte Spaltentypen: {before:.1f} MB -> {after:.1f} MB")
+            df = compacted
+
+        print(f"Datenbank geladen: {len(df)} Schiffe gefunden.")
+        return df
+
+    def _restore_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Kompakte Typen nach außen wie bisher: IMO als String, Kategorien als object,
+        # Zahlen im Typ der Quelle (report_year int64 statt int16, float64 statt float32)
+        restore = [c for c in df.columns
+                   if (c == 'imo' and df[c].dtype != object) or isinstance(df[c].dtype, pd.CategoricalDtype)
+                   or (c in self._source_dtypes and df[c].dtype != self._source_dtypes[c])]
+        if not restore:
+            return df
+        df = df.copy()
+        for column in restore:
+            if column == 'imo':
+                df[column] = df[column].map(normalize_imo)
+            elif column in self._source_dtypes:
+                df[column] = df[column].astype(self._source_dtypes[column])
+            else:
+                df[column] = df[column].astype(object)
+        return df
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def __len__(self):
+        return len(self.df)
+
+    def __contains__(self, imo):
+        return self.index.lookup(imo) is not None
+
+    @property
+    def columns(self) -> list:
+        return self.df.columns.tolist()
+
+    def read_columns(self, columns) -> pd.DataFrame:
+        """Nur die angegebenen Spalten (für Indizes/Statistiken über alle Schiffe), IMO als String"""
+        return self._restore_types(self.df[[c for c in columns if c in self.df.columns]])
+
+    def iter_frames(self, chunk_rows: int, columns=None, where=None):
+        """
+        Tabelle blockweise (Typen wie read_columns), z.B. für Exporte.
+
+        where(chunk) bekommt den Block mit kompakten Typen und liefert eine
+        Bool-Maske; nur die Treffer werden kopiert und zurückgewandelt.
+        """
+        names = [c for c in (columns or self.df.columns) if c in self.df.columns]
+        for start in range(0, len(self.df), chunk_rows):
+            chunk = self.df.iloc[start:start + chunk_rows]
+            if where is not None:
+                chunk = chunk[np.asarray(where(chunk), dtype=bool)]
+            if len(chunk):
+                yield self._restore_types(chunk[names])
+
+    @property
+    def version(self) -> str:
+        """Kurzer Hash der Quelldateien, z.B. für Cache-Keys"""
+        return dataset_version(self.fingerprint)
+
+    @property
+    def years(self) -> list:
+        """Alle vorhandenen Berichtsjahre (absteigend)"""
+        if 'report_year' not in self.df.columns:
+            return []
+        return sorted(self.df['report_year'].dropna().unique().astype(int).tolist(), reverse=True)
+
+    def get_record(self, imo, year=None):
+        """
+        Eine Schiffszeile als Dictionary
+
+        Args:
+            imo: IMO-Nummer
+            year: Berichtsjahr, None = neuestes Jahr
+
+        Returns:
+            dict mit den Spalten des Schemas oder None, falls nicht gefunden
+        """
+        pos = self.index.lookup(imo, year)
+        if pos is None:
+            return None
+        record = self.df.iloc[pos].to_dict()
+        if 'imo' in record:
+            record['imo'] = normalize_imo(record['imo'])
+        return record
+
+    def get_json_record(self, imo, year=None):
+        """Wie get_record, aber NaN (leere Werte) durch None ersetzt, damit JSON valide bleibt"""
+        record = self.get_record(imo, year)
+        if record is None:
+            return None
+        return {k: (None if pd.isna(v) else v) for k, v in record.items()}
+
+    def get_records(self, imos, year=None) -> list:
+        """
+        Viele Schiffszeilen auf einmal (Flottenscreening)
+
+        Args:
+            imos: Liste von IMO-Nummern
+            year: Berichtsjahr, None = jeweils neuestes Jahr
+
+        Returns:
+            Liste in Reihenfolge von imos, None für nicht gefundene IMOs.
+            NaN-Werte sind bereits durch None ersetzt.
+        """
+        positions = self.index.lookup_many(imos, year)
+        found = positions >= 0
+
+        rows = self._restore_types(self.df.iloc[positions[found]])
+        # NaN -> None für alle Treffer in einem Schritt statt pro Feld
+        rows = rows.astype(object).where(rows.notna(), None)
+        records = iter(rows.to_dict('records'))
+
+        return [next(records) if hit else None for hit in found]
+
+
+def dataset_version(fingerprint) -> str:
+    return hashlib.sha256(repr(fingerprint).encode('utf-8')).hexdigest()[:12]
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+_dataset = None
+_dataset_lock = threading.Lock()
+_reloader = None
+_reload_listeners = []
+
+def create_dataset(backend=None, parquet_path=None):
+    """Datenbank mit dem gewünschten Backend ("pandas" oder "arrow") erzeugen"""
+    backend = backend or DATA_BACKEND
+    if backend == "arrow":
+        from ship_data_arrow import ArrowShipDataset
+        return ArrowShipDataset(parquet_path)
+    if backend != "pandas":
+        raise ValueError(f"Unknown SHIP_DATA_BACKEND: {backend}")
+    return ShipDataset(parquet_path)
+
+def get_dataset() -> ShipDataset:
+    global _dataset
+    if _dataset is None:
+        # API, PDF-Generator und Hintergrund-Init dürfen nicht doppelt laden
+        with _dataset_lock:
+            if _dataset is None:
+                dataset = create_dataset()
+                # Leere/fehlerhafte Datenbank nicht merken: der nächste Zugriff
+                # (oder der Reloader) versucht es erneut
+                if dataset.empty:
+                    return dataset
+                _dataset = dataset
+    return _dataset
+
+def is_loaded() -> bool:
+    """True, sobald eine nicht leere Datenbank geladen ist (ohne selbst zu laden)"""
+    return _dataset is not None
+
+def reload_dataset(force: bool = False) -> bool:
+    """
+    Datenbank neu laden, falls sich die Quelldateien geändert haben.
+
+    Die neue Instanz wird komplett im Hintergrund aufgebaut und dann mit
+    einer einzigen Zuweisung getauscht. Laufende Anfragen arbeiten mit
+    ihrer bisherigen Referenz weiter. Schlägt das Laden fehl (z.B. halb
+    kopierte Datei), bleibt die alte Datenbank aktiv.
+
+    Returns:
+        True, wenn getauscht wurde
+    """
+    global _dataset
+    # Noch keine Datenbank (erstes Laden fehlgeschlagen): jede Quelldatei ist neu
+    current = _dataset
+    if not force and current is not None and source_fingerprint(default_source()) == current.fingerprint:
+        return False
+
+    candidate = create_dataset()
+    if candidate.empty:
+        print("WARNUNG: Neue Datenbank leer oder fehlerhaft, alte Version bleibt aktiv.")
+        return False
+
+    # Abgeleitete Indizes vor dem Tausch aufbauen, damit die erste Anfrage nicht wartet
+    try:
+        if current is not None:
+            candidate.derive_like(current)
+    except Exception as e:
+        print(f"FEHLER beim Aufbau der Indizes für die neue Datenbank: {e}")
+    for listener in _reload_listeners:
+        try:
+            listener(candidate)
+        except Exception as e:
+            print(f"FEHLER in Reload-Listener {listener.__name__}: {e}")
+
+    with _dataset_lock:
+        _dataset = candidate
+    print(f"Datenbank neu geladen: {len(candidate)} Zeilen, Jahre {candidate.years} (Version {candidate.version})")
+    return True
+
+def add_reload_listener(fn):
+    """fn(dataset) wird mit jeder neu geladenen Datenbank vor dem Tausch aufgerufen"""
+    if fn not in _reload_listeners:
+        _reload_listeners.append(fn)
+
+def start_reloader(interval: float = RELOAD_INTERVAL_SECONDS, on_change=None):
+    """
+    Hintergrund-Thread, der die Quelldateien regelmäßig auf Änderungen prüft
+
+    Args:
+        interval: Sekunden zwischen zwei Prüfungen (<= 0: kein Thread)
+        on_change: statt selbst neu zu laden nur melden, einmal pro neuem
+            Stand (z.B. Master-Prozess in serve.py, der danach Worker neu startet)
+    """
+    global _reloader
+    if interval <= 0 or _reloader is not None:
+        return
+
+    def run():
+        notified = None
+        while True:
+            time.sleep(interval)
+            try:
+                if on_change is None:
+                    reload_dataset()
+                    continue
+                fingerprint = source_fingerprint(default_source())
+                current = _dataset
+                if (current is None or fingerprint != current.fingerprint) and fingerprint != notified:
+                    notified = fingerprint
+                    on_change()
+            except Exception as e:
+                print(f"FEHLER beim Neuladen der Datenbank: {e}")
+
+    _reloader = threading.Thread(target=run, name="dataset-reloader", daemon=True)
+    _reloader.start()
@@ -0,0 +1,258 @@
+# ship_data_arrow.py
+"""
+Arrow-Backend für die Schiffsdatenbank: memory-mapped Parquet statt pandas-Kopie.
+
+Beim ersten Start wird aus der Quelldatei eine nach IMO sortierte Parquet-Datei
+mit kleinen Row Groups erzeugt. Lookups lesen danach nur die Row Group, deren
+min/max-Statistik die IMO enthält, und materialisieren nur die gesuchte Zeile.
+"""
+
+import math
+import threading
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ship_data import DerivedIndexes, dataset_version, default_source, read_source_table, source_fingerprint
+from ship_index import normalize_imo
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DATA_CACHE_DIR = ".data_cache"
+ROW_GROUP_SIZE = 512
+# ============================================================================
+
+
+def _imo_key(imo):
+    """IMO als int für Vergleiche mit der Row-Group-Statistik, None wenn ungültig"""
+    try:
+        return int(normalize_imo(imo))
+    except ValueError:
+        return None
+
+
+class ArrowShipDataset(DerivedIndexes):
+    """
+    Gleiche Schnittstelle wie ship_data.ShipDataset (get_record, get_json_record,
+    get_records), aber ohne die komplette Tabelle im Speicher zu halten.
+    """
+
+    in_memory = False
+
+    def __init__(self, parquet_path=None, cache_dir=DATA_CACHE_DIR, row_group_size=ROW_GROUP_SIZE):
+        super().__init__()
+        self.parquet_path = Path(parquet_path) if parquet_path is not None else default_source()
+        self.fingerprint = source_fingerprint(self.parquet_path)
+        self.row_group_size = row_group_size
+        self.years = []
+        self._df = None
+        self._lock = threading.Lock()
+
+        print(f"Lade Schiffsdatenbank (Arrow, {self.parquet_path})...")
+        try:
+            self.sorted_path = self._prepare_sorted_file(Path(cache_dir))
+            self._file = pq.ParquetFile(str(self.sorted_path), memory_map=True)
+        except Exception as e:
+            print(f"FEHLER beim Laden der Parquet-Datei: {e}")
+            self._file = None
+            self._rg_min = self._rg_max = np.empty(0, dtype=np.int64)
+            self.num_rows = 0
+            return
+
+        self.num_rows = self._file.metadata.num_rows
+        self._load_row_group_stats()
+        if 'report_year' in self._file.schema_arrow.names:
+            years = pc.unique(self._file.read(columns=['report_year'])['report_year']).drop_null()
+            self.years = sorted(years.to_pylist(), reverse=True)
+        print(f"Datenbank geladen: {self.num_rows} Schiffe in {len(self._rg_min)} Row Groups (memory-mapped).")
+
+    def _prepare_sorted_file(self, cache_dir: Path) -> Path:
+        """Nach (imo, report_year absteigend) sortierte Kopie mit kleinen Row Groups"""
+        target = cache_dir / f"ships_{self.version}_rg{self.row_group_size}.parquet"
+        if target.exists():
+            return target
+
+        table = read_source_table(self.parquet_path)
+        imo = table['imo']
+        if not pa.types.is_integer(imo.type):
+            imo = pc.cast(pc.utf8_trim_whitespace(pc.cast(imo, pa.string())), pa.int64())
+            table = table.set_column(table.column_names.index('imo'), 'imo', imo)
+
+        sort_keys = [('imo', 'ascending')]
+        if 'report_year' in table.column_names:
+            sort_keys.append(('report_year', 'descending'))
+        table = table.sort_by(sort_keys)
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix('.tmp')
+        pq.write_table(table, tmp, row_group_size=self.row_group_size, write_statistics=True)
+        tmp.replace(target)
+        print(f"Sortierte Parquet-Datei erzeugt: {target}")
+
+        # Kopien älterer Datenstände aufräumen (unter Linux bleibt eine noch
+        # gemappte Datei bis zum Schließen lesbar, unter Windows schlägt das fehl)
+        for old in cache_dir.glob(f"ships_*_rg{self.row_group_size}.parquet"):
+            if old != target:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+        return target
+
+    def _load_row_group_stats(self):
+        meta = self._file.metadata
+        col = self._file.schema_arrow.get_field_index('imo')
+        mins, maxs = [], []
+        for i in range(meta.num_row_groups):
+            stats = meta.row_group(i).column(col).statistics
+            mins.append(stats.min)
+            maxs.append(stats.max)
+        self._rg_min = np.asarray(mins, dtype=np.int64)
+        self._rg_max = np.asarray(maxs, dtype=np.int64)
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def empty(self) -> bool:
+        return self.num_rows == 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def __contains__(self, imo):
+        return self.get_record(imo) is not None
+
+    @property
+    def version(self) -> str:
+        return dataset_version(self.fingerprint)
+
+    @property
+    def columns(self) -> list:
+        return self._file.schema_arrow.names if self._file is not None else []
+
+    @property
+    def df(self):
+        """
+        Komplette Tabelle als pandas DataFrame (gleiches Schema wie ShipDataset).
+
+        Nur für Funktionen, die wirklich alle Zeilen brauchen; wird erst beim
+        ersten Zugriff erzeugt und hebt die Speicherersparnis dann auf.
+        """
+        if self._df is None:
+            with self._lock:
+                if self._df is None:
+                    import pandas as pd
+                    if self._file is None:
+                        self._df = pd.DataFrame()
+                    else:
+                        df = self._file.read().to_pandas()
+                        df['imo'] = df['imo'].map(normalize_imo)
+                        self._df = df
+        return self._df
+
+    def read_columns(self, columns):
+        """Nur die angegebenen Spalten aus der gemappten Datei (ohne komplette Tabelle)"""
+        if self._file is None:
+            import pandas as pd
+            return pd.DataFrame(columns=list(columns))
+        names = [c for c in columns if c in self._file.schema_arrow.names]
+        df = self._file.read(columns=names).to_pandas()
+        if 'imo' in df.columns:
+            df['imo'] = df['imo'].map(normalize_imo)
+        return df
+
+    def iter_frames(self, chunk_rows: int, columns=None, where=None):
+        """Wie ShipDataset.iter_frames, liest die gemappte Datei Batch für Batch"""
+        if self._file is None:
+            return
+        names = [c for c in (columns or self.columns) if c in self.columns]
+        for batch in self._file.iter_batches(batch_size=chunk_rows):
+            chunk = batch.to_pandas()
+            if where is not None:
+                chunk = chunk[np.asarray(where(chunk), dtype=bool)]
+            if len(chunk):
+                chunk = chunk[names]
+                if 'imo' in chunk.columns:
+                    chunk = chunk.assign(imo=chunk['imo'].map(normalize_imo))
+                yield chunk
+
+    def _candidate_row_groups(self, key: int) -> range:
+        # Row Groups sind nach IMO sortiert, eine IMO kann über eine Grenze reichen
+        first = int(np.searchsorted(self._rg_max, key, side='left'))
+        last = int(np.searchsorted(self._rg_min, key, side='right'))
+        return range(first, last)
+
+    def _rows_for(self, key: int, year=None) -> pa.Table:
+        parts = []
+        for rg in self._candidate_row_groups(key):
+            table = self._file.read_row_group(rg)
+            mask = pc.equal(table['imo'], key)
+            if year is not None and 'report_year' in table.column_names:
+                mask = pc.and_(mask, pc.equal(table['report_year'], int(year)))
+            parts.append(table.filter(mask))
+        if not parts:
+            return None
+        return pa.concat_tables(parts) if len(parts) > 1 else parts[0]
+
+    @staticmethod
+    def _to_record(row: dict) -> dict:
+        row['imo'] = normalize_imo(row['imo'])
+        return row
+
+    def get_record(self, imo, year=None):
+        """Eine Schiffszeile als Dictionary (neuestes Jahr, falls year None)"""
+        key = _imo_key(imo)
+        if key is None or self._file is None:
+            return None
+        rows = self._rows_for(key, year)
+        if rows is None or rows.num_rows == 0:
+            return None
+        # Sortierung: report_year absteigend, erste Zeile = neuestes Jahr
+        return self._to_record(rows.slice(0, 1).to_pylist()[0])
+
+    def get_json_record(self, imo, year=None):
+        """Wie get_record, NaN durch None ersetzt (Arrow-Nullwerte sind bereits None)"""
+        record = self.get_record(imo, year)
+        if record is None:
+            return None
+        return {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in record.items()}
+
+    def get_records(self, imos, year=None) -> list:
+        """Viele IMOs, jede benötigte Row Group wird nur einmal gelesen"""
+        keys = [_imo_key(imo) for imo in imos]
+        results = [None] * len(keys)
+        if self._file is None:
+            return results
+
+        by_group = {}
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            for rg in self._candidate_row_groups(key):
+                by_group.setdefault(rg, []).append(i)
+
+        for rg, positions in by_group.items():
+            table = self._file.read_row_group(rg)
+            if year is not None and 'report_year' in table.column_names:
+                table = table.filter(pc.equal(table['report_year'], int(year)))
+            positions = [i for i in positions if results[i] is None]
+            imo_col = table['imo'].to_numpy()
+            # Erste Zeile pro IMO = neuestes Jahr (Sortierung), Treffer einer Gruppe in einem take()
+            uniq, first = np.unique(imo_col, return_index=True)
+            if not positions or len(uniq) == 0:
+                continue
+            wanted = np.array([keys[i] for i in positions], dtype=np.int64)
+            slot = np.minimum(np.searchsorted(uniq, wanted), len(uniq) - 1)
+            hit = uniq[slot] == wanted
+            rows = table.take(first[slot[hit]]).to_pylist()
+            for i, row in zip(np.asarray(positions)[hit], rows):
+                results[i] = self._to_record(row)
+
+        return [None if r is None else
+                {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in r.items()}
+                for r in results]
@@ -0,0 +1,214 @@
+# ship_export.py
+"""
+Gefilterte Schiffsdaten als Datei (CSV, Arrow IPC oder Parquet), gestreamt.
+
+Die Tabelle wird blockweise gelesen (dataset.iter_frames), gefiltert und als
+Record Batch in den Writer geschrieben; was der Writer ausgibt, geht sofort an
+den Client. Im Speicher liegt also immer nur ein Block, egal wie groß das
+Ergebnis ist, und die ersten Bytes (CSV-Kopfzeile, erster Batch) gehen raus,
+bevor der Rest gelesen ist.
+
+Beispiel: alle RED-Tanker über 200 m aus 2024
+  /api/export?format=csv&flag_color=RED&mrv_ship_type=Oil tanker,Chemical tanker&min_length=200&report_year=2024
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+import metrics
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Zeilen pro Block = Record Batch (bei Parquet eine Row Group je Block mit Treffern)
+CHUNK_ROWS = 16384
+# Format -> (MIME-Typ, Dateiendung)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+DEFAULT_FORMAT = "csv"
+# Listen-Filter: mehrere Werte kommagetrennt oder Parameter wiederholt, Text ohne Groß-/Kleinschreibung
+VALUE_FILTERS = ("mrv_ship_type", "vesseltype", "flag_color", "flag_reason", "report_year")
+# Bereichs-Filter: min_<spalte> / max_<spalte> (Grenzen eingeschlossen)
+RANGE_FILTERS = ("report_year", "length", "width", "draft_m_median", "ais_distance_nm_total",
+                 "sog_mean_kn", "moving_share", "residual_kg", "residual_pct")
+# ============================================================================
+
+
+# ============================================================================
+# ANFRAGE
+# ============================================================================
+
+def _split(values) -> list:
+    return [part.strip() for value in values for part in str(value).split(",") if part.strip()]
+
+
+def parse_query(args: dict, available_columns) -> tuple:
+    """
+    (Format, Spalten, Filter) aus den Query-Parametern (Name -> Liste von Werten).
+
+    Filter sind Tupel (Spalte, "in" | "min" | "max", Wert). Unbekannte
+    Parameter, Spalten oder Werte: ValueError mit Meldung für den Client.
+    """
+    available = set(available_columns)
+    fmt, columns, filters = DEFAULT_FORMAT, None, []
+    for name, values in args.items():
+        key = name.strip().lower()
+        if key == "format":
+            fmt = (_split(values) or [DEFAULT_FORMAT])[-1].lower()
+            if fmt not in FORMATS:
+                raise ValueError(f"Unbekanntes Format '{fmt}' (erlaubt: {', '.join(FORMATS)})")
+        elif key == "columns":
+            columns = [c.lower() for c in _split(values)]
+            unknown = [c for c in columns if c not in available]
+            if unknown:
+                raise ValueError(f"Unbekannte Spalten: {', '.join(unknown)}")
+        elif key in VALUE_FILTERS and key in available:
+            wanted = _split(values)
+            if key == "report_year":
+                try:
+                    wanted = [int(v) for v in wanted]
+                except ValueError:
+                    raise ValueError("Ungültiges Berichtsjahr") from None
+            else:
+                wanted = [v.casefold() for v in wanted]
+            if wanted:
+                filters.append((key, "in", wanted))
+        elif key[:4] in ("min_", "max_") and key[4:] in RANGE_FILTERS and key[4:] in available:
+            try:
+                bound = float(_split(values)[-1])
+            except (IndexError, ValueError):
+                raise ValueError(f"Ungültiger Wert für {name}") from None
+            filters.append((key[4:], key[:3], bound))
+        else:
+            raise ValueError(f"Unbekannter Parameter '{name}' (Filter: {', '.join(VALUE_FILTERS)}, "
+                             f"min_/max_ für {', '.join(RANGE_FILTERS)})")
+    return fmt, columns, filters
+
+
+def _isin(series: pd.Series, wanted: list) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.isin(wanted)
+    wanted = set(wanted)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Nur die Kategorien vergleichen, nicht jede Zeile
+        return series.isin([c for c in series.cat.categories if str(c).casefold() in wanted])
+    return series.map(lambda v: isinstance(v, str) and v.casefold() in wanted)
+
+
+def make_predicate(filters):
+    """Bool-Maske für einen Block (kompakte Typen), None ohne Filter"""
+    if not filters:
+        return None
+
+    def where(chunk: pd.DataFrame) -> np.ndarray:
+        mask = np.ones(len(chunk), dtype=bool)
+        for column, op, value in filters:
+            series = chunk[column]
+            # NaN erfüllt keine Bedingung
+            if op == "min":
+                mask &= (series >= value).to_numpy()
+            elif op == "max":
+                mask &= (series <= value).to_numpy()
+            else:
+                mask &= _isin(series, value).to_numpy(dtype=bool)
+        return mask
+
+    return where
+
+
+# ============================================================================
+# STREAM
+# ============================================================================
+
+class _ChunkSink(io.RawIOBase):
+    """Nimmt die Ausgabe des Writers auf, bis sie per drain() an den Client geht"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_schema(frame: pd.DataFrame) -> pa.Schema:
+    # Aus den pandas-Typen statt aus den Werten: ein Block voller None wäre sonst Typ null
+    return pa.schema([
+        (column, pa.string() if frame[column].dtype == object else pa.from_numpy_dtype(frame[column].dtype))
+        for column in frame.columns
+    ])
+
+
+def _open_writer(fmt: str, sink, schema: pa.Schema):
+    if fmt == "csv":
+        return pcsv.CSVWriter(sink, schema)
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    return pq.ParquetWriter(sink, schema)
+
+
+def export_filename(dataset, fmt: str) -> str:
+    return f"ships_{dataset.version}.{FORMATS[fmt][1]}"
+
+
+def stream_export(dataset, fmt: str = DEFAULT_FORMAT, columns=None, filters=(), chunk_rows: int = CHUNK_ROWS):
+    """
+    Generator mit den Bytes der Exportdatei.
+
+    Das Schema kommt aus der ersten Zeile der ungefilterten Tabelle, damit
+    auch ein leeres Ergebnis eine gültige Datei (nur Kopf) ergibt.
+    """
+    sample = next(dataset.iter_frames(1, columns), None)
+    if sample is None:
+        return
+    schema = _arrow_schema(sample)
+    sink = _ChunkSink()
+    rows = 0
+    # Gemessen wird nur die Arbeit des Servers pro Block (Lesen, Filtern,
+    # Serialisieren), nicht die Zeit, in der ein langsamer Client die Bytes
+    # abholt; ein Abbruch des Clients (GeneratorExit am yield) ist kein Fehler
+    with metrics.stage("export.chunk"):
+        writer = _open_writer(fmt, pa.PythonFile(sink, mode='w'), schema)
+        # CSV-Kopfzeile bzw. Parquet-Magic sofort, noch vor dem ersten Block
+        header = sink.drain()
+    if header:
+        yield header
+    frames = dataset.iter_frames(chunk_rows, schema.names, make_predicate(filters))
+    while True:
+        with metrics.stage("export.chunk"):
+            frame = next(frames, None)
+            if frame is None:
+                break
+            writer.write_batch(pa.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False))
+            data = sink.drain()
+        rows += len(frame)
+        if data:
+            yield data
+    with metrics.stage("export.chunk"):
+        writer.close()
+        footer = sink.drain()
+    metrics.EXPORT_ROWS.inc(rows, format=fmt)
+    if footer:
+        yield footer
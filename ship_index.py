@@ -0,0 +1,131 @@
+# ship_index.py
+"""IMO-Index für die Schiffssuche (statt Full-Scan über den DataFrame)"""
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_imo(imo) -> str:
+    """
+    IMO als getrimmter String, egal ob int, float oder str übergeben wird.
+
+    "IMO 1013676" und führende Nullen ergeben dieselbe Schreibweise wie der
+    int-Wert (so vergleicht auch das Arrow-Backend).
+    """
+    if imo is None:
+        return ''
+    if isinstance(imo, (float, np.floating)) and float(imo).is_integer():
+        imo = int(imo)
+    text = str(imo).strip()
+    if text[:3].upper() == 'IMO':
+        text = text[3:].lstrip(' :')
+    if text.isdigit():
+        text = text.lstrip('0') or '0'
+    return text
+
+
+class ShipIndex:
+    """
+    Hash-Index IMO -> Zeilenpositionen, einmalig beim Laden aufgebaut.
+
+    Eine IMO kann in mehreren Berichtsjahren vorkommen. Die Positionen pro IMO
+    sind deshalb nach report_year absteigend sortiert, Position 0 ist immer
+    das neueste Jahr.
+    """
+
+    def __init__(self, df: pd.DataFrame, imo_column: str = 'imo', year_column: str = 'report_year'):
+        self._positions = {}
+        self._years = None
+        self._keys = pd.Index([], dtype=object)
+        self._latest = np.empty(0, dtype=np.intp)
+        self._flat = np.empty(0, dtype=np.intp)
+        self._starts = np.empty(0, dtype=np.intp)
+        self._counts = np.empty(0, dtype=np.intp)
+
+        if df.empty or imo_column not in df.columns:
+            return
+
+        keys = df[imo_column].map(normalize_imo).to_numpy()
+        if year_column in df.columns:
+            self._years = df[year_column].to_numpy()
+
+        for key, positions in pd.Series(keys).groupby(keys, sort=False).indices.items():
+            if len(positions) > 1 and self._years is not None:
+                positions = positions[np.argsort(-self._years[positions], kind='stable')]
+            self._positions[key] = positions
+
+        # Für Batch-Abfragen: eindeutige IMOs + Position des neuesten Jahres als Arrays
+        self._keys = pd.Index(list(self._positions), dtype=object)
+        self._latest = np.fromiter((p[0] for p in self._positions.values()), dtype=np.intp, count=len(self._positions))
+        # Alle Positionen hintereinander (je IMO neuestes Jahr zuerst), für Batch-Abfragen mit Jahr
+        self._counts = np.fromiter((len(p) for p in self._positions.values()), dtype=np.intp, count=len(self._positions))
+        self._starts = np.cumsum(self._counts) - self._counts
+        self._flat = np.concatenate(list(self._positions.values())).astype(np.intp, copy=False)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, imo):
+        return normalize_imo(imo) in self._positions
+
+    def positions(self, imo) -> np.ndarray:
+        """Alle Zeilenpositionen einer IMO (neuestes Jahr zuerst)"""
+        return self._positions.get(normalize_imo(imo), np.empty(0, dtype=np.intp))
+
+    def years(self, imo) -> list:
+        """Verfügbare Berichtsjahre einer IMO (absteigend)"""
+        if self._years is None:
+            return []
+        return [int(y) for y in self._years[self.positions(imo)]]
+
+    def lookup(self, imo, year=None):
+        """
+        Zeilenposition für eine IMO
+
+        Args:
+            imo: IMO-Nummer (str oder int)
+            year: Berichtsjahr, None = neuestes verfügbares Jahr
+
+        Returns:
+            Zeilenposition (int) oder None, falls nicht vorhanden
+        """
+        positions = self.positions(imo)
+        if len(positions) == 0:
+            return None
+        if year is None or self._years is None:
+            return int(positions[0])
+        for pos in positions:
+            if int(self._years[pos]) == int(year):
+                return int(pos)
+        return None
+
+    def lookup_many(self, imos, year=None) -> np.ndarray:
+        """
+        Zeilenpositionen für viele IMOs in einem vektorisierten Durchlauf
+
+        Args:
+            imos: Liste von IMO-Nummern
+            year: Berichtsjahr, None = jeweils neuestes Jahr
+
+        Returns:
+            Array mit Zeilenpositionen, -1 für nicht gefundene IMOs
+        """
+        keys = [normalize_imo(imo) for imo in imos]
+        if not len(self._keys):
+            return np.full(len(keys), -1, dtype=np.intp)
+        hits = self._keys.get_indexer(keys)
+        if year is None or self._years is None:
+            return np.where(hits >= 0, self._latest[hits], -1)
+
+        # Mit Jahr: alle Positionen der gefundenen IMOs einsammeln, eine Maske
+        # für das Jahr, pro Anfrage der erste Treffer
+        result = np.full(len(keys), -1, dtype=np.intp)
+        found = np.flatnonzero(hits >= 0)
+        counts = self._counts[hits[found]]
+        query = np.repeat(found, counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = self._flat[np.repeat(self._starts[hits[found]], counts) + within]
+        match = self._years[rows] == int(year)
+        queries, first = np.unique(query[match], return_index=True)
+        result[queries] = rows[match][first]
+        return result
@@ -0,0 +1,152 @@
+# ship_payloads.py
+"""
+Fertig serialisierte JSON-Antworten für /api/search-ship.
+
+Die Daten ändern sich nur beim (Hot) Reload. Statt pro Anfrage
+iloc[...].to_dict(), NaN-Ersetzung und jsonify wird jede Antwort einmal
+pro Datenstand erzeugt und als Bytes in einem gemeinsamen Puffer gehalten.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ship_index import normalize_imo
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+# Zeilen pro Schritt beim Serialisieren (begrenzt den Zwischenspeicher bei großen Flotten)
+CHUNK_ROWS = 50000
+# "auto" = nur mit dem pandas-Backend und bis PRECOMPUTE_MAX_ROWS Zeilen vorberechnen,
+# "1" = immer, "0" = Antworten pro Anfrage serialisieren (kein Vorlauf, kein Speicher).
+# Vorberechnet kostet ca. 2.8 KB und 0.1 ms pro Zeile (1M Zeilen: 2.8 GB, 94 s Vorlauf)
+PRECOMPUTE = os.getenv("SHIP_PRECOMPUTE_PAYLOADS", "auto")
+PRECOMPUTE_MAX_ROWS = int(os.getenv("SHIP_PRECOMPUTE_MAX_ROWS", "50000"))
+# ============================================================================
+
+
+def _default(value):
+    # NumPy-Skalare (int64, float32, bool_) und Zeitstempel, die to_dict durchreicht
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Wie Flask-jsonify (sortierte Keys, kompakt, ASCII), NaN muss vorher None sein"""
+    return json.dumps(obj, default=_default, sort_keys=True, ensure_ascii=True,
+                      separators=(',', ':'), allow_nan=False).encode('ascii')
+
+
+class PayloadStore:
+    """
+    Antwort-Bytes aller Schiffszeilen in einem Puffer, Zugriff über Offsets.
+
+    Ein Eintrag entspricht exakt der bisherigen Antwort
+    {"found": true, "data": {...}, "peer_stats": {...}}.
+    """
+
+    def __init__(self, df: pd.DataFrame, peer_stats=None, version: str = '', last_modified=None):
+        self.version = version
+        self.last_modified = last_modified
+        n = len(df)
+        years = df['report_year'].to_numpy() if 'report_year' in df.columns else np.zeros(n, dtype=np.int64)
+
+        parts = []
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        keys = []
+        for start in range(0, n, CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            # NaN -> None einmal pro Block statt pro Feld und Anfrage
+            records = chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+            for i, record in enumerate(records, start):
+                imo = normalize_imo(record.get('imo'))
+                year = record.get('report_year')
+                peer = peer_stats.lookup(imo, year) if peer_stats is not None else None
+                body = dumps({"found": True, "data": record, "peer_stats": peer}) + b"\n"
+                parts.append(body)
+                offsets[i + 1] = offsets[i] + len(body)
+                keys.append(imo)
+
+        self._buffer = b"".join(parts)
+        self._offsets = offsets
+
+        # (IMO, Jahr) -> Eintrag, plus IMO -> Eintrag des neuesten Jahres
+        self._rows = dict(zip(zip(keys, years.tolist()), range(n)))
+        self._latest = {}
+        for row in np.argsort(-years, kind='stable').tolist():
+            self._latest.setdefault(keys[row], row)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._buffer) + self._offsets.nbytes
+
+    def get(self, imo, year=None):
+        """Antwort-Bytes einer Schiffszeile (year None = neuestes Jahr) oder None"""
+        imo = normalize_imo(imo)
+        row = self._latest.get(imo) if year is None else self._rows.get((imo, int(year)))
+        if row is None:
+            return None
+        return self._buffer[self._offsets[row]:self._offsets[row + 1]]
+
+
+class OnDemandPayloads:
+    """Gleiche Schnittstelle wie PayloadStore, serialisiert aber erst bei der Anfrage"""
+
+    def __init__(self, dataset, peer_stats=None, version: str = '', last_modified=None):
+        self._dataset = dataset
+        self._peer_stats = peer_stats
+        self.version = version
+        self.last_modified = last_modified
+
+    def get(self, imo, year=None):
+        record = self._dataset.get_json_record(imo, year)
+        if record is None:
+            return None
+        peer = self._peer_stats.lookup(record.get('imo'), record.get('report_year')) \
+            if self._peer_stats is not None else None
+        return dumps({"found": True, "data": record, "peer_stats": peer}) + b"\n"
+
+
+def last_modified(dataset):
+    """Jüngste mtime der Quelldateien als UTC-Zeitstempel (für Last-Modified)"""
+    mtimes = [entry[2] for entry in getattr(dataset, 'fingerprint', ()) or ()]
+    if not mtimes:
+        return None
+    # HTTP-Daten haben Sekundenauflösung
+    return datetime.fromtimestamp(max(mtimes) // 1_000_000_000, tz=timezone.utc)
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def should_precompute(dataset) -> bool:
+    """PRECOMPUTE für diese Datenbank auswerten ("auto": kleine Tabellen im Speicher)"""
+    if PRECOMPUTE in ("0", "1"):
+        return PRECOMPUTE == "1"
+    # Das Arrow-Backend hält die Tabelle nicht im Speicher, ein Puffer aller Antworten hebt das auf
+    return getattr(dataset, 'in_memory', True) and len(dataset) <= PRECOMPUTE_MAX_ROWS
+
+def build_payload_store(dataset, precompute: bool = None):
+    from peer_stats import get_peer_stats
+    precompute = should_precompute(dataset) if precompute is None else precompute
+    if not precompute:
+        return OnDemandPayloads(dataset, get_peer_stats(dataset),
+                                version=dataset.version, last_modified=last_modified(dataset))
+    return PayloadStore(dataset.read_columns(dataset.columns), get_peer_stats(dataset),
+                        version=dataset.version, last_modified=last_modified(dataset))
+
+def get_payload_store(dataset):
+    """Antworten zum Datenstand der übergebenen Datenbank (an der Instanz gemerkt)"""
+    return dataset.derived("payload_store", build_payload_store)
@@ -0,0 +1,159 @@
+# ship_search.py
+"""Autocomplete über Schiffsnamen und IMO-Präfixe (vorab aufgebauter Index statt str.contains)"""
+
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Obergrenze an Kandidaten pro Stufe, bevor sortiert wird (Wort-Präfixe wie "a")
+MAX_CANDIDATES = 500
+# ============================================================================
+
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name) -> str:
+    """Kleinbuchstaben, Sonderzeichen als Leerzeichen: "M/V Nord-Star" -> "m v nord star" """
+    if not isinstance(name, str):
+        return ''
+    return _NON_ALNUM.sub(' ', name.casefold()).strip()
+
+
+def _prefix_range(sorted_keys: list, prefix: str) -> tuple:
+    # Alle Schlüssel mit diesem Präfix liegen im sortierten Array hintereinander
+    start = bisect_left(sorted_keys, prefix)
+    end = bisect_left(sorted_keys, prefix + '\uffff', lo=start)
+    return start, end
+
+
+class NameIndex:
+    """
+    Autocomplete-Index, einmal pro Datenstand aufgebaut.
+
+    Einträge sind eindeutige IMOs (Name aus dem neuesten Berichtsjahr),
+    alphabetisch nach normalisiertem Namen sortiert. Die Eintragsnummer ist
+    damit gleichzeitig der Rang innerhalb einer Stufe.
+
+    Ranking (Stufen, innerhalb einer Stufe alphabetisch):
+        0: IMO beginnt mit der Eingabe (nur Ziffern)
+        1: Name ist gleich der Eingabe
+        2: Name beginnt mit der Eingabe
+        3: ein Wort im Namen beginnt mit der Eingabe
+        4: Eingabe kommt irgendwo im Namen vor (Trigramm-Index, ab 3 Zeichen)
+    """
+
+    def __init__(self, df):
+        df = df.dropna(subset=['imo'])
+        if 'report_year' in df.columns:
+            df = df.sort_values('report_year', ascending=False, kind='stable')
+        df = df.drop_duplicates('imo')
+
+        norm = df['ship_name'].map(normalize_name) if 'ship_name' in df.columns else df['imo'].map(lambda _: '')
+        order = np.argsort(norm.to_numpy(dtype=object), kind='stable')
+
+        self.imos = df['imo'].to_numpy(dtype=object)[order].tolist()
+        self.names = (df['ship_name'].to_numpy(dtype=object)[order].tolist()
+                      if 'ship_name' in df.columns else [None] * len(order))
+        self.ship_types = (df['mrv_ship_type'].to_numpy(dtype=object)[order].tolist()
+                           if 'mrv_ship_type' in df.columns else [None] * len(order))
+        self.norm_names = norm.to_numpy(dtype=object)[order].tolist()
+
+        # Ganze Namen sind bereits sortiert (Stufen 1 und 2)
+        # Wörter (Stufe 3): sortierte Liste aller (Wort, Eintrag)
+        words = sorted((word, i) for i, name in enumerate(self.norm_names) for word in set(name.split()))
+        self._words = [w for w, _ in words]
+        self._word_ids = [i for _, i in words]
+
+        # IMO-Präfixe (Stufe 0)
+        imo_order = sorted(range(len(self.imos)), key=lambda i: self.imos[i])
+        self._imos_sorted = [self.imos[i] for i in imo_order]
+        self._imo_ids = imo_order
+
+        # Trigramme (Stufe 4): Posting-Listen sind aufsteigend, also alphabetisch
+        postings = {}
+        for i, name in enumerate(self.norm_names):
+            for gram in {name[k:k + 3] for k in range(len(name) - 2)}:
+                postings.setdefault(gram, []).append(i)
+        self._trigrams = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.imos)
+
+    def _entry(self, i: int) -> dict:
+        return {"imo": self.imos[i], "ship_name": self.names[i], "mrv_ship_type": self.ship_types[i]}
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list:
+        """Bis zu limit Treffer als [{imo, ship_name, mrv_ship_type}], bester zuerst"""
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        raw = (query or '').strip()
+        q = normalize_name(raw)
+        if not q:
+            return []
+
+        hits = []
+        seen = set()
+
+        def add(ids):
+            for i in ids:
+                if len(hits) >= limit:
+                    return
+                if i not in seen:
+                    seen.add(i)
+                    hits.append(i)
+
+        # 0: IMO-Präfix
+        if raw.isdigit():
+            start, end = _prefix_range(self._imos_sorted, raw)
+            add(self._imo_ids[start:min(end, start + limit)])
+
+        # 1 + 2: Name gleich / beginnt mit (exakter Treffer sortiert im Bereich vorne)
+        if len(hits) < limit:
+            start, end = _prefix_range(self.norm_names, q)
+            add(range(start, end))
+
+        # 3: ein Wort beginnt mit der Eingabe (nur erstes Wort der Eingabe über den Index)
+        if len(hits) < limit:
+            first, _, rest = q.partition(' ')
+            start, end = _prefix_range(self._words, first)
+            candidates = sorted(set(self._word_ids[start:min(end, start + MAX_CANDIDATES)]))
+            if rest:
+                candidates = [i for i in candidates if (' ' + q) in (' ' + self.norm_names[i])]
+            add(candidates)
+
+        # 4: Teilstring über den Trigramm-Index
+        if len(hits) < limit and len(q) >= 3:
+            grams = {q[k:k + 3] for k in range(len(q) - 2)}
+            lists = [self._trigrams.get(gram) for gram in grams]
+            if all(ids is not None for ids in lists):
+                # Posting-Listen schneiden (kürzeste zuerst), danach echten Teilstring prüfen
+                lists.sort(key=len)
+                candidates = lists[0]
+                for ids in lists[1:]:
+                    if len(candidates) <= limit:
+                        break
+                    candidates = np.intersect1d(candidates, ids, assume_unique=True)
+                add(i for i in map(int, candidates) if q in self.norm_names[i])
+
+        return [self._entry(i) for i in hits]
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+INDEX_COLUMNS = ['imo', 'ship_name', 'mrv_ship_type', 'report_year']
+
+def build_index(dataset) -> NameIndex:
+    return NameIndex(dataset.read_columns(INDEX_COLUMNS))
+
+def get_name_index(dataset) -> NameIndex:
+    """Index zum Datenstand der übergebenen Datenbank (an der Instanz gemerkt)"""
+    return dataset.derived("name_index", build_index)
@@ -0,0 +1,152 @@
+# similar_vessels.py
+"""
+"Ähnliche Schiffe": k nächste Nachbarn nach Abmessungen und Betriebsprofil.
+
+Mit scipy wird pro Berichtsjahr ein cKDTree aufgebaut. Ohne scipy (optionale
+Abhängigkeit) läuft eine vektorisierte Blocksuche über dieselbe
+normalisierte Feature-Matrix, ohne paarweise Distanzmatrix.
+"""
+
+
+import numpy as np
+
+from ship_index import normalize_imo
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy ist optional
+    cKDTree = None
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+FEATURES = ['length', 'width', 'draft_m_median', 'sog_mean_kn', 'moving_share', 'ais_distance_nm_total']
+# Stark schiefe Verteilungen vor dem Normalisieren logarithmieren
+LOG_FEATURES = {'ais_distance_nm_total'}
+RESULT_COLUMNS = ['ship_name', 'mrv_ship_type', 'y_mrv_co2_per_nm_kg', 'y_pred_co2_per_nm_kg',
+                  'residual_pct', 'flag_color']
+DEFAULT_K = 10
+MAX_K = 100
+BLOCK_SIZE = 65536
+# ============================================================================
+
+
+class _YearIndex:
+    """Feature-Matrix + Suchstruktur für ein Berichtsjahr"""
+
+    def __init__(self, rows: np.ndarray, points: np.ndarray):
+        self.rows = rows
+        self.points = points
+        self.tree = cKDTree(points) if cKDTree is not None and len(points) else None
+
+    def query(self, point: np.ndarray, k: int):
+        """(Distanzen, lokale Positionen), aufsteigend nach Distanz"""
+        k = min(k, len(self.points))
+        if k == 0:
+            return np.empty(0), np.empty(0, dtype=np.intp)
+        if self.tree is not None:
+            dist, pos = self.tree.query(point, k=k)
+            return np.atleast_1d(dist), np.atleast_1d(pos)
+
+        # Blockweise: je Block die k besten behalten, am Ende zusammenführen
+        best_d = []
+        best_p = []
+        for start in range(0, len(self.points), BLOCK_SIZE):
+            block = self.points[start:start + BLOCK_SIZE]
+            d2 = np.einsum('ij,ij->i', block - point, block - point)
+            kk = min(k, len(block))
+            top = np.argpartition(d2, kk - 1)[:kk]
+            best_d.append(d2[top])
+            best_p.append(top + start)
+        d2 = np.concatenate(best_d)
+        pos = np.concatenate(best_p)
+        order = np.argsort(d2, kind='stable')[:k]
+        return np.sqrt(d2[order]), pos[order]
+
+
+class SimilarVessels:
+    """
+    Einmal pro Datenstand aufgebaut. Features werden (ggf. logarithmiert)
+    z-standardisiert, fehlende Werte durch den Median ersetzt. Gesucht
+    wird innerhalb desselben Berichtsjahres.
+    """
+
+    def __init__(self, df):
+        n = len(df)
+        self.features = [f for f in FEATURES if f in df.columns]
+        self._imos = df['imo'].to_numpy(dtype=object)
+        years = df['report_year'].to_numpy() if 'report_year' in df.columns else np.zeros(n, dtype=np.int64)
+        self._years = years
+
+        matrix = np.column_stack([df[f].to_numpy(dtype=np.float64) for f in self.features]) \
+            if self.features else np.empty((n, 0))
+        for j, feature in enumerate(self.features):
+            if feature in LOG_FEATURES:
+                matrix[:, j] = np.log1p(np.clip(matrix[:, j], 0, None))
+        median = np.nanmedian(matrix, axis=0) if n else np.zeros(matrix.shape[1])
+        matrix = np.where(np.isnan(matrix), median, matrix)
+        std = matrix.std(axis=0) if n else np.ones(matrix.shape[1])
+        self._points = ((matrix - matrix.mean(axis=0)) / np.where(std > 0, std, 1)).astype(np.float64)
+
+        self._columns = {c: df[c].to_numpy() for c in RESULT_COLUMNS + self.features if c in df.columns}
+
+        self._by_year = {}
+        for year in np.unique(years):
+            rows = np.flatnonzero(years == year)
+            self._by_year[year.item()] = _YearIndex(rows, self._points[rows])
+
+        # (IMO, Jahr) -> Zeile und IMO -> neuestes Jahr
+        self._rows = dict(zip(zip(self._imos, years.tolist()), range(n)))
+        self._latest = {}
+        for row in np.argsort(-years, kind='stable').tolist():
+            self._latest.setdefault(self._imos[row], row)
+
+    @property
+    def backend(self) -> str:
+        return "kdtree" if cKDTree is not None else "block-scan"
+
+    def _describe(self, row: int) -> dict:
+        out = {"imo": self._imos[row], "report_year": self._years[row].item()}
+        for column, values in self._columns.items():
+            value = values[row]
+            if isinstance(value, np.generic):
+                value = value.item()
+            out[column] = None if isinstance(value, float) and np.isnan(value) else value
+        return out
+
+    def find(self, imo, k: int = DEFAULT_K, year=None):
+        """
+        k ähnlichste Schiffe (ohne das Schiff selbst)
+
+        Returns:
+            {"ship": {...}, "neighbours": [{..., "distance"}]} oder None, falls IMO unbekannt
+        """
+        k = max(1, min(int(k), MAX_K))
+        imo = normalize_imo(imo)
+        row = self._latest.get(imo) if year in (None, '') else self._rows.get((imo, int(year)))
+        if row is None:
+            return None
+
+        index = self._by_year[self._years[row].item()]
+        dist, pos = index.query(self._points[row], k + 1)
+        neighbours = []
+        for d, p in zip(dist.tolist(), index.rows[pos].tolist()):
+            if p == row:
+                continue
+            entry = self._describe(p)
+            entry["distance"] = round(d, 4)
+            neighbours.append(entry)
+        return {"ship": self._describe(row), "neighbours": neighbours[:k]}
+
+
+# ============================================================================
+# API
+# ============================================================================
+
+def build_similar_index(dataset) -> SimilarVessels:
+    return SimilarVessels(dataset.read_columns(['imo', 'report_year'] + FEATURES + RESULT_COLUMNS))
+
+def get_similar_index(dataset) -> SimilarVessels:
+    """Index zum Datenstand der übergebenen Datenbank (an der Instanz gemerkt)"""
+    return dataset.derived("similar_index", build_similar_index)
@@ -0,0 +1,109 @@
+# stub_model.py
+"""
+Lokaler Ersatz für ibm_watsonx_ai Model (Tests und Lasttests ohne WatsonX-Zugang)
+
+Aktiv mit WATSONX_STUB=1 (siehe ai_report.create_model). Für Lasttests lässt
+sich das Verhalten eines echten Modells nachstellen:
+
+  STUB_LATENCY_MS       Wartezeit bis zum ersten Token (Warteschlange, Prompt-Verarbeitung)
+  STUB_TOKENS_PER_SEC   Erzeugungsrate, 0 = sofort
+  STUB_OUTPUT_TOKENS    Länge der Antwort in Tokens (Wörtern), 0 = kurzer fester Text
+  STUB_ERROR_RATE       Anteil der Aufrufe, die mit StubModelError abbrechen (0..1)
+  STUB_SEED             Seed für die Fehler-Auswahl (reproduzierbare Läufe)
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+TOKENS_PER_SEC = float(os.getenv("STUB_TOKENS_PER_SEC", "0"))
+OUTPUT_TOKENS = int(os.getenv("STUB_OUTPUT_TOKENS", "0"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+SEED = os.getenv("STUB_SEED")
+# ============================================================================
+
+_FILLER = ("The reported values are consistent with the operating profile of comparable vessels "
+           "and the regression model does not indicate a systematic deviation").split()
+
+
+class StubModelError(Exception):
+    """Vom Stub eingestreuter Fehler (STUB_ERROR_RATE), steht für einen fehlgeschlagenen API-Aufruf"""
+
+
+class StubModel:
+    """
+    Gleiche Schnittstelle wie Model.generate_text / generate_text_stream,
+    liefert aber einen festen Text ohne Netzwerkzugriff.
+    """
+
+    def __init__(self, model_id=None, params=None, credentials=None, project_id=None, delay_seconds=None,
+                 tokens_per_second=None, output_tokens=None, error_rate=None, seed=SEED):
+        self.model_id = model_id
+        self.params = params or {}
+        self.delay_seconds = LATENCY_MS / 1000 if delay_seconds is None else delay_seconds
+        self.tokens_per_second = TOKENS_PER_SEC if tokens_per_second is None else tokens_per_second
+        self.output_tokens = OUTPUT_TOKENS if output_tokens is None else output_tokens
+        self.error_rate = ERROR_RATE if error_rate is None else error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _text_for(self, prompt: str) -> str:
+        first_line = next((l.strip() for l in prompt.splitlines() if "Ship name" in l), "")
+        text = (
+            "Summary of the operating profile (stub model).\n\n"
+            f"{first_line}\n\n"
+            "Recommendation: verify the reported MRV data against the AIS profile."
+        )
+        missing = self.output_tokens - len(text.split())
+        if missing > 0:
+            text += "\n\n" + " ".join(_FILLER[i % len(_FILLER)] for i in range(missing))
+        return text
+
+    def _maybe_fail(self):
+        if not self.error_rate:
+            return
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise StubModelError(f"Injected model error (error_rate={self.error_rate})")
+
+    def _token_seconds(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def generate_text(self, prompt=None, params=None, raw_response=False, **kwargs):
+        if isinstance(prompt, list):
+            # Wie das SDK: Prompt-Liste mit höchstens concurrency_limit parallelen Anfragen
+            workers = max(1, min(kwargs.get("concurrency_limit") or 10, len(prompt)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(lambda p: self.generate_text(p, params, raw_response), prompt))
+        self._maybe_fail()
+        text = self._text_for(prompt or "")
+        wait = self.delay_seconds + self._token_seconds(len(text.split()))
+        if wait:
+            time.sleep(wait)
+        if raw_response:
+            # Token-Anzahl wie bei WatsonX, hier grob als Wörter gezählt
+            return {"results": [{
+                "generated_text": text,
+                "generated_token_count": len(text.split()),
+                "input_token_count": len((prompt or "").split()),
+            }]}
+        return text
+
+    def generate_text_stream(self, prompt=None, params=None, raw_response=False, **kwargs):
+        self._maybe_fail()
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        words = self._text_for(prompt or "").split(" ")
+        per_token = self._token_seconds(1)
+        for i, word in enumerate(words):
+            if per_token:
+                time.sleep(per_token)
+            yield word if i == len(words) - 1 else word + " "